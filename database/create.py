@@ -27,3 +27,29 @@ from src.utils.sqlalchemy import SQLAlchemy
 with app.app_context():
     db = SQLAlchemy.get_instance(app)
     db.create_all()
+
+
+# Migrate databases created before the current models (each step only runs when still needed)
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
+from src.exportacoes.model import ExportacaoModel
+from src.importacoes.model import ImportacaoModel
+
+with app.app_context():
+    for model in (ExportacaoModel, ImportacaoModel):
+        tabela = model.__tablename__
+        inspetor = inspect(db.engine)
+        colunas = {coluna["name"] for coluna in inspetor.get_columns(tabela)}
+        indices = {indice["name"] for indice in inspetor.get_indexes(tabela)}
+
+        with db.engine.begin() as conn:
+            # `valor_agregado`: coluna gerada (STORED) no lugar do índice funcional
+            if "valor_agregado" not in colunas:
+                coluna = CreateColumn(model.__table__.c.valor_agregado).compile(dialect=db.engine.dialect)
+                conn.execute(text(f"ALTER TABLE {tabela} ADD COLUMN {coluna}"))
+            if f"idx_{tabela}_uf_ano_val_agreg_func" in indices:
+                conn.execute(text(f"DROP INDEX idx_{tabela}_uf_ano_val_agreg_func ON {tabela}"))
+            if f"idx_{tabela}_uf_ano_val_agreg" not in indices:
+                conn.execute(
+                    text(f"CREATE INDEX idx_{tabela}_uf_ano_val_agreg ON {tabela} (uf_id, ano, valor_agregado DESC, id DESC)")
+                )
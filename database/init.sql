@@ -10,6 +10,44 @@ FLUSH PRIVILEGES;
 -- Criação dos indices para melhora da busca dentro da aplicação, tem como objetivo fazer um index de todas as coisas que são mais
 -- utilizadas dentro do sistema, assim melhorando a eficiencia da busca.
 
+-- `valor_agregado` é uma coluna gerada declarada nos models; bancos criados antes dela são migrados
+-- por `database/create.py` (coluna e índice).
+
+-- Versão do dataset (chaves do cache de respostas, ETags e cache de dimensões), incrementada por
+-- importações e por escritas na API; `atualizado_em` é o Last-Modified das rotas GET.
+-- Também criada por `database/create.py`, pelos importadores e na inicialização da aplicação.
+CREATE TABLE IF NOT EXISTS alfalog.dataset_versao (
+    id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    versao BIGINT NOT NULL DEFAULT 0,
+    atualizado_em DATETIME NULL,
+    created_at DATETIME NOT NULL
+);
+
+-- Blocos (fluxo, uf_id, ano) alterados por cada versão; sem bloco, tudo pode ter mudado.
+-- Usada pelo motor colunar para consultar no SQL só os blocos alterados desde o seu snapshot.
+CREATE TABLE IF NOT EXISTS alfalog.dataset_alteracoes (
+    id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    versao BIGINT NOT NULL,
+    fluxo VARCHAR(15) NULL,
+    uf_id INT NULL,
+    ano INT NULL,
+    created_at DATETIME NOT NULL,
+    INDEX ix_dataset_alteracoes_versao (versao)
+);
+
+-- Estado dos expurgos assíncronos (DELETE ...?assincrono=true), lido por qualquer worker;
+-- também criada no primeiro expurgo.
+CREATE TABLE IF NOT EXISTS alfalog.expurgos (
+    id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    dimensao VARCHAR(63) NOT NULL,
+    dimensao_id BIGINT NOT NULL,
+    status VARCHAR(15) NOT NULL,
+    total BIGINT NULL,
+    removidas BIGINT NOT NULL DEFAULT 0,
+    erro TEXT NULL,
+    created_at DATETIME NOT NULL
+);
+
 -- Exportação
 CREATE INDEX idx_exportacoes_uf_id ON exportacoes (uf_id);
 
@@ -17,11 +55,13 @@ CREATE INDEX idx_exportacoes_ncm_id ON exportacoes (ncm_id);
 
 CREATE INDEX idx_exportacoes_uf_ano ON exportacoes (uf_id, ano);
 
+CREATE INDEX idx_exportacoes_ano_mes ON exportacoes (ano, mes);
+
 CREATE INDEX idx_exportacoes_uf_ano_peso_id ON exportacoes (uf_id, ano, peso DESC, id DESC);
 
 CREATE INDEX idx_exportacoes_uf_ano_via_id ON exportacoes (uf_id, ano, via_id);
 
-CREATE INDEX idx_exportacoes_uf_ano_val_agreg_func ON exportacoes (uf_id, ano, (valor / NULLIF(peso, 0)) DESC NULLS LAST, id DESC);
+CREATE INDEX idx_exportacoes_uf_ano_val_agreg ON exportacoes (uf_id, ano, valor_agregado DESC, id DESC);
 
 CREATE INDEX idx_exportacoes_uf_ano_valor_peso_id_fallback ON exportacoes (uf_id, ano, valor DESC, peso, id DESC);
 
@@ -32,6 +72,8 @@ CREATE INDEX idx_importacoes_ncm_id ON importacoes (ncm_id);
 
 CREATE INDEX idx_importacoes_uf_ano ON importacoes (uf_id, ano);
 
-CREATE INDEX idx_importacoes_uf_ano_val_agreg_func ON importacoes (uf_id, ano, (valor / NULLIF(peso, 0)) DESC NULLS LAST, id DESC);
+CREATE INDEX idx_importacoes_ano_mes ON importacoes (ano, mes);
+
+CREATE INDEX idx_importacoes_uf_ano_val_agreg ON importacoes (uf_id, ano, valor_agregado DESC, id DESC);
 
 CREATE INDEX idx_importacoes_uf_ano_valor_peso_id_fallback ON importacoes (uf_id, ano, valor DESC, peso, id DESC);
\ No newline at end of file
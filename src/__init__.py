@@ -17,6 +17,31 @@ def create_app():
     # init database/sqlalchemy connection
     SQLAlchemy.get_instance(app)
 
+    # response cache of the analytics routes
+    from src.core.cache import init_cache
+
+    init_cache(app)
+
+    # ETag/Last-Modified of the GET variants of the analytics routes
+    from src.core.conditional import init_conditional
+
+    init_conditional(app)
+
+    # process-wide cache of the dimension tables (uses the dataset version of init_conditional)
+    from src.core.dimensoes import init_dimensoes
+
+    init_dimensoes(app)
+
+    # background purge of the transactions of deleted dimension entries
+    from src.core.expurgo import init_expurgos
+
+    init_expurgos(app)
+
+    # in-memory columnar engine of the analytics routes (APP_ANALYTICS_COLUNAR)
+    from src.core.colunar import init_colunar
+
+    init_colunar(app)
+
     api: Api = create_api(app)
 
     register_cli_commands(app)
@@ -111,15 +136,17 @@ def add_resources(api: Api) -> None:
     api.add_resource(NCM, "/api/ncms/<int:id>")
 
     # Exportação resources
-    from src.exportacoes.resources import Exportacoes, Exportacao
+    from src.exportacoes.resources import Exportacoes, ExportacoesBulk, Exportacao
 
     api.add_resource(Exportacoes, "/api/exportacoes", "/api/exportacoes/")
+    api.add_resource(ExportacoesBulk, "/api/exportacoes/bulk")
     api.add_resource(Exportacao, "/api/exportacoes/<int:id>")
 
     # Importação resources
-    from src.importacoes.resources import Importacoes, Importacao
+    from src.importacoes.resources import Importacoes, ImportacoesBulk, Importacao
 
     api.add_resource(Importacoes, "/api/importacoes", "/api/importacoes/")
+    api.add_resource(ImportacoesBulk, "/api/importacoes/bulk")
     api.add_resource(Importacao, "/api/importacoes/<int:id>")
 
 
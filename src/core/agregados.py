@@ -0,0 +1,125 @@
+"""Shared, memory-mapped file with the arrays of the columnar engine.
+
+Under a prefork server (gunicorn with several workers) each worker would
+otherwise load its own copy of `src.core.colunar`. `construir` writes, for
+both flow directions, every array of `TabelaColunar` (sorted columns, the
+`(uf_id, ano)` offset index, the pre-sorted page orders and the per-block
+aggregates) into one versioned binary file:
+
+    MAGIC | header length (uint32, little endian) | JSON header | arrays
+
+The header holds the format, the dataset version and dtype/shape/offset of
+each array (aligned to `ALINHAMENTO` bytes). `abrir` maps the file read-only
+and builds the tables over it without copying, so every worker shares one
+page-cache copy and starts without scanning the database. The file is
+written under a temporary name and renamed, so a new version replaces the old
+one atomically; workers remap it on their next request.
+"""
+
+import json
+import mmap
+import os
+import struct
+import numpy as np
+from src.utils.sqlalchemy import SQLAlchemy
+from .colunar import TabelaColunar, carregar_tabelas
+
+MAGIC = b"COMEXAGG"
+FORMATO = 1
+ALINHAMENTO = 64
+
+
+def _alinhar(posicao):
+    return -(-posicao // ALINHAMENTO) * ALINHAMENTO
+
+
+def construir(caminho):
+    """Load both flow directions from the database and write them to `caminho`.
+
+    Returns:
+        int: dataset version written to the file.
+    """
+    with SQLAlchemy.get_instance().engine.connect() as conn:
+        versao, tabelas = carregar_tabelas(conn)
+    escrever(caminho, versao, tabelas)
+    return versao
+
+
+def escrever(caminho, versao, tabelas):
+    """Write `{fluxo: TabelaColunar}` of `versao` to `caminho`, replacing it atomically."""
+    arrays = {}
+    for fluxo, tabela in tabelas.items():
+        for nome, array in tabela.arrays().items():
+            arrays[f"{fluxo}/{nome}"] = np.ascontiguousarray(array)
+
+    # descrições das NCMs (texto): UTF-8 concatenado e o offset de cada uma
+    descricoes = next(iter(tabelas.values())).descricoes_ncm if tabelas else np.array([None], dtype=object)
+    textos = [(descricao or "").encode() for descricao in descricoes]
+    arrays["ncms/texto"] = np.frombuffer(b"".join(textos), dtype="uint8")
+    arrays["ncms/offsets"] = np.cumsum([0] + [len(texto) for texto in textos], dtype="int64")
+    arrays["ncms/existe"] = np.array([descricao is not None for descricao in descricoes], dtype=bool)
+
+    indice, posicao = {}, 0
+    for nome, array in arrays.items():
+        indice[nome] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": posicao}
+        posicao = _alinhar(posicao + array.nbytes)
+    cabecalho = json.dumps({"formato": FORMATO, "versao": versao, "arrays": indice}).encode()
+    inicio_dados = _alinhar(len(MAGIC) + 4 + len(cabecalho))
+
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    try:
+        with open(temporario, "wb") as arquivo:
+            arquivo.write(MAGIC + struct.pack("<I", len(cabecalho)) + cabecalho)
+            for nome, array in arrays.items():
+                arquivo.seek(inicio_dados + indice[nome]["offset"])
+                arquivo.write(array.tobytes())
+            arquivo.truncate(inicio_dados + posicao)
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+        os.replace(temporario, caminho)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+
+def abrir(caminho):
+    """Map `caminho` read-only.
+
+    Returns:
+        tuple: (dataset version, `{fluxo: TabelaColunar}` over the mapped arrays).
+
+    Raises:
+        ValueError: if the file is not an aggregate file of this format.
+    """
+    with open(caminho, "rb") as arquivo:
+        mapa = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if mapa[: len(MAGIC)] != MAGIC:
+        raise ValueError(f"'{caminho}' não é um arquivo de agregados.")
+    (tamanho,) = struct.unpack_from("<I", mapa, len(MAGIC))
+    cabecalho = json.loads(mapa[len(MAGIC) + 4 : len(MAGIC) + 4 + tamanho])
+    if cabecalho["formato"] != FORMATO:
+        raise ValueError(f"Formato {cabecalho['formato']} de '{caminho}' não suportado; reconstrua o arquivo.")
+    inicio_dados = _alinhar(len(MAGIC) + 4 + tamanho)
+
+    arrays = {}
+    for nome, meta in cabecalho["arrays"].items():
+        dtype, shape = np.dtype(meta["dtype"]), tuple(meta["shape"])
+        quantidade = int(np.prod(shape))
+        if quantidade == 0:
+            arrays[nome] = np.empty(shape, dtype)
+        else:
+            arrays[nome] = np.frombuffer(mapa, dtype, quantidade, inicio_dados + meta["offset"]).reshape(shape)
+
+    texto, offsets = arrays.pop("ncms/texto"), arrays.pop("ncms/offsets")
+    existe = arrays.pop("ncms/existe")
+    descricoes = np.full(len(existe), None, dtype=object)
+    for id in np.flatnonzero(existe):
+        descricoes[id] = bytes(texto[offsets[id] : offsets[id + 1]]).decode()
+
+    por_fluxo = {}
+    for nome, array in arrays.items():
+        fluxo, coluna = nome.split("/", 1)
+        por_fluxo.setdefault(fluxo, {})[coluna] = array
+    tabelas = {fluxo: TabelaColunar.de_arrays(colunas, descricoes) for fluxo, colunas in por_fluxo.items()}
+    return cabecalho["versao"], tabelas
@@ -1,197 +1,81 @@
-import marshal
-from flask import Blueprint, request
-from flask_restful import marshal_with
-from sqlalchemy import desc, func, text
+from flask import Blueprint
+from flask_restful import marshal, marshal_with
 from ..request import valor_agregado_args, cargas_movimentadas_args, vias_utilizadas_args, urf_utilizadas_args
-from ..fields import response_fields_cargas_movimentadas, response_fields_valores_agregados, vias_fields, urfs_fields
-from src.importacoes.model import ImportacaoModel
-from src.ufs.model import UFModel
-from src.ncms.model import NCMModel
-from src.vias.model import ViaModel
-from src.utils.sqlalchemy import SQLAlchemy
+from ..cache import cached
+from ..conditional import conditional
+from ..fields import (
+    response_fields_cargas_movimentadas,
+    response_fields_cargas_movimentadas_dicionario,
+    response_fields_valores_agregados,
+    response_fields_valores_agregados_dicionario,
+    vias_fields,
+    urfs_fields,
+)
+from ..queries import TransacaoQueries
 
 
 importacoes = Blueprint("importacoes", __name__)
+queries = TransacaoQueries("importacoes")
 
 
-@importacoes.route("/api/importacoes/valor-agregado", methods=["POST"])
-@marshal_with(response_fields_valores_agregados)
+@importacoes.route("/api/importacoes/valor-agregado", methods=["GET", "POST"])
+@conditional(valor_agregado_args)
+@cached(valor_agregado_args)
 def valor_agregado():
-    """Retrieve Transações de Importação incluindo seu valor agregado, com paginação otimizada."""
+    """Transações de importação de uma UF com o valor agregado, da maior para a menor, paginadas."""
     args = valor_agregado_args.parse_args(strict=True)
-    db = SQLAlchemy.get_instance()
-
-    tamanho_pagina = max(1, args["tamanho_pagina"])
-    cursor = max(1, args["cursor"])
-    offset = (cursor - 1) * tamanho_pagina
-
-    valor_agregado_expr = (ImportacaoModel.valor / func.nullif(ImportacaoModel.peso, 0)).label("valor_agregado")
-
-    base_query = (
-        db.session.query(
-            ImportacaoModel.id,
-            ImportacaoModel.ano,
-            ImportacaoModel.mes,
-            ImportacaoModel.peso,
-            ImportacaoModel.valor,
-            valor_agregado_expr, 
-            ImportacaoModel.ncm_id,
-            ImportacaoModel.ue_id,
-            ImportacaoModel.pais_id,
-            ImportacaoModel.uf_id,
-            ImportacaoModel.via_id,
-            ImportacaoModel.urf_id,
-            NCMModel.descricao.label("ncm_descricao"),
-        )
-        .select_from(ImportacaoModel)
-        .join(UFModel, UFModel.id == ImportacaoModel.uf_id)
-        .join(NCMModel, NCMModel.id == ImportacaoModel.ncm_id)
-        .filter(UFModel.id == args["uf_id"])
+    dicionario = args["descricoes_ncm"] == "dicionario"
+    resultado = queries.valor_agregado(
+        args["uf_id"],
+        args["ano"],
+        args.get("ano_inicial"),
+        max(1, args["tamanho_pagina"]),
+        args["cursor"],
+        dicionario,
     )
+    return marshal(resultado, response_fields_valores_agregados_dicionario if dicionario else response_fields_valores_agregados)
 
-    ano_inicial = args.get("ano_inicial")
-    base_query = _filter_year_or_period(base_query, args.get("ano"), ano_inicial)
 
-    order_clause = (desc(valor_agregado_expr), desc(ImportacaoModel.id))
-
-    # Buscar 'per_page + 1' registros
-    num_to_fetch = tamanho_pagina + 1
-    entries_plus_one = base_query.order_by(
-        *order_clause
-    ).limit(num_to_fetch).offset(offset).all()
-
-    # Determinar se há uma próxima página
-    has_next = len(entries_plus_one) > tamanho_pagina
-
-    # Obter apenas os registros da página atual
-    entries_paginadas = entries_plus_one[:tamanho_pagina]
-
-    # Determinar se há página anterior
-    has_previous = cursor > 1
-
-    # Montar a resposta estruturada
-    response = {
-        "pagina": cursor,
-        "quantidade_pagina": tamanho_pagina,
-        "has_next": has_next,
-        "has_previous": has_previous,
-        "valores_agregados": entries_paginadas,
-    }
-
-    return response
-
-
-@importacoes.route("/api/importacoes/cargas-movimentadas", methods=["POST"])
-@marshal_with(response_fields_cargas_movimentadas)
+@importacoes.route("/api/importacoes/cargas-movimentadas", methods=["GET", "POST"])
+@conditional(cargas_movimentadas_args)
+@cached(cargas_movimentadas_args)
 def cargas_movimentadas():
-    """Inclui dados referente as cargas movimentadas."""
-    # input validation
+    """Transações de importação de uma UF da maior para a menor carga (peso), paginadas."""
     args = cargas_movimentadas_args.parse_args(strict=True)
-
-    # Cálculo da paginação
-    tamanho_pagina = max(1, args["tamanho_pagina"])
-    cursor = max(1, args["cursor"])
-    offset = (cursor - 1) * tamanho_pagina
-    valor_agregado_expr = (ImportacaoModel.valor / func.nullif(ImportacaoModel.peso, 0)).label("valor_agregado")
-
-    db = SQLAlchemy.get_instance()
-
-    base_query = (
-        db.session.query(
-            ImportacaoModel.id,
-            ImportacaoModel.ano,
-            ImportacaoModel.mes,
-            ImportacaoModel.peso,
-            ImportacaoModel.ncm_id,
-            ImportacaoModel.uf_id,
-            valor_agregado_expr,
-            ImportacaoModel.pais_id,
-            ImportacaoModel.via_id,
-            NCMModel.descricao.label("ncm_descricao"),
-        )
-        .select_from(ImportacaoModel)
-        .join(UFModel, UFModel.id == ImportacaoModel.uf_id)
-        .join(NCMModel, NCMModel.id == ImportacaoModel.ncm_id)
-        .filter(UFModel.id == args["uf_id"])
+    dicionario = args["descricoes_ncm"] == "dicionario"
+    resultado = queries.cargas_movimentadas(
+        args["uf_id"],
+        args["ano"],
+        args.get("ano_inicial"),
+        max(1, args["tamanho_pagina"]),
+        args["cursor"],
+        dicionario,
     )
+    return marshal(resultado, response_fields_cargas_movimentadas_dicionario if dicionario else response_fields_cargas_movimentadas)
 
-    # filtering
-    ano_inicial = args.get("ano_inicial") # Usar .get() para evitar KeyError se não existir
-    base_query = _filter_year_or_period(base_query, args.get("ano"), ano_inicial)
-    order_clause = (desc(ImportacaoModel.peso), desc(ImportacaoModel.id))
-
-    num_to_fetch = tamanho_pagina + 1
-    entries_plus_one = base_query.order_by(
-        *order_clause
-    ).limit(num_to_fetch).offset(offset).all()
-
-    has_next = len(entries_plus_one) > tamanho_pagina
-
-    # Obter apenas os registros da página atual
-    entries_paginadas = entries_plus_one[:tamanho_pagina]
-
-    has_previous = cursor > 1
-    
-    response = {
-        "pagina": cursor,
-        "quantidade_pagina": tamanho_pagina,
-        "has_next": has_next,
-        "has_previous": has_previous,
-        "cargas_movimentadas": entries_paginadas,
-    }
 
-    return response
-
-
-@importacoes.route("/api/importacoes/vias-utilizadas", methods=["POST"])
+@importacoes.route("/api/importacoes/vias-utilizadas", methods=["GET", "POST"])
+@conditional(vias_utilizadas_args)
+@cached(vias_utilizadas_args)
 @marshal_with(vias_fields)
 def vias_utilizadas():
-    """Retorna as vias e a quantidade de vezes que foram usadas em um estado."""
+    """Retorna as vias e a quantidade de vezes que foram usadas em um estado e ano."""
     args = vias_utilizadas_args.parse_args(strict=True)
-
-    db = SQLAlchemy.get_instance()
-
-    entries = (
-        db.session.query(
-            db.func.count(ImportacaoModel.via_id).label("qtd"),
-            ImportacaoModel.via_id.label("via_id")
-        )
-        .join(ViaModel, ImportacaoModel.via_id == ViaModel.id)
-        .filter(ImportacaoModel.ano == args["ano"], ImportacaoModel.uf_id == args["uf_id"])
-        .group_by(ImportacaoModel.via_id)
-        .all()
-    )
-
-    return entries
-
+    return queries.vias_utilizadas(args["uf_id"], args["ano"])
     # comando p/ testes CMD
     # curl -X POST http://127.0.0.1:5000/api/importacoes/vias-utilizadas -H "Content-Type: application/json" -d "{\"ano\": 2023, \"uf_id\": 12}"
 
-@importacoes.route("/api/importacoes/urfs-utilizadas", methods=["POST"])
+
+@importacoes.route("/api/importacoes/urfs-utilizadas", methods=["GET", "POST"])
+@conditional(urf_utilizadas_args)
+@cached(urf_utilizadas_args)
 @marshal_with(urfs_fields)
 def urfs_utilizadas():
-    """Retorna as URFs e a quantidade de vezes que foram usadas."""
+    """Retorna as URFs e a quantidade de vezes que foram usadas em um estado e ano."""
     args = urf_utilizadas_args.parse_args(strict=True)
-
-    db = SQLAlchemy.get_instance()
-
-    entries = (
-        db.session.query(
-            ImportacaoModel.urf_id.label("urf_id"),
-            db.func.count(ImportacaoModel.urf_id).label("qtd")
-        )
-        .filter(
-            ImportacaoModel.ano == args["ano"],
-            ImportacaoModel.uf_id == args["uf_id"]
-        )
-        .group_by(ImportacaoModel.urf_id)
-        .all()
-    )
-
-    return entries
-
+    return queries.urfs_utilizadas(args["uf_id"], args["ano"])
     # comando p/ testes CMD
-    # curl -X POST http://127.0.0.1:5000/api/exportacoes/urfs-utilizadas -H "Content-Type: application/json" -d "{\"ano\": 2023, \"uf_id\": 12}"
+    # curl -X POST http://127.0.0.1:5000/api/importacoes/urfs-utilizadas -H "Content-Type: application/json" -d "{\"ano\": 2023, \"uf_id\": 12}"
 
 
 @importacoes.route("/api/importacoes/download", methods=["GET"])
@@ -213,10 +97,3 @@ def download_exportacoes():
         download_name="importacoes.csv",
     )
 
-
-def _filter_year_or_period(query, year_end: int, year_start: int = None):
-    """Add year or period filtering to a query."""
-    if year_start:
-        return query.filter(ImportacaoModel.ano.between(year_start, year_end))
-    return query.filter(ImportacaoModel.ano == year_end)
-
@@ -1,10 +1,14 @@
-from flask import Blueprint, request
-from flask_restful import marshal_with, fields
-from sqlalchemy import func
+from flask import Blueprint, current_app, request
+from flask_restful import abort, marshal_with, fields
+from sqlalchemy import func, literal, select, union_all
+from .. import colunar
+from ..cache import cached
+from ..conditional import conditional
 from ..fields import balanca_comercial_fields
 from ..request import balanca_comercial_args
 from src.importacoes.model import ImportacaoModel
 from src.exportacoes.model import ExportacaoModel
+from src.resumos import consultas as resumos
 from src.utils.sqlalchemy import SQLAlchemy
 
 main = Blueprint("main", __name__)
@@ -14,51 +18,82 @@ balanca_comercial_response_fields = {
     "balanca": fields.List(fields.Nested(balanca_comercial_fields))
 }
 
-@main.route("/api/balanca-comercial", methods=["POST"])
+@main.route("/api/balanca-comercial", methods=["GET", "POST"])
+@conditional(balanca_comercial_args)
+@cached(balanca_comercial_args)
 @marshal_with(balanca_comercial_response_fields)
 def calcular_balanca_comercial():
-    """Calcula a balança comercial (exportação - importação) por ano para um estado."""
+    """Calcula a balança comercial (exportação - importação) por ano, ou mês, de um ou mais estados."""
     args = balanca_comercial_args.parse_args(strict=True)
+
+    uf_ids = list(args["uf_ids"] or [])
+    if args["uf_id"] is not None:
+        uf_ids.append(args["uf_id"])
+    if not uf_ids:
+        abort(400, message="Informe uf_id ou uf_ids.")
+
+    mensal = args["granularidade"] == "mensal"
+    filtros = (uf_ids, args["ano_inicial"], args["ano_final"], mensal)
+
+    # do motor colunar, se carregado; dos resumos, se existirem; senão uma única agregação sobre as transações
+    resultado = colunar.balanca(*filtros)
+    if resultado is None:
+        resultado = resumos.balanca(*filtros) if resumos.disponivel() else _balanca_transacoes(*filtros)
+
+    return {"balanca": resultado}
+
+
+def _balanca_transacoes(uf_ids, ano_inicial=None, ano_final=None, mensal=False):
+    """Mesma saída de `resumos.balanca`, com `UNION ALL` das duas tabelas de transações."""
     db = SQLAlchemy.get_instance()
 
-    uf_id = args["uf_id"]
+    def parcial(model, exportado, importado):
+        chaves = [model.uf_id, model.ano] + ([model.mes] if mensal else [])
+        query = select(
+            *chaves,
+            (model.valor if exportado else literal(0)).label("exportado"),
+            (model.valor if importado else literal(0)).label("importado"),
+        ).where(model.uf_id.in_(uf_ids))
+        if ano_inicial is not None:
+            query = query.where(model.ano >= ano_inicial)
+        if ano_final is not None:
+            query = query.where(model.ano <= ano_final)
+        return query
 
-    # Importações por ano
-    importacoes = db.session.query(
-        ImportacaoModel.ano,
-        func.sum(ImportacaoModel.valor).label("total")
-    ).filter(
-        ImportacaoModel.uf_id == uf_id
-    ).group_by(
-        ImportacaoModel.ano
-    ).all()
+    transacoes = union_all(
+        parcial(ExportacaoModel, exportado=True, importado=False),
+        parcial(ImportacaoModel, exportado=False, importado=True),
+    ).subquery()
 
-    # Exportações por ano
-    exportacoes = db.session.query(
-        ExportacaoModel.ano,
-        func.sum(ExportacaoModel.valor).label("total")
-    ).filter(
-        ExportacaoModel.uf_id == uf_id
-    ).group_by(
-        ExportacaoModel.ano
+    chaves = [transacoes.c.uf_id, transacoes.c.ano] + ([transacoes.c.mes] if mensal else [])
+    exportado = func.coalesce(func.sum(transacoes.c.exportado), 0)
+    importado = func.coalesce(func.sum(transacoes.c.importado), 0)
+    return db.session.execute(
+        select(
+            *chaves,
+            exportado.label("total_exportado"),
+            importado.label("total_importado"),
+            (exportado - importado).label("valor"),
+        )
+        .group_by(*chaves)
+        .order_by(*chaves)
     ).all()
 
-    # Transformar em dicionário 
-    dict_importacoes = {i.ano: i.total for i in importacoes}
-    dict_exportacoes = {e.ano: e.total for e in exportacoes}
 
-   
-    anos = sorted(set(dict_importacoes.keys()) | set(dict_exportacoes.keys()))
+@main.route("/api/cache", methods=["GET"])
+def cache_stats():
+    """Contadores do cache de respostas e do single-flight das rotas de análise."""
+    cache = current_app.extensions.get("response_cache")
+    single_flight = current_app.extensions.get("single_flight")
+    stats = cache.stats() if cache is not None else {"habilitado": False}
+    stats["single_flight"] = single_flight.stats() if single_flight is not None else {"habilitado": False}
+    return stats
 
-    resultado = []
-    for ano in anos:
-        total_exportado = dict_exportacoes.get(ano, 0) or 0
-        total_importado = dict_importacoes.get(ano, 0) or 0
-        balanca = total_exportado - total_importado
 
-        resultado.append({
-            "ano": ano,
-            "valor": balanca
-        })
-
-    return {"balanca": resultado}
+@main.route("/api/expurgos/<int:id>", methods=["GET"])
+def expurgo_status(id):
+    """Progresso de um expurgo assíncrono (de qualquer worker)."""
+    expurgo = current_app.extensions["expurgos"].obter(id)
+    if expurgo is None:
+        abort(404, message="Nenhum expurgo encontrado.")
+    return {"expurgo": expurgo.to_dict()}
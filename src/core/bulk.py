@@ -0,0 +1,130 @@
+"""Bulk ingestion of transactions (`POST /api/<fluxo>/bulk`).
+
+The body is a JSON array or an NDJSON stream (`Content-Type:
+application/x-ndjson`) of up to `APP_BULK_MAX_LINHAS` rows with the fields of
+the single-row endpoint. Every row is validated in one pass (types and
+required fields from the resource's `model_args`, foreign keys against the
+in-memory id sets of `src.core.dimensoes`), then all of them are inserted with one
+executemany in one transaction, together with the summaries and the dataset
+version. Errors are reported by row index (0-based) and, by default, nothing
+is inserted when any row fails; `?parcial=true` inserts the valid rows.
+"""
+
+import json
+import pandas as pd
+from flask import current_app, request
+from flask_restful import abort, inputs, reqparse
+from sqlalchemy import insert
+from src.importers import resumos
+from src.resumos import consultas
+from src.utils.sqlalchemy import SQLAlchemy
+from .cache import incrementar_versao
+from .dimensoes import CHAVES_ESTRANGEIRAS, existentes
+
+MAX_LINHAS = 50_000  # default for APP_BULK_MAX_LINHAS
+MIMETYPE_NDJSON = "application/x-ndjson"
+
+"""
+    Argumentos da ingestão em lote
+    parcial:bool    -  Insere as linhas válidas mesmo que outras tenham erros
+"""
+bulk_args = reqparse.RequestParser()
+bulk_args.add_argument("parcial", type=inputs.boolean, location="args", required=False, default=False, help="parcial deve ser true ou false.")
+
+
+def _ler_linhas(max_linhas):
+    """Rows of the body, as a list of `(indice, linha)`, and the errors of the rows that are not JSON."""
+    linhas, erros = [], []
+    if request.mimetype == MIMETYPE_NDJSON:
+        indice = 0
+        for texto in request.stream:
+            if not texto.strip():
+                continue
+            if indice >= max_linhas:
+                abort(413, message=f"No máximo {max_linhas} linhas por requisição.")
+            try:
+                linhas.append((indice, json.loads(texto)))
+            except ValueError:
+                erros.append({"indice": indice, "erros": ["Linha não é um JSON válido."]})
+            indice += 1
+        return linhas, erros
+
+    corpo = request.get_json(silent=True)
+    if not isinstance(corpo, list):
+        abort(400, message=f"O corpo deve ser um array JSON ou NDJSON ({MIMETYPE_NDJSON}).")
+    if len(corpo) > max_linhas:
+        abort(413, message=f"No máximo {max_linhas} linhas por requisição.")
+    return list(enumerate(corpo)), erros
+
+
+def _validar(linha, argumentos):
+    """Converted values and error messages of one row, following the resource's `model_args`."""
+    if not isinstance(linha, dict):
+        return None, ["A linha deve ser um objeto JSON."]
+
+    valores, erros = {}, []
+    for desconhecido in linha.keys() - argumentos.keys():
+        erros.append(f"Argumento desconhecido: {desconhecido}.")
+    for nome, argumento in argumentos.items():
+        valor = linha.get(nome)
+        if valor is None:
+            if argumento.required:
+                erros.append(argumento.help)
+            valores[nome] = None
+            continue
+        try:
+            valores[nome] = argumento.type(valor)
+        except (TypeError, ValueError):
+            erros.append(argumento.help)
+    valores.pop("id", None)  # opcional e não utilizado, como no POST unitário
+    return valores, erros
+
+
+def inserir_em_lote(model, fluxo, model_args):
+    """Validate and insert the rows of the request body into `model`'s table.
+
+    Returns:
+        tuple: response of the resource's `post`.
+    """
+    args = bulk_args.parse_args()
+    max_linhas = int(current_app.config.get("BULK_MAX_LINHAS", MAX_LINHAS))
+    linhas, erros = _ler_linhas(max_linhas)
+    argumentos = {argumento.name: argumento for argumento in model_args.args}
+
+    validas = []
+    for indice, linha in linhas:
+        valores, erros_linha = _validar(linha, argumentos)
+        if erros_linha:
+            erros.append({"indice": indice, "erros": erros_linha})
+        else:
+            validas.append((indice, valores))
+
+    # FKs: os ids de todas as linhas conferidos nos conjuntos em memória (nulas são aceitas, como no POST unitário)
+    ids = {coluna: {valores[coluna] for _, valores in validas} for coluna in CHAVES_ESTRANGEIRAS}
+    encontrados = existentes(ids)
+    registros = []
+    for indice, valores in validas:
+        erros_linha = [
+            f"{nome} não encontrado."
+            for coluna, (_, nome) in CHAVES_ESTRANGEIRAS.items()
+            if valores[coluna] is not None and valores[coluna] not in encontrados[coluna]
+        ]
+        if erros_linha:
+            erros.append({"indice": indice, "erros": erros_linha})
+        else:
+            registros.append(valores)
+
+    erros.sort(key=lambda erro: erro["indice"])
+    if erros and not args["parcial"]:
+        abort(400, message="Nenhuma linha foi inserida.", erros=erros)
+
+    if registros:
+        session = SQLAlchemy.get_instance().session
+        conn = session.connection()
+        conn.execute(insert(model.__table__), registros)
+        if consultas.disponivel():
+            resumos.acumular(conn, fluxo, pd.DataFrame(registros))
+        incrementar_versao(session, {(fluxo, valores["uf_id"], valores["ano"]) for valores in registros})
+        session.commit()
+
+    return {"data": {"inseridas": len(registros), "erros": erros}}, 201 if registros else 200
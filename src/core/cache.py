@@ -0,0 +1,442 @@
+"""Response cache for the analytics routes.
+
+Entries are keyed by endpoint, normalized parsed arguments and the dataset
+version. The version lives in the `dataset_versao` table and is bumped in the
+same transaction as every import commit and every transaction of the app's
+(Flask-SQLAlchemy) sessions that changes rows (bumped on its first flush, which
+includes the one inside `commit()`), so an entry built before a change can
+never be served after it. Each bump also
+records in `dataset_alteracoes` the `(fluxo, uf_id, ano)` blocks of the
+transactions it changed (or a row without a block when anything may have
+changed: imports, purges, dimension changes), so the columnar engine
+(`src.core.colunar`) only sends the changed blocks to SQL.
+
+Responses are kept in an in-process LRU (`APP_CACHE_MAX_ENTRIES`, 0 disables
+the cache) and, optionally, in a shared backend: Redis when
+`APP_CACHE_REDIS_URL` is set (requires `pip install redis`), or any object with
+the `LocalBackend` interface.
+
+On a miss, identical concurrent requests (same key) are coalesced by
+`SingleFlight`: one thread runs the view and the others wait for its result,
+so a burst of identical dashboard requests costs one query (`APP_SINGLE_FLIGHT`,
+enabled by default; works with the threaded dev server and gthread workers).
+"""
+
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Optional
+from flask import Flask, current_app, has_app_context, request
+from flask_sqlalchemy.session import Session as FlaskSession
+from sqlalchemy import BigInteger, DateTime, Integer, String, delete, event, insert, inspect, select, update
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Mapped, Session, mapped_column
+from src.core.base import BaseModel
+from src.utils.sqlalchemy import SQLAlchemy
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+MAX_ENTRIES = 1024  # default for APP_CACHE_MAX_ENTRIES
+ESPERA_SINGLE_FLIGHT = 30  # default for APP_SINGLE_FLIGHT_ESPERA (seconds)
+REDIS_TTL = 24 * 60 * 60  # seconds; old versions simply stop being requested
+
+
+class DatasetVersaoModel(BaseModel):
+    """Versão dos dados servidos pela API, incrementada a cada alteração."""
+
+    __tablename__ = "dataset_versao"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    versao: Mapped[int] = mapped_column(BigInteger, default=0)
+    # UTC, usado como `Last-Modified` das rotas GET
+    atualizado_em: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+
+class DatasetAlteracaoModel(BaseModel):
+    """Blocos de transações alterados por cada versão do dataset (sem bloco: tudo pode ter mudado)."""
+
+    __tablename__ = "dataset_alteracoes"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    versao: Mapped[int] = mapped_column(BigInteger, index=True)
+    fluxo: Mapped[Optional[str]] = mapped_column(String(15), nullable=True)
+    uf_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    ano: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+
+
+# tabelas de fatos cujas linhas são registradas por bloco em `dataset_alteracoes`
+FLUXOS = ("exportacoes", "importacoes")
+
+
+def criar_tabela(engine):
+    DatasetVersaoModel.__table__.create(bind=engine, checkfirst=True)
+    DatasetAlteracaoModel.__table__.create(bind=engine, checkfirst=True)
+
+
+def versao_atual(session):
+    """Current dataset version, or None when the table does not exist yet."""
+    table = DatasetVersaoModel.__table__
+    try:
+        return session.execute(select(table.c.versao).where(table.c.id == 1)).scalar() or 0
+    except DBAPIError:
+        session.rollback()
+        return None
+
+
+def estado_dataset(session):
+    """`(versao, atualizado_em)` of the dataset, or None when the table does not exist yet."""
+    table = DatasetVersaoModel.__table__
+    try:
+        linha = session.execute(select(table.c.versao, table.c.atualizado_em).where(table.c.id == 1)).first()
+    except DBAPIError:
+        session.rollback()
+        return None
+    return tuple(linha) if linha is not None else (0, None)
+
+
+def incrementar_versao(conn, blocos=None):
+    """Bump the dataset version inside the caller's transaction (Connection or Session).
+
+    Args:
+        blocos (iterable): `(fluxo, uf_id, ano)` of the transactions changed by the
+            caller; None when anything may have changed.
+
+    Returns:
+        int: the new version.
+    """
+    sessao = conn if isinstance(conn, Session) else None
+    if sessao is not None:
+        conn = sessao.connection()
+    table = DatasetVersaoModel.__table__
+    agora = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+    resultado = conn.execute(
+        update(table).where(table.c.id == 1).values(versao=table.c.versao + 1, atualizado_em=agora)
+    )
+    if resultado.rowcount == 0:
+        conn.execute(insert(table).values(id=1, versao=1, atualizado_em=agora))
+    versao = conn.execute(select(table.c.versao).where(table.c.id == 1)).scalar()
+    registrar_alteracoes(conn, versao, blocos)
+    if sessao is not None:
+        sessao.info["dataset_versionado"] = versao  # uma vez por transação (ver `_versionar_flush`)
+    return versao
+
+
+def registrar_alteracoes(conn, versao, blocos=None):
+    """Record the blocks changed by `versao` (see `incrementar_versao`).
+
+    A row without a block also drops the older rows: a snapshot older than it
+    has to be reloaded anyway.
+    """
+    table = DatasetAlteracaoModel.__table__
+    if blocos is None:
+        conn.execute(delete(table).where(table.c.versao < versao))
+        conn.execute(insert(table).values(versao=versao))
+        return
+    linhas = [{"versao": versao, "fluxo": fluxo, "uf_id": uf_id, "ano": ano} for fluxo, uf_id, ano in set(blocos)]
+    if linhas:
+        conn.execute(insert(table), linhas)
+
+
+class LocalBackend:
+    """In-process stand-in for a shared backend (same interface as `RedisBackend`)."""
+
+    def __init__(self):
+        self.dados = {}
+
+    def get(self, key):
+        return self.dados.get(key)
+
+    def set(self, key, value):
+        self.dados[key] = value
+
+
+class RedisBackend:
+    """Shared backend storing the JSON-encoded responses in Redis."""
+
+    def __init__(self, url, prefixo="comex:cache:"):
+        if redis is None:
+            raise RuntimeError("APP_CACHE_REDIS_URL requer o pacote 'redis' (pip install redis).")
+        self.cliente = redis.Redis.from_url(url)
+        self.prefixo = prefixo
+
+    def get(self, key):
+        valor = self.cliente.get(self.prefixo + key)
+        return valor.decode() if valor is not None else None
+
+    def set(self, key, value):
+        self.cliente.set(self.prefixo + key, value, ex=REDIS_TTL)
+
+
+class ResponseCache:
+    """LRU with a size cap in front of an optional shared backend.
+
+    Counters: `hits` (LRU or backend), `misses` and `evictions` (LRU only).
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, backend=None):
+        self.max_entries = max_entries
+        self.backend = backend
+        self.entradas = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key):
+        with self.lock:
+            if key in self.entradas:
+                self.entradas.move_to_end(key)
+                self.hits += 1
+                return self.entradas[key]
+
+        valor = None
+        if self.backend is not None:
+            serializado = self.backend.get(key)
+            if serializado is not None:
+                valor = json.loads(serializado)
+                self._guardar(key, valor)
+
+        with self.lock:
+            if valor is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return valor
+
+    def set(self, key, value):
+        self._guardar(key, value)
+        if self.backend is not None:
+            self.backend.set(key, json.dumps(value))
+
+    def _guardar(self, key, value):
+        with self.lock:
+            self.entradas[key] = value
+            self.entradas.move_to_end(key)
+            while len(self.entradas) > self.max_entries:
+                self.entradas.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                "entradas": len(self.entradas),
+                "max_entradas": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class _Chamada:
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado = None
+        self.erro = None
+
+
+class SingleFlight:
+    """Run concurrent calls with the same key once, sharing the result (or the exception).
+
+    Counters: `execucoes` (calls actually run), `coalescidas` (calls served by
+    another thread's execution, i.e. queries saved) and `expiradas` (waits that
+    gave up after `espera` seconds and ran the call themselves).
+    """
+
+    def __init__(self, espera=ESPERA_SINGLE_FLIGHT):
+        self.espera = espera
+        self.em_andamento = {}
+        self.lock = threading.Lock()
+        self.execucoes = self.coalescidas = self.expiradas = 0
+
+    def executar(self, key, funcao):
+        with self.lock:
+            chamada = self.em_andamento.get(key)
+            lider = chamada is None
+            if lider:
+                chamada = self.em_andamento[key] = _Chamada()
+                self.execucoes += 1
+
+        if lider:
+            try:
+                chamada.resultado = funcao()
+            except BaseException as erro:
+                chamada.erro = erro
+                raise
+            finally:
+                with self.lock:
+                    del self.em_andamento[key]
+                chamada.evento.set()
+            return chamada.resultado
+
+        if not chamada.evento.wait(self.espera):
+            with self.lock:
+                self.expiradas += 1
+                self.execucoes += 1
+            return funcao()
+        with self.lock:
+            self.coalescidas += 1
+        if chamada.erro is not None:
+            raise chamada.erro
+        return chamada.resultado
+
+    def stats(self):
+        with self.lock:
+            return {
+                "execucoes": self.execucoes,
+                "coalescidas": self.coalescidas,
+                "expiradas": self.expiradas,
+                "em_andamento": len(self.em_andamento),
+            }
+
+
+def init_cache(app: Flask) -> None:
+    """Create the app's response cache and single-flight, and track ORM changes to the dataset."""
+    max_entries = int(app.config.get("CACHE_MAX_ENTRIES", MAX_ENTRIES))
+    backend = None
+    if app.config.get("CACHE_REDIS_URL"):
+        backend = RedisBackend(app.config["CACHE_REDIS_URL"])
+    app.extensions["response_cache"] = ResponseCache(max_entries, backend) if max_entries > 0 else None
+
+    espera = float(app.config.get("SINGLE_FLIGHT_ESPERA", ESPERA_SINGLE_FLIGHT))
+    app.extensions["single_flight"] = SingleFlight(espera) if app.config.get("SINGLE_FLIGHT", True) else None
+
+    # sessões do Flask-SQLAlchemy (`db.session` e as de `db.create_session`) que alterem linhas
+    if not event.contains(FlaskSession, "after_flush", _versionar_flush):
+        event.listen(FlaskSession, "after_flush", _versionar_flush)
+        event.listen(FlaskSession, "after_commit", _concluir_transacao)
+        event.listen(FlaskSession, "after_soft_rollback", _descartar_transacao)
+
+    with app.app_context():
+        _criar_tabelas(app)
+
+
+def _criar_tabelas(app):
+    """Create the version tables of `app` once: at startup or, when the database could not
+    be reached then, on the first flush that changes rows.
+
+    Returns:
+        bool: whether the tables exist.
+    """
+    if not app.extensions.get("dataset_tabelas"):
+        try:
+            criar_tabela(SQLAlchemy.get_instance().engine)
+        except DBAPIError:
+            app.logger.warning("Tabelas da versão do dataset não criadas; nova tentativa na próxima escrita.")
+            return False
+        app.extensions["dataset_tabelas"] = True
+    return True
+
+
+def _blocos_alterados(session):
+    """`(fluxo, uf_id, ano)` before and after the flush of the transactions in it, or None
+    when it also changes other rows."""
+    blocos = set()
+    for instancia in (*session.new, *session.dirty, *session.deleted):
+        fluxo = getattr(instancia, "__tablename__", None)
+        if fluxo not in FLUXOS:
+            return None
+        atributos = inspect(instancia).attrs
+        valores = {}
+        for nome in ("uf_id", "ano"):
+            historico = atributos[nome].history
+            valores[nome] = {*historico.added, *historico.unchanged, *historico.deleted}
+        blocos.update((fluxo, uf_id, ano) for uf_id in valores["uf_id"] for ano in valores["ano"])
+    return blocos
+
+
+def _versionar_flush(session, flush_context):
+    """Bump the version in the transaction of the first flush that changes rows, recording
+    the changed blocks of every flush.
+
+    `after_flush` also runs for the flush inside `commit()`, so `add()` + `commit()`
+    without an explicit flush is covered.
+    """
+    if not (session.new or session.dirty or session.deleted):
+        return
+    if not _criar_tabelas(current_app._get_current_object()):
+        return
+    conn = session.connection()
+    blocos = _blocos_alterados(session)
+    if session.info.get("dataset_versionado"):
+        registrar_alteracoes(conn, session.info["dataset_versionado"], blocos)
+    else:
+        incrementar_versao(session, blocos)
+
+
+def _concluir_transacao(session):
+    if session.info.pop("dataset_versionado", False) and has_app_context():
+        # a próxima leitura da versão neste processo vai ao banco (ETag, dimensões)
+        estado = current_app.extensions.get("dataset_estado")
+        if estado is not None:
+            estado.expirar()
+
+
+def _descartar_transacao(session, previous_transaction):
+    session.info.pop("dataset_versionado", None)
+
+
+def _versao(estados, recarregar=False):
+    """Dataset version from the app's `EstadoDataset`, or from the database without one."""
+    if estados is None:
+        return versao_atual(SQLAlchemy.get_instance().session)
+    estado = estados.atual(recarregar)
+    return estado[0] if estado is not None else None
+
+
+def cached(parser):
+    """Cache the (marshalled) response of a view by endpoint, parsed args and dataset version,
+    coalescing identical concurrent misses into one execution of the view.
+
+    Hits are looked up with the in-process copy of the version (`EstadoDataset`,
+    refreshed every `APP_HTTP_VERSAO_TTL` seconds); only a miss reads it from the
+    database before running the view.
+
+    Must be applied above `marshal_with`, so the cached value is the final payload.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = current_app.extensions.get("response_cache")
+            single_flight = current_app.extensions.get("single_flight")
+            if cache is None and single_flight is None:
+                return view(*args, **kwargs)
+
+            argumentos = json.dumps(parser.parse_args(strict=True), sort_keys=True, default=str)
+            # versão pela cópia com TTL de `src.core.conditional` (a mesma que o motor colunar lê)
+            estados = current_app.extensions.get("dataset_estado")
+            versao = _versao(estados)
+            if versao is None:
+                cache = None  # sem versão não há como invalidar: só coalesce
+
+            key = f"{request.endpoint}:{versao}:{argumentos}"
+            resposta = cache.get(key) if cache is not None else None
+            if resposta is not None:
+                return resposta
+
+            if cache is not None and estados is not None:
+                # miss: a versão do banco, para não guardar dados novos numa versão antiga
+                recarregada = _versao(estados, recarregar=True)
+                if recarregada is None:
+                    cache = None
+                elif recarregada != versao:
+                    key = f"{request.endpoint}:{recarregada}:{argumentos}"
+                    resposta = cache.get(key)
+                    if resposta is not None:
+                        return resposta
+
+            def calcular():
+                resposta = view(*args, **kwargs)
+                if cache is not None:
+                    cache.set(key, resposta)
+                return resposta
+
+            return single_flight.executar(key, calcular) if single_flight is not None else calcular()
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,500 @@
+"""In-memory columnar engine of the analytics routes.
+
+With `APP_ANALYTICS_COLUNAR` enabled, `exportacoes` and `importacoes` are
+loaded into NumPy arrays (one per column, `SCHEMA` widths) sorted by
+`(uf_id, ano, mes)`, with an offset index of the `(uf_id, ano)` blocks. At
+load time every block also gets its rows pre-sorted for the paginated routes
+and its aggregates (via/URF counts, totals by month), so each analytics route
+becomes a slice of those arrays, without touching the database.
+
+The snapshot is tied to the dataset version of `src.core.cache`. Writes
+through the API record the `(fluxo, uf_id, ano)` blocks they change
+(`dataset_alteracoes`): requests on those blocks go to SQL and every other
+block is still served by the snapshot. When a bump may have changed anything
+(an import chunk, a purge, a dimension change), requests go back to SQL and
+the snapshot is rebuilt in a background thread once the version has been
+stable for `APP_ANALYTICS_COLUNAR_ESPERA` seconds, i.e. after the import
+completes. The version is read from the in-process copy of
+`src.core.conditional` (`EstadoDataset`), refreshed by the response cache
+before each miss, so answering from the snapshot costs no extra query.
+
+With `APP_ANALYTICS_ARQUIVO` the arrays come instead from a file built by
+`flask comex agregados` (see `src.core.agregados`), mapped read-only and
+shared by every worker process. Instead of reloading, one worker regenerates
+the file (the others skip it while they can't take its lock) and every
+worker remaps it.
+"""
+
+import os
+import threading
+import time
+from decimal import Decimal
+import numpy as np
+from flask import Flask, current_app
+from sqlalchemy import func, select
+from sqlalchemy.exc import DBAPIError
+from src.exportacoes.model import ExportacaoModel
+from src.importacoes.model import ImportacaoModel
+from src.ncms.model import NCMModel
+from src.utils.sqlalchemy import SQLAlchemy
+from . import dimensoes
+from .cache import DatasetAlteracaoModel, versao_atual
+from .pagination import Cursor
+
+try:
+    import fcntl
+except ImportError:  # sem `flock` (Windows): cada worker gera o arquivo
+    fcntl = None
+
+ESPERA = 30  # default for APP_ANALYTICS_COLUNAR_ESPERA (seconds)
+LINHAS_POR_LEITURA = 50_000
+
+SCHEMA = {
+    "id": "int32",
+    "ano": "int16",
+    "mes": "int8",
+    "uf_id": "int16",
+    "ncm_id": "int32",
+    "ue_id": "int16",
+    "pais_id": "int16",
+    "via_id": "int16",
+    "urf_id": "int32",
+    "peso": "int64",
+    "valor": "int64",
+}
+CHAVES_ESTRANGEIRAS = ("uf_id", "ncm_id", "ue_id", "pais_id", "via_id", "urf_id")  # NULL -> 0
+CONTAGENS = ("via_id", "urf_id")
+
+# arrays derivados das colunas, guardados junto com elas (ver `TabelaColunar.arrays`)
+DERIVADOS = (
+    "valor_agregado_escalado",
+    "sem_valor_agregado",
+    "com_ncm",
+    "indice_chaves",
+    "indice_offsets",
+    "ordem_peso",
+    "ordem_valor_agregado",
+    "ordem_offsets",
+    "totais_chaves",
+    "totais_valor",
+) + tuple(f"contagem_{nome}{sufixo}" for nome in CONTAGENS for sufixo in ("", "_qtd", "_offsets"))
+
+MODELS = {
+    "exportacoes": ExportacaoModel,
+    "importacoes": ImportacaoModel,
+}
+
+CAMPOS_VALOR_AGREGADO = (
+    "id", "ano", "mes", "peso", "valor", "valor_agregado",
+    "ncm_id", "ue_id", "pais_id", "uf_id", "via_id", "urf_id",
+)
+CAMPOS_CARGAS = ("id", "ano", "mes", "peso", "ncm_id", "uf_id", "valor_agregado", "pais_id", "via_id")
+
+
+class TabelaColunar:
+    """One flow direction held as NumPy columns.
+
+    `valor_agregado` is kept in fixed point (`valor_agregado_escalado`, times
+    `ESCALA`, as the `NUMERIC(20, 4)` column), so keys and cursors compare
+    exactly with the SQL path.
+    """
+
+    ESCALA = 10_000
+
+    def __init__(self, colunas, descricoes_ncm):
+        """
+        Args:
+            colunas (dict): column name -> array, for every column of `SCHEMA`.
+            descricoes_ncm (np.ndarray): NCM descriptions indexed by id (None where missing).
+        """
+        ordem = np.lexsort((colunas["mes"], colunas["ano"], colunas["uf_id"]))
+        for nome, tipo in SCHEMA.items():
+            setattr(self, nome, np.ascontiguousarray(colunas[nome][ordem], dtype=tipo))
+
+        # valor / NULLIF(peso, 0), arredondado como o DECIMAL do MySQL
+        self.sem_valor_agregado = self.peso == 0
+        divisor = np.where(self.sem_valor_agregado, 1, self.peso)
+        self.valor_agregado_escalado = (self.valor * (2 * self.ESCALA) + divisor) // (2 * divisor)
+        self.valor_agregado_escalado[self.sem_valor_agregado] = 0  # NULLs empatam e seguem por id
+
+        # mesmas linhas do INNER JOIN com ncms do SQL
+        self.descricoes_ncm = descricoes_ncm
+        ncm_ids = self.ncm_id.astype("int64")
+        existe = (ncm_ids > 0) & (ncm_ids < len(descricoes_ncm))
+        self.com_ncm = existe.copy()
+        self.com_ncm[existe] = descricoes_ncm[ncm_ids[existe]] != None  # noqa: E711
+
+        # índice: início de cada bloco (uf_id, ano) e o fim do último
+        chaves = self._chave(self.uf_id.astype("int64"), self.ano.astype("int64"))
+        inicios = self._inicios_grupos(chaves)
+        self.indice_chaves = chaves[inicios]
+        self.indice_offsets = np.append(inicios, len(chaves))
+        blocos = np.repeat(np.arange(len(inicios)), np.diff(self.indice_offsets))
+
+        # linhas de cada bloco já na ordem das páginas: (chave DESC, id DESC), NULLs por último
+        posicoes = np.flatnonzero(self.com_ncm)
+        nulos = np.zeros(len(self.id), bool)
+        for nome, chave, nulos_chave in (
+            ("peso", self.peso, nulos),
+            ("valor_agregado", self.valor_agregado_escalado, self.sem_valor_agregado),
+        ):
+            ordem = np.lexsort((-self.id[posicoes], -chave[posicoes], nulos_chave[posicoes], blocos[posicoes]))
+            setattr(self, f"ordem_{nome}", posicoes[ordem].astype("int32"))
+        self.ordem_offsets = np.searchsorted(blocos[posicoes], np.arange(len(inicios) + 1))
+
+        # contagens por bloco, da mais para a menos usada
+        for nome in CONTAGENS:
+            valores = getattr(self, nome).astype("int64")
+            usadas = valores > 0
+            base = valores.max(initial=0) + 1
+            pares, qtds = np.unique(blocos[usadas] * base + valores[usadas], return_counts=True)
+            blocos_pares, ids = np.divmod(pares, base)
+            ordem = np.lexsort((ids, -qtds, blocos_pares))
+            setattr(self, f"contagem_{nome}", ids[ordem])
+            setattr(self, f"contagem_{nome}_qtd", qtds[ordem])
+            setattr(self, f"contagem_{nome}_offsets", np.searchsorted(blocos_pares[ordem], np.arange(len(inicios) + 1)))
+
+        # totais por (uf_id, ano, mes): as linhas já estão agrupadas nessa ordem
+        chaves_mes = chaves * 100 + self.mes
+        inicios = self._inicios_grupos(chaves_mes)
+        self.totais_chaves = chaves_mes[inicios]
+        self.totais_valor = np.add.reduceat(self.valor, inicios) if len(inicios) else np.array([], "int64")
+
+    @classmethod
+    def de_arrays(cls, arrays, descricoes_ncm):
+        """Rebuild a table from `arrays()` (e.g. mapped from the shared file) without recomputing."""
+        tabela = cls.__new__(cls)
+        for nome, array in arrays.items():
+            setattr(tabela, nome, array)
+        tabela.descricoes_ncm = descricoes_ncm
+        return tabela
+
+    def arrays(self):
+        """Every column and derived array, by name."""
+        return {nome: getattr(self, nome) for nome in (*SCHEMA, *DERIVADOS)}
+
+    @staticmethod
+    def _chave(uf_id, ano):
+        return uf_id * 10_000 + ano
+
+    @staticmethod
+    def _inicios_grupos(chaves):
+        if not len(chaves):
+            return np.array([], "int64")
+        return np.flatnonzero(np.r_[True, chaves[1:] != chaves[:-1]])
+
+    @classmethod
+    def carregar(cls, conn, model, descricoes_ncm):
+        """Read the transactions of `model` in blocks of `LINHAS_POR_LEITURA` rows."""
+        colunas = [
+            func.coalesce(getattr(model, nome), 0) if nome in CHAVES_ESTRANGEIRAS else getattr(model, nome)
+            for nome in SCHEMA
+        ]
+        stmt = select(*colunas).order_by(model.id).execution_options(yield_per=LINHAS_POR_LEITURA)
+        blocos = {nome: [] for nome in SCHEMA}
+        for linhas in conn.execute(stmt).partitions():
+            bloco = np.array(linhas, dtype="int64")
+            for posicao, (nome, tipo) in enumerate(SCHEMA.items()):
+                blocos[nome].append(bloco[:, posicao].astype(tipo))
+        vazio = {nome: np.array([], dtype=tipo) for nome, tipo in SCHEMA.items()}
+        return cls(
+            {nome: np.concatenate(partes) if partes else vazio[nome] for nome, partes in blocos.items()},
+            descricoes_ncm,
+        )
+
+    def __len__(self):
+        return len(self.id)
+
+    def _blocos(self, uf_id, ano_inicial=None, ano_final=None):
+        """Range of `(uf_id, ano)` blocks in `[ano_inicial, ano_final]` (open ends allowed)."""
+        inicio = np.searchsorted(self.indice_chaves, self._chave(uf_id, ano_inicial or 0), "left")
+        fim = np.searchsorted(self.indice_chaves, self._chave(uf_id, ano_final or 9_999), "right")
+        return int(inicio), int(fim)
+
+    def _valor(self, nome, posicao):
+        if nome == "valor_agregado":
+            if self.sem_valor_agregado[posicao]:
+                return None
+            return Decimal(int(self.valor_agregado_escalado[posicao])).scaleb(-4)
+        valor = getattr(self, nome)[posicao].item()
+        return None if nome in CHAVES_ESTRANGEIRAS and valor == 0 else valor
+
+    def _linha(self, posicao, campos):
+        linha = {nome: self._valor(nome, posicao) for nome in campos}
+        linha["ncm_descricao"] = self.descricoes_ncm[self.ncm_id[posicao]]
+        return linha
+
+    def _pagina(self, nome_chave, uf_id, ano, ano_inicial, tamanho_pagina, cursor, campos):
+        """Same page as `pagination.paginate` over `(chave DESC, id DESC)`, NULLs last."""
+        cursor = cursor or Cursor()
+        if nome_chave == "valor_agregado":
+            chaves, nulos = self.valor_agregado_escalado, self.sem_valor_agregado
+        else:
+            chaves, nulos = getattr(self, nome_chave), None
+
+        inicio, fim = self._blocos(uf_id, ano_inicial or ano, ano)
+        ordem = getattr(self, f"ordem_{nome_chave}")[self.ordem_offsets[inicio] : self.ordem_offsets[fim]]
+        if fim - inicio > 1:
+            # vários anos: intercala as ordens já prontas de cada bloco
+            nulos_ordem = nulos[ordem] if nulos is not None else np.zeros(len(ordem), bool)
+            ordem = ordem[np.lexsort((-self.id[ordem], -chaves[ordem], nulos_ordem))]
+
+        if cursor.seek:
+            # a ordem é total: as linhas depois do cursor são um sufixo dela
+            ids = self.id[ordem]
+            nulos_ordem = nulos[ordem] if nulos is not None else np.zeros(len(ordem), bool)
+            if cursor.chave is None:
+                depois = nulos_ordem & (ids < cursor.id)
+            else:
+                chave = cursor.chave
+                if nome_chave == "valor_agregado":
+                    chave = int(Decimal(str(chave)).scaleb(4))
+                valores = chaves[ordem]
+                depois = (valores < chave) | ((valores == chave) & (ids < cursor.id)) | nulos_ordem
+            primeira = int(np.argmax(depois)) if depois.any() else len(ordem)
+        else:
+            primeira = (cursor.pagina - 1) * tamanho_pagina
+        pagina = ordem[primeira : primeira + tamanho_pagina + 1]
+
+        has_next = len(pagina) > tamanho_pagina
+        linhas = [self._linha(posicao, campos) for posicao in pagina[:tamanho_pagina]]
+        proximo_cursor = None
+        if has_next:
+            ultimo = linhas[-1]
+            proximo_cursor = Cursor(cursor.pagina + 1, ultimo[nome_chave], ultimo["id"]).encode()
+        return linhas, has_next, proximo_cursor
+
+    def valor_agregado(self, uf_id, ano, ano_inicial=None, tamanho_pagina=10, cursor=None):
+        return self._pagina("valor_agregado", uf_id, ano, ano_inicial, tamanho_pagina, cursor, CAMPOS_VALOR_AGREGADO)
+
+    def cargas_movimentadas(self, uf_id, ano, ano_inicial=None, tamanho_pagina=10, cursor=None):
+        return self._pagina("peso", uf_id, ano, ano_inicial, tamanho_pagina, cursor, CAMPOS_CARGAS)
+
+    def contagem(self, nome, uf_id, ano):
+        """`{nome, qtd}` of a UF in a year, most used first (same order as the SQL path)."""
+        inicio, fim = self._blocos(uf_id, ano, ano)
+        offsets = getattr(self, f"contagem_{nome}_offsets")
+        fatia = slice(int(offsets[inicio]), int(offsets[fim]))
+        ids = getattr(self, f"contagem_{nome}")[fatia]
+        qtds = getattr(self, f"contagem_{nome}_qtd")[fatia]
+        return [{nome: int(i), "qtd": int(q)} for i, q in zip(ids, qtds)]
+
+    def totais(self, uf_id, ano_inicial=None, ano_final=None, mensal=False):
+        """Sum of `valor` by `(ano, mes)` (mes None unless `mensal`) of a UF."""
+        inicio = np.searchsorted(self.totais_chaves, self._chave(uf_id, ano_inicial or 0) * 100, "left")
+        fim = np.searchsorted(self.totais_chaves, self._chave(uf_id, ano_final or 9_999) * 100 + 99, "right")
+        totais = {}
+        for chave, valor in zip(self.totais_chaves[inicio:fim].tolist(), self.totais_valor[inicio:fim].tolist()):
+            ano, mes = chave // 100 % 10_000, chave % 100
+            chave = (ano, mes if mensal else None)
+            totais[chave] = totais.get(chave, 0) + valor
+        return totais
+
+
+def carregar_tabelas(conn):
+    """Dataset version and `{fluxo: TabelaColunar}` read from one connection."""
+    versao = versao_atual(conn)
+    descricoes = dimensoes.obter(NCMModel, recarregar=True).coluna("descricao")
+    return versao, {fluxo: TabelaColunar.carregar(conn, model, descricoes) for fluxo, model in MODELS.items()}
+
+
+class MotorColunar:
+    """Snapshot of both flow directions, reloaded when a bump may have changed anything.
+
+    With `arquivo`, the snapshot is the shared file instead: it is remapped
+    when a new one replaces it, and regenerated (instead of reloaded) from the
+    database.
+    """
+
+    def __init__(self, app: Flask, espera=ESPERA, arquivo=None):
+        self.app = app
+        self.espera = espera
+        self.arquivo = arquivo
+        self.identidade_arquivo = None
+        self.snapshot = None  # (versão, {fluxo: TabelaColunar})
+        self.alteracoes = None  # (versão do snapshot, versão atual, blocos alterados ou None)
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def recarregar(self):
+        """Load both tables and the NCM descriptions from one connection and swap the snapshot."""
+        db = SQLAlchemy.get_instance()
+        with db.engine.connect() as conn:
+            self.snapshot = carregar_tabelas(conn)
+        return self.snapshot[1]
+
+    def abrir_arquivo(self):
+        """Map the shared file when it was replaced since the last call (or never opened)."""
+        from .agregados import abrir
+
+        try:
+            estado = os.stat(self.arquivo)
+        except FileNotFoundError:
+            return
+        identidade = (estado.st_ino, estado.st_mtime_ns)
+        with self.lock:
+            if identidade != self.identidade_arquivo:
+                self.snapshot = abrir(self.arquivo)
+                self.identidade_arquivo = identidade
+
+    def reconstruir_arquivo(self):
+        """Regenerate the shared file, unless another worker is doing it or already did."""
+        from .agregados import construir
+
+        with open(f"{self.arquivo}.lock", "w") as trava:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(trava, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return  # outro worker está gerando: o arquivo novo é remapeado no próximo pedido
+            self.abrir_arquivo()
+            with SQLAlchemy.get_instance().engine.connect() as conn:
+                versao = versao_atual(conn)
+            if self.snapshot is None or self._alterados(self.snapshot[0], versao) is None:
+                construir(self.arquivo)
+        self.abrir_arquivo()
+
+    def atual(self):
+        """`(tables, changed blocks)` of the current dataset version, or None while they are (re)loading.
+
+        The changed blocks are the `(fluxo, uf_id, ano)` written since the snapshot
+        was taken, which the tables don't reflect.
+        """
+        versao = self._versao()
+        if versao is None:
+            return None
+        if self.arquivo:
+            self.abrir_arquivo()
+        snapshot = self.snapshot
+        if snapshot is not None and snapshot[0] == versao:
+            return snapshot[1], frozenset()
+        alterados = self._alterados(snapshot[0], versao) if snapshot is not None else None
+        if alterados is not None:
+            return snapshot[1], alterados
+        self._agendar_recarga(esperar=snapshot is not None)
+        return None
+
+    def _versao(self):
+        """Dataset version from the in-process copy of `src.core.conditional` (read from the
+        database at most every `APP_HTTP_VERSAO_TTL` seconds and refreshed by `cached`
+        before each miss), or from the database without one."""
+        estados = self.app.extensions.get("dataset_estado")
+        if estados is None:
+            return versao_atual(SQLAlchemy.get_instance().session)
+        estado = estados.atual()
+        return estado[0] if estado is not None else None
+
+    def _alterados(self, versao_snapshot, versao):
+        """Blocks changed from `versao_snapshot` to `versao`, or None when any of those
+        versions may have changed anything (or was not recorded)."""
+        alteracoes = self.alteracoes
+        if alteracoes is not None and alteracoes[:2] == (versao_snapshot, versao):
+            return alteracoes[2]
+
+        table = DatasetAlteracaoModel.__table__
+        try:
+            with SQLAlchemy.get_instance().engine.connect() as conn:
+                linhas = conn.execute(
+                    select(table.c.versao, table.c.fluxo, table.c.uf_id, table.c.ano).where(
+                        table.c.versao > versao_snapshot, table.c.versao <= versao
+                    )
+                ).all()
+        except DBAPIError:
+            linhas = None  # sem `dataset_alteracoes`
+
+        alterados = None
+        if linhas is not None and len({linha.versao for linha in linhas}) >= versao - versao_snapshot:
+            if all(linha.fluxo is not None for linha in linhas):
+                alterados = frozenset((linha.fluxo, linha.uf_id, linha.ano) for linha in linhas)
+        self.alteracoes = (versao_snapshot, versao, alterados)
+        return alterados
+
+    def _agendar_recarga(self, esperar):
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            self.thread = threading.Thread(target=self._recarregar_em_segundo_plano, args=(esperar,), daemon=True)
+            self.thread.start()
+
+    def _recarregar_em_segundo_plano(self, esperar):
+        with self.app.app_context():
+            engine = SQLAlchemy.get_instance().engine
+            if esperar:
+                # uma importação incrementa a versão a cada chunk: espera ela terminar
+                with engine.connect() as conn:
+                    versao = versao_atual(conn)
+                while True:
+                    time.sleep(self.espera)
+                    with engine.connect() as conn:
+                        nova = versao_atual(conn)
+                    if nova == versao:
+                        break
+                    versao = nova
+            try:
+                if self.arquivo:
+                    self.reconstruir_arquivo()
+                else:
+                    self.recarregar()
+            except Exception:
+                current_app.logger.exception("Falha ao carregar o motor colunar; as rotas seguem no SQL.")
+
+
+def init_colunar(app: Flask) -> None:
+    """Create the columnar engine when `APP_ANALYTICS_COLUNAR` (loaded on first use) or
+    `APP_ANALYTICS_ARQUIVO` (mapped now) is configured."""
+    arquivo = app.config.get("ANALYTICS_ARQUIVO") or None
+    habilitado = app.config.get("ANALYTICS_COLUNAR", False) or arquivo
+    espera = float(app.config.get("ANALYTICS_COLUNAR_ESPERA", ESPERA))
+    motor = MotorColunar(app, espera, arquivo) if habilitado else None
+    if arquivo:
+        motor.abrir_arquivo()
+    app.extensions["analytics_colunar"] = motor
+
+
+def tabelas(uf_ids, ano_inicial=None, ano_final=None, fluxos=tuple(MODELS)):
+    """`{fluxo: TabelaColunar}` of the current version, or None when the routes must use SQL:
+    the engine is disabled or loading, or a block of `fluxos`, `uf_ids` and the years in
+    `[ano_inicial, ano_final]` (open ends allowed) changed since its snapshot.
+    """
+    motor = current_app.extensions.get("analytics_colunar")
+    atual = motor.atual() if motor is not None else None
+    if atual is None:
+        return None
+    carregadas, alterados = atual
+    for fluxo, uf_id, ano in alterados:
+        if fluxo in fluxos and uf_id in uf_ids and ano is not None:
+            if (ano_inicial is None or ano >= ano_inicial) and (ano_final is None or ano <= ano_final):
+                return None
+    return carregadas
+
+
+def tabela(fluxo, uf_id, ano_inicial=None, ano_final=None):
+    carregadas = tabelas((uf_id,), ano_inicial, ano_final, (fluxo,))
+    return carregadas[fluxo] if carregadas is not None else None
+
+
+def balanca(uf_ids, ano_inicial=None, ano_final=None, mensal=False):
+    """Same rows as `resumos.balanca`, or None when the engine is disabled, loading or stale for them."""
+    carregadas = tabelas(set(uf_ids), ano_inicial, ano_final)
+    if carregadas is None:
+        return None
+    exportacoes, importacoes = carregadas["exportacoes"], carregadas["importacoes"]
+
+    linhas = []
+    for uf_id in sorted(set(uf_ids)):
+        exportado = exportacoes.totais(uf_id, ano_inicial, ano_final, mensal)
+        importado = importacoes.totais(uf_id, ano_inicial, ano_final, mensal)
+        for ano, mes in sorted(exportado.keys() | importado.keys()):
+            total_exportado = exportado.get((ano, mes), 0)
+            total_importado = importado.get((ano, mes), 0)
+            linhas.append(
+                {
+                    "uf_id": uf_id,
+                    "ano": ano,
+                    "mes": mes,
+                    "total_exportado": total_exportado,
+                    "total_importado": total_importado,
+                    "valor": total_exportado - total_importado,
+                }
+            )
+    return linhas
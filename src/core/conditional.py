@@ -0,0 +1,111 @@
+"""HTTP caching of the `GET` variants of the analytics routes.
+
+Responses carry an `ETag` made of the dataset version recorded by the
+importers (`dataset_versao`) and a hash of the endpoint and canonical args,
+`Last-Modified` from the last import and `Cache-Control: public` with
+`APP_HTTP_MAX_AGE` seconds, so browsers, reverse proxies and CDNs can keep
+them.
+
+`If-None-Match` / `If-Modified-Since` are answered with 304 from an
+in-process copy of the dataset version, refreshed at most every
+`APP_HTTP_VERSAO_TTL` seconds, without touching the database. Writes through
+the API bump the version (`src.core.cache`) and expire this copy in the
+process that made them; other processes see the new ETag within the TTL.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from datetime import timezone
+from functools import wraps
+from flask import Flask, Response, current_app, request
+from src.utils.sqlalchemy import SQLAlchemy
+from .cache import estado_dataset
+
+MAX_AGE = 300  # default for APP_HTTP_MAX_AGE (seconds)
+VERSAO_TTL = 5  # default for APP_HTTP_VERSAO_TTL (seconds)
+
+
+class EstadoDataset:
+    """`(versao, atualizado_em)` of the dataset, read from the database at most every `ttl` seconds."""
+
+    def __init__(self, ttl=VERSAO_TTL):
+        self.ttl = ttl
+        self.estado = None
+        self.lido_em = None
+        self.lock = threading.Lock()
+
+    def atual(self, recarregar=False):
+        agora = time.monotonic()
+        with self.lock:
+            if not recarregar and self.lido_em is not None and agora - self.lido_em < self.ttl:
+                return self.estado
+        estado = estado_dataset(SQLAlchemy.get_instance().session)
+        with self.lock:
+            self.estado, self.lido_em = estado, agora
+        return estado
+
+    def expirar(self):
+        """Make the next `atual()` read the database (after a commit of this process)."""
+        with self.lock:
+            self.lido_em = None
+
+
+def init_conditional(app: Flask) -> None:
+    app.extensions["dataset_estado"] = EstadoDataset(float(app.config.get("HTTP_VERSAO_TTL", VERSAO_TTL)))
+
+
+def _etag(versao, argumentos):
+    digest = hashlib.sha1(f"{request.endpoint}:{argumentos}".encode()).hexdigest()[:16]
+    return f"{versao}-{digest}"
+
+
+def _nao_modificado(estado, argumentos):
+    versao, atualizado_em = estado
+    if request.if_none_match:
+        return request.if_none_match.contains(_etag(versao, argumentos))
+    if request.if_modified_since and atualizado_em is not None:
+        return atualizado_em.replace(tzinfo=timezone.utc) <= request.if_modified_since
+    return False
+
+
+def _cabecalhos(resposta, estado, argumentos):
+    versao, atualizado_em = estado
+    resposta.set_etag(_etag(versao, argumentos))
+    if atualizado_em is not None:
+        resposta.last_modified = atualizado_em.replace(tzinfo=timezone.utc)
+    resposta.cache_control.public = True
+    resposta.cache_control.max_age = int(current_app.config.get("HTTP_MAX_AGE", MAX_AGE))
+    return resposta
+
+
+def conditional(parser):
+    """Add validators and `Cache-Control` to the `GET` responses of a view and answer
+    conditional requests with 304. `POST` requests pass through untouched.
+
+    Must be applied above `cached`.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            estados = current_app.extensions.get("dataset_estado")
+            if request.method != "GET" or estados is None:
+                return view(*args, **kwargs)
+
+            argumentos = json.dumps(parser.parse_args(strict=True), sort_keys=True, default=str)
+            # versão lida antes da consulta: se mudar no meio (ou o `cached` recarregá-la num miss),
+            # o ETag fica antigo, nunca o contrário
+            estado = estados.atual()
+            if estado is not None and _nao_modificado(estado, argumentos):
+                return _cabecalhos(Response(status=304), estado, argumentos)
+
+            resposta = current_app.make_response(view(*args, **kwargs))
+            if estado is not None and resposta.status_code == 200:
+                _cabecalhos(resposta, estado, argumentos)
+            return resposta
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,232 @@
+"""Process-wide cache of the dimension tables and the transactions' foreign keys to them.
+
+The dimension tables (UF, NCM, País, Via, URF, UE, SH4, SH6) only change on
+`flask comex update` or through their own resources, so each one is loaded
+once into an immutable `Dimensao`: frozen rows in id order, id-indexed
+arrays of every column and `codigo`/name dicts. A table is reloaded when the
+dataset version (`dataset_versao`, read through the `EstadoDataset` of
+`src.core.conditional`) moves on, and right away when this process commits a
+change to it: ORM sessions are tracked by an event listener, and the
+importers call `invalidar` after their commits.
+"""
+
+import threading
+from dataclasses import make_dataclass
+from types import MappingProxyType
+import numpy as np
+from flask import Flask, current_app, has_app_context
+from flask_restful import abort
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from src.ncms.model import NCMModel
+from src.paises.model import PaisModel
+from src.sh4s.model import SH4Model
+from src.sh6s.model import SH6Model
+from src.ues.model import UEModel
+from src.ufs.model import UFModel
+from src.urfs.model import URFModel
+from src.utils.sqlalchemy import SQLAlchemy
+from src.vias.model import ViaModel
+
+# dimensão -> coluna com o nome (usada em `Dimensao.por_nome`)
+DIMENSOES = {
+    UFModel: "nome",
+    NCMModel: "descricao",
+    PaisModel: "nome",
+    ViaModel: "nome",
+    URFModel: "nome",
+    UEModel: "nome",
+    SH4Model: "nome",
+    SH6Model: "nome",
+}
+
+# coluna da transação -> (dimensão, nome usado nas mensagens), na ordem de validação
+CHAVES_ESTRANGEIRAS = {
+    "ncm_id": (NCMModel, "NCM"),
+    "ue_id": (UEModel, "UE"),
+    "pais_id": (PaisModel, "País"),
+    "uf_id": (UFModel, "UF"),
+    "via_id": (ViaModel, "Via"),
+    "urf_id": (URFModel, "URF"),
+}
+
+
+class Dimensao:
+    """Immutable snapshot of one dimension table."""
+
+    def __init__(self, model, linhas, versao=None):
+        """
+        Args:
+            model: dimension model (a key of `DIMENSOES`).
+            linhas (list): rows as tuples in the order of the table's columns (`created_at` aside).
+            versao (int): dataset version the rows were read at.
+        """
+        self.model = model
+        self.versao = versao
+        nomes = [coluna.name for coluna in model.__table__.columns if coluna.name != "created_at"]
+        classe = make_dataclass(f"{model.__name__}Linha", nomes, frozen=True)
+
+        self.linhas = tuple(classe(*linha) for linha in sorted(linhas, key=lambda linha: linha[0]))
+        self.ids = np.array([linha.id for linha in self.linhas], dtype="int64")
+        tamanho = int(self.ids[-1]) + 1 if len(self.ids) else 1
+        self.indice = np.full(tamanho, -1, dtype="int32")  # id -> posição em `linhas`
+        self.indice[self.ids] = np.arange(len(self.ids), dtype="int32")
+
+        self.colunas = {}  # id -> valor (None onde não há registro)
+        for nome in nomes:
+            coluna = np.full(tamanho, None, dtype=object)
+            coluna[self.ids] = [getattr(linha, nome) for linha in self.linhas]
+            self.colunas[nome] = coluna
+        for array in (self.ids, self.indice, *self.colunas.values()):
+            array.setflags(write=False)
+
+        self.por_codigo = MappingProxyType({linha.codigo: linha for linha in self.linhas})
+        self.por_nome = MappingProxyType({getattr(linha, DIMENSOES[model]): linha for linha in self.linhas})
+
+    @classmethod
+    def carregar(cls, conn, model, versao=None):
+        colunas = [coluna for coluna in model.__table__.columns if coluna.name != "created_at"]
+        return cls(model, conn.execute(select(*colunas)).all(), versao)
+
+    def obter(self, id):
+        """Row of `id`, or None."""
+        if id is None or not 0 <= id < len(self.indice) or self.indice[id] < 0:
+            return None
+        return self.linhas[self.indice[id]]
+
+    def __contains__(self, id):
+        return self.obter(id) is not None
+
+    def coluna(self, nome):
+        """Read-only array of `nome` indexed by id."""
+        return self.colunas[nome]
+
+
+class CacheDimensoes:
+    """The `Dimensao` of each table, reloaded when the dataset version changes."""
+
+    def __init__(self, estado):
+        """
+        Args:
+            estado (EstadoDataset): source of the dataset version.
+        """
+        self.estado = estado
+        self.dimensoes = {}
+        self.locks = {model: threading.Lock() for model in DIMENSOES}
+
+    def obter(self, model, recarregar=False):
+        """Snapshot of `model`.
+
+        Args:
+            recarregar (bool): read the dataset version from the database instead of the in-process copy.
+        """
+        estado = self.estado.atual(recarregar)
+        if estado is None:  # sem versão não há como invalidar
+            return Dimensao.carregar(SQLAlchemy.get_instance().session, model)
+
+        dimensao = self.dimensoes.get(model)
+        if dimensao is not None and dimensao.versao == estado[0]:
+            return dimensao
+        with self.locks[model]:
+            dimensao = self.dimensoes.get(model)
+            if dimensao is None or dimensao.versao != estado[0]:
+                dimensao = Dimensao.carregar(SQLAlchemy.get_instance().session, model, estado[0])
+                self.dimensoes[model] = dimensao
+        return dimensao
+
+    def invalidar(self):
+        self.dimensoes = {}
+
+
+def init_dimensoes(app: Flask) -> None:
+    """Create the app's dimension cache (after `init_conditional`) and track ORM changes to the dimensions."""
+    app.extensions["dimensoes"] = CacheDimensoes(app.extensions["dataset_estado"])
+
+    if not event.contains(Session, "after_flush", _marcar_alteracao):
+        event.listen(Session, "after_flush", _marcar_alteracao)
+        event.listen(Session, "after_commit", _invalidar_alteracao)
+        event.listen(Session, "after_soft_rollback", _descartar_alteracao)
+
+
+def _marcar_alteracao(session, flush_context):
+    for instancia in (*session.new, *session.dirty, *session.deleted):
+        if type(instancia) in DIMENSOES:
+            session.info["dimensoes_alteradas"] = True
+            return
+
+
+def _invalidar_alteracao(session):
+    if session.info.pop("dimensoes_alteradas", False):
+        invalidar()
+
+
+def _descartar_alteracao(session, previous_transaction):
+    session.info.pop("dimensoes_alteradas", None)
+
+
+def obter(model, recarregar=False):
+    """Snapshot of the dimension `model`, from the app's cache when there is one."""
+    cache = current_app.extensions.get("dimensoes")
+    if cache is None:
+        return Dimensao.carregar(SQLAlchemy.get_instance().session, model)
+    return cache.obter(model, recarregar)
+
+
+def obter_linha(model, id):
+    """Row `id` of the dimension `model`, or None.
+
+    A miss is checked again with the dataset version read from the database,
+    so an entry just created by another process is found.
+    """
+    linha = obter(model).obter(id)
+    if linha is None:
+        linha = obter(model, recarregar=True).obter(id)
+    return linha
+
+
+def invalidar():
+    """Drop the cached dimensions of this process (after an import or a change to them)."""
+    if has_app_context() and current_app.extensions.get("dimensoes") is not None:
+        current_app.extensions["dimensoes"].invalidar()
+
+
+def existentes(ids):
+    """Check which dimension ids exist, against the cached id sets.
+
+    Ids missing from the cache are looked up in the database (one query per
+    dimension with misses), so entries created by another process since the
+    cached version are not rejected.
+
+    Args:
+        ids (dict): `{coluna: iterable of ids}`, columns of `CHAVES_ESTRANGEIRAS`.
+
+    Returns:
+        dict: `{coluna: set of the ids that exist}`.
+    """
+    session = SQLAlchemy.get_instance().session
+    encontrados = {}
+    for coluna, valores in ids.items():
+        model = CHAVES_ESTRANGEIRAS[coluna][0]
+        dimensao = obter(model)
+        valores = {id for id in valores if id is not None}
+        encontrados[coluna] = {id for id in valores if id in dimensao}
+        faltando = valores - encontrados[coluna]
+        if faltando:
+            encontrados[coluna].update(session.execute(select(model.id).where(model.id.in_(faltando))).scalars())
+    return encontrados
+
+
+def validar_chaves(args):
+    """Abort with 404 on the first foreign key of `args` without a dimension entry.
+
+    The FKs are optional (nullable columns): a null one is not checked.
+
+    Returns:
+        dict: `{coluna: id}` to be assigned to the transaction's FK columns.
+    """
+    chaves = {coluna: args[coluna] for coluna in CHAVES_ESTRANGEIRAS if coluna in args}
+    encontrados = existentes({coluna: [id] for coluna, id in chaves.items()})
+    for coluna, id in chaves.items():
+        if id is not None and id not in encontrados[coluna]:
+            abort(404, message=f"{CHAVES_ESTRANGEIRAS[coluna][1]} não encontrado.")
+    return chaves
@@ -0,0 +1,220 @@
+"""Asynchronous, chunked purge of the transactions of a dimension entry.
+
+Deleting a UF, NCM, País, Via, URF or UE removes its transactions through the
+`ON DELETE CASCADE` of the fact tables' foreign keys (the ORM relationships
+are `passive_deletes`, so no fact row is loaded). For large dimensions that is
+still one huge transaction; `DELETE ...?assincrono=true` starts an `Expurgo`
+instead, which removes the transactions in chunks of `APP_EXPURGO_LOTE` ids,
+each in its own transaction (summaries and dataset version included), and
+deletes the dimension entry last. The job's state is kept in the `expurgos`
+table (its progress updated in each chunk's transaction), so
+`GET /api/expurgos/<id>` answers from any worker.
+"""
+
+import threading
+from typing import Optional
+import pandas as pd
+from flask import Flask, current_app
+from sqlalchemy import BigInteger, String, Text, delete, func, insert, select, update
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Mapped, mapped_column
+from src.core.base import BaseModel
+from src.importers import resumos
+from src.ncms.model import NCMModel
+from src.paises.model import PaisModel
+from src.resumos import consultas
+from src.ues.model import UEModel
+from src.ufs.model import UFModel
+from src.urfs.model import URFModel
+from src.utils.sqlalchemy import SQLAlchemy
+from src.vias.model import ViaModel
+from . import dimensoes
+from .cache import incrementar_versao
+
+TAMANHO_LOTE = 10_000  # default for APP_EXPURGO_LOTE
+
+# dimensão -> coluna das tabelas de fatos que a referencia
+COLUNAS = {
+    UFModel: "uf_id",
+    NCMModel: "ncm_id",
+    PaisModel: "pais_id",
+    ViaModel: "via_id",
+    URFModel: "urf_id",
+    UEModel: "ue_id",
+}
+DIMENSOES = {model.__tablename__: model for model in COLUNAS}
+
+
+class ExpurgoModel(BaseModel):
+    """Estado dos expurgos assíncronos, lido por qualquer worker."""
+
+    __tablename__ = "expurgos"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    dimensao: Mapped[str] = mapped_column(String(63))
+    dimensao_id: Mapped[int] = mapped_column(BigInteger)
+    status: Mapped[str] = mapped_column(String(15), default="pendente")
+    total: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+    removidas: Mapped[int] = mapped_column(BigInteger, default=0)
+    erro: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+
+class Expurgo:
+    """State of one purge job."""
+
+    def __init__(self, id, model, dimensao_id):
+        self.id = id
+        self.model = model
+        self.dimensao_id = dimensao_id
+        self.status = "pendente"  # pendente -> executando -> concluido | erro
+        self.total = None
+        self.removidas = 0
+        self.erro = None
+
+    @classmethod
+    def de_linha(cls, linha):
+        expurgo = cls(linha.id, DIMENSOES[linha.dimensao], linha.dimensao_id)
+        expurgo.status, expurgo.total, expurgo.removidas, expurgo.erro = (
+            linha.status, linha.total, linha.removidas, linha.erro
+        )
+        return expurgo
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "dimensao": self.model.__tablename__,
+            "dimensao_id": self.dimensao_id,
+            "status": self.status,
+            "total": self.total,
+            "removidas": self.removidas,
+            "progresso": round(self.removidas / self.total, 4) if self.total else None,
+            "erro": self.erro,
+        }
+
+
+class Expurgos:
+    """Runner of the purge jobs, with their state in the `expurgos` table.
+
+    The table (and its rows) are written through Core, outside the ORM session,
+    so they don't bump the dataset version.
+    """
+
+    def __init__(self, app: Flask, tamanho_lote=TAMANHO_LOTE):
+        self.app = app
+        self.tamanho_lote = tamanho_lote
+        self.table = ExpurgoModel.__table__
+
+    def iniciar(self, model, dimensao_id):
+        """Record a purge of the entry `dimensao_id` of `model` and run it in a background thread."""
+        engine = SQLAlchemy.get_instance().engine
+        self.table.create(bind=engine, checkfirst=True)
+        with engine.begin() as conn:
+            resultado = conn.execute(
+                insert(self.table).values(dimensao=model.__tablename__, dimensao_id=dimensao_id, status="pendente")
+            )
+        expurgo = Expurgo(resultado.inserted_primary_key[0], model, dimensao_id)
+        threading.Thread(target=self._executar_em_segundo_plano, args=(expurgo,), daemon=True).start()
+        return expurgo
+
+    def obter(self, id):
+        """State of the job `id`, as recorded by whichever process runs it (None if unknown)."""
+        try:
+            with SQLAlchemy.get_instance().engine.connect() as conn:
+                linha = conn.execute(select(self.table).where(self.table.c.id == id)).first()
+        except DBAPIError:
+            return None  # nenhum expurgo ainda (sem a tabela)
+        return Expurgo.de_linha(linha) if linha is not None else None
+
+    def _salvar(self, conn, expurgo):
+        conn.execute(
+            update(self.table)
+            .where(self.table.c.id == expurgo.id)
+            .values(status=expurgo.status, total=expurgo.total, removidas=expurgo.removidas, erro=expurgo.erro)
+        )
+
+    def _executar_em_segundo_plano(self, expurgo):
+        with self.app.app_context():
+            try:
+                self.executar(expurgo)
+            except Exception as e:
+                expurgo.status, expurgo.erro = "erro", str(e)
+                current_app.logger.exception("Falha no expurgo %s.", expurgo.id)
+                with SQLAlchemy.get_instance().engine.begin() as conn:
+                    self._salvar(conn, expurgo)
+
+    def executar(self, expurgo):
+        """Run the purge in the current thread (needs an app context)."""
+        engine = SQLAlchemy.get_instance().engine
+        coluna = COLUNAS[expurgo.model]
+        expurgo.status = "executando"
+
+        with engine.begin() as conn:
+            expurgo.total = sum(
+                conn.execute(select(func.count()).where(fatos.c[coluna] == expurgo.dimensao_id)).scalar()
+                for fatos in resumos.FATOS.values()
+            )
+            self._salvar(conn, expurgo)
+
+        com_resumos = consultas.disponivel()
+        for fluxo, fatos in resumos.FATOS.items():
+            while True:
+                with engine.begin() as conn:
+                    ids = (
+                        conn.execute(
+                            select(fatos.c.id)
+                            .where(fatos.c[coluna] == expurgo.dimensao_id)
+                            .order_by(fatos.c.id)
+                            .limit(self.tamanho_lote)
+                        )
+                        .scalars()
+                        .all()
+                    )
+                    if not ids:
+                        break
+                    if com_resumos:
+                        linhas = conn.execute(
+                            select(*(fatos.c[nome] for nome in resumos.COLUNAS)).where(fatos.c.id.in_(ids))
+                        )
+                        resumos.acumular(conn, fluxo, pd.DataFrame(linhas.all(), columns=resumos.COLUNAS), sinal=-1)
+                    conn.execute(delete(fatos).where(fatos.c.id.in_(ids)))
+                    incrementar_versao(conn)
+                    expurgo.removidas += len(ids)
+                    self._salvar(conn, expurgo)
+
+        with engine.begin() as conn:
+            if com_resumos:
+                for fluxo in resumos.FATOS:
+                    resumos.remover_zerados(conn, fluxo)
+            table = expurgo.model.__table__
+            conn.execute(delete(table).where(table.c.id == expurgo.dimensao_id))
+            incrementar_versao(conn)
+            expurgo.status = "concluido"
+            self._salvar(conn, expurgo)
+        dimensoes.invalidar()
+
+
+def init_expurgos(app: Flask) -> None:
+    app.extensions["expurgos"] = Expurgos(app, int(app.config.get("EXPURGO_LOTE", TAMANHO_LOTE)))
+
+
+def excluir(model, entry):
+    """Delete a dimension entry: right away (DB cascade, summaries discounted first) or, with `?assincrono=true`, as an `Expurgo`.
+
+    Returns:
+        tuple: response of the resource's `delete`.
+    """
+    from .request import expurgo_args
+
+    db = SQLAlchemy.get_instance()
+    if expurgo_args.parse_args()["assincrono"]:
+        expurgo = current_app.extensions["expurgos"].iniciar(model, entry.id)
+        return {"expurgo": expurgo.to_dict()}, 202, {"Location": f"/api/expurgos/{expurgo.id}"}
+
+    if consultas.disponivel():
+        # as transações somem pelo cascade do banco: descontadas antes, na mesma transação
+        coluna = COLUNAS[model]
+        for fluxo, fatos in resumos.FATOS.items():
+            resumos.descontar(db.session.connection(), fluxo, fatos.c[coluna] == entry.id)
+    db.session.delete(entry)
+    db.session.commit()
+    return None, 204
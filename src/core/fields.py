@@ -1,6 +1,7 @@
 """Format the data."""
 
 from flask_restful import fields
+from src.utils.fields import ValorAgregado
 from src.exportacoes.fields import model_fields as transacao_fields
 
 # valor_agregado_fields = transacao_fields["data"]
@@ -15,7 +16,7 @@ valor_agregado_fields = {
         "mes": fields.Integer,
         "peso": fields.Integer,
         "valor": fields.Integer,
-        "valor_agregado": fields.Float,
+        "valor_agregado": ValorAgregado,
         "ncm_descricao": fields.String,
         "ncm_id": fields.Integer,
         "ue_id": fields.Integer,
@@ -30,9 +31,19 @@ response_fields_valores_agregados = {
     'quantidade_pagina': fields.Integer,
     'has_next': fields.Boolean,
     'has_previous': fields.Boolean,
+    'proximo_cursor': fields.String,
     'valores_agregados': fields.List(fields.Nested(valor_agregado_fields))
 }
 
+# Com `descricoes_ncm=dicionario`: cada descrição uma única vez, em `ncm_descricoes` (ncm_id -> descrição)
+response_fields_valores_agregados_dicionario = {
+    **response_fields_valores_agregados,
+    'valores_agregados': fields.List(
+        fields.Nested({campo: tipo for campo, tipo in valor_agregado_fields.items() if campo != "ncm_descricao"})
+    ),
+    'ncm_descricoes': fields.Raw,
+}
+
 
 
 cargas_movimentadas_fields = {
@@ -40,7 +51,7 @@ cargas_movimentadas_fields = {
     "ano": fields.Integer,
     "mes": fields.Integer,
     "peso": fields.Integer,
-    "valor_agregado": fields.Float,
+    "valor_agregado": ValorAgregado,
     # FKs
     "via_id": fields.Integer,
     "pais_id": fields.Integer,
@@ -54,9 +65,18 @@ response_fields_cargas_movimentadas = {
     'quantidade_pagina': fields.Integer,
     'has_next': fields.Boolean,
     'has_previous': fields.Boolean,
+    'proximo_cursor': fields.String,
     'cargas_movimentadas': fields.List(fields.Nested(cargas_movimentadas_fields))
 }
 
+response_fields_cargas_movimentadas_dicionario = {
+    **response_fields_cargas_movimentadas,
+    'cargas_movimentadas': fields.List(
+        fields.Nested({campo: tipo for campo, tipo in cargas_movimentadas_fields.items() if campo != "ncm_descricao"})
+    ),
+    'ncm_descricoes': fields.Raw,
+}
+
 
 
 vias_fields = {
@@ -70,6 +90,10 @@ urfs_fields = {
 }
 
 balanca_comercial_fields = {
+    "uf_id": fields.Integer,
     "ano": fields.Integer,
+    "mes": fields.Integer(default=None),
+    "total_exportado": fields.Float,
+    "total_importado": fields.Float,
     "valor": fields.Float,
 }
@@ -0,0 +1,88 @@
+"""Keyset (seek) pagination for the analytics blueprints.
+
+Pages are ordered by `(chave DESC, id DESC)`. The `proximo_cursor` returned
+with each page is an opaque token with the page number and the key/id of its
+last row; sending it back resumes right after that row with a seek predicate,
+so every page costs the same as the first. A plain page number is still
+accepted as `cursor` and falls back to `OFFSET`.
+"""
+
+import base64
+import json
+from decimal import Decimal
+from sqlalchemy import desc, or_, tuple_
+
+
+class Cursor:
+    """Position of a page: its number and, for seek pagination, the last key/id seen."""
+
+    def __init__(self, pagina=1, chave=None, id=None):
+        self.pagina = pagina
+        self.chave = chave
+        self.id = id
+
+    @property
+    def seek(self):
+        return self.id is not None
+
+    def encode(self) -> str:
+        # Decimal (valor / peso no MySQL) vai como texto para não perder precisão
+        chave = str(self.chave) if isinstance(self.chave, Decimal) else self.chave
+        dados = json.dumps({"p": self.pagina, "k": chave, "d": isinstance(self.chave, Decimal), "i": self.id})
+        return base64.urlsafe_b64encode(dados.encode()).decode().rstrip("=")
+
+    __str__ = encode
+
+    @classmethod
+    def decode(cls, token: str):
+        dados = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        chave = Decimal(dados["k"]) if dados["d"] else dados["k"]
+        return cls(int(dados["p"]), chave, int(dados["i"]))
+
+
+def cursor_type(value):
+    """reqparse type for `cursor`: a page number (legacy) or a `proximo_cursor` token."""
+    if isinstance(value, int) or str(value).strip().lstrip("-").isdigit():
+        return Cursor(pagina=max(1, int(value)))
+    try:
+        return Cursor.decode(str(value))
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Cursor inválido.")
+
+
+def paginate(session, query, chave, id_column, tamanho_pagina, cursor):
+    """Fetch one page of the `select()` ordered by `(chave DESC, id DESC)`.
+
+    Args:
+        chave: labeled expression or column used for ordering; its value is read
+            from the result rows by `chave.key`.
+        cursor (Cursor): position parsed by `cursor_type`.
+
+    Returns:
+        tuple: (rows of the page, has_next, proximo_cursor or None).
+    """
+    cursor = cursor or Cursor()
+    query = query.order_by(desc(chave), desc(id_column))
+    if cursor.seek:
+        query = query.where(_after(chave, id_column, cursor.chave, cursor.id))
+    else:
+        query = query.offset((cursor.pagina - 1) * tamanho_pagina)
+
+    # Buscar 'tamanho_pagina + 1' registros para checar se há próxima página
+    rows = session.execute(query.limit(tamanho_pagina + 1)).all()
+    has_next = len(rows) > tamanho_pagina
+    rows = rows[:tamanho_pagina]
+
+    proximo_cursor = None
+    if has_next:
+        ultimo = rows[-1]
+        proximo_cursor = Cursor(cursor.pagina + 1, getattr(ultimo, chave.key), ultimo.id).encode()
+
+    return rows, has_next, proximo_cursor
+
+
+def _after(chave, id_column, valor, ultimo_id):
+    """Rows after `(valor, ultimo_id)` in `(chave DESC, id DESC)` order (NULLs sort last in MySQL)."""
+    if valor is None:
+        return (chave.is_(None)) & (id_column < ultimo_id)
+    return or_(tuple_(chave, id_column) < tuple_(valor, ultimo_id), chave.is_(None))
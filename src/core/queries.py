@@ -0,0 +1,214 @@
+"""Query engine of the analytics routes, shared by exportações and importações.
+
+`TransacaoQueries` builds SQLAlchemy Core `select()` statements for one flow
+direction without joins (NCM descriptions are filled in from
+`src.core.dimensoes` after the page is cut), so both blueprints run the
+same statement shapes (and hit the same compiled-statement cache entries).
+When the in-memory columnar engine (`src.core.colunar`) is loaded, the
+analytics routes are answered from it instead.
+"""
+
+from sqlalchemy import desc, func, select
+from src.exportacoes.model import ExportacaoModel
+from src.importacoes.model import ImportacaoModel
+from src.ncms.model import NCMModel
+from src.resumos import consultas as resumos
+from src.utils.sqlalchemy import SQLAlchemy
+from . import colunar, dimensoes
+from .pagination import Cursor, paginate
+
+STREAM_YIELD_PER = 5000  # linhas buscadas por vez do cursor do servidor no streaming
+COLUNAS_LISTAGEM = (
+    "id", "ano", "mes", "peso", "valor", "valor_agregado",
+    "ncm_id", "ue_id", "pais_id", "uf_id", "via_id", "urf_id",
+)
+
+MODELS = {
+    "exportacoes": ExportacaoModel,
+    "importacoes": ImportacaoModel,
+}
+
+
+class TransacaoQueries:
+    """Queries of one flow direction (`exportacoes` or `importacoes`)."""
+
+    def __init__(self, fluxo):
+        self.fluxo = fluxo
+        self.model = MODELS[fluxo]
+
+    def _periodo(self, stmt, ano, ano_inicial=None):
+        """Filter by a year or, with `ano_inicial`, by the period up to `ano`."""
+        if ano_inicial:
+            return stmt.where(self.model.ano.between(ano_inicial, ano))
+        return stmt.where(self.model.ano == ano)
+
+    def _pagina(self, stmt, chave, tamanho_pagina, cursor, nome_lista):
+        cursor = cursor or Cursor()
+        pagina = paginate(SQLAlchemy.get_instance().session, stmt, chave, self.model.id, tamanho_pagina, cursor)
+        return self._resposta(pagina, tamanho_pagina, cursor, nome_lista)
+
+    def _resposta(self, pagina, tamanho_pagina, cursor, nome_lista):
+        cursor = cursor or Cursor()
+        entries, has_next, proximo_cursor = pagina
+        return {
+            "pagina": cursor.pagina,
+            "quantidade_pagina": tamanho_pagina,
+            "has_next": has_next,
+            "has_previous": cursor.pagina > 1,
+            "proximo_cursor": proximo_cursor,
+            nome_lista: entries,
+        }
+
+    def _descricoes_ncm(self, resposta, nome_lista, dicionario):
+        """Fill `ncm_descricao` of the rows of a page, after it is cut, from the in-memory
+        `ncm_id -> descricao` array or, with `dicionario`, return the descriptions once in
+        `ncm_descricoes` (`{ncm_id: descricao}`) instead of in every row.
+        """
+        descricoes = None
+        linhas = [linha if isinstance(linha, dict) else linha._asdict() for linha in resposta[nome_lista]]
+        for linha in linhas:
+            if "ncm_descricao" not in linha:  # SQL: a consulta só traz o `ncm_id`
+                if descricoes is None:
+                    descricoes = dimensoes.obter(NCMModel).coluna("descricao")
+                ncm_id = linha["ncm_id"]
+                linha["ncm_descricao"] = descricoes[ncm_id] if ncm_id < len(descricoes) else None
+        resposta[nome_lista] = linhas
+        if dicionario:
+            resposta["ncm_descricoes"] = {str(linha["ncm_id"]): linha.pop("ncm_descricao") for linha in linhas}
+        return resposta
+
+    def valor_agregado(self, uf_id, ano, ano_inicial=None, tamanho_pagina=10, cursor=None, dicionario_ncm=False):
+        """Page of transactions of a UF ordered by `valor_agregado DESC, id DESC`.
+
+        Args:
+            dicionario_ncm (bool): NCM descriptions in a side dict instead of in every row.
+        """
+        tabela = colunar.tabela(self.fluxo, uf_id, ano_inicial or ano, ano)
+        if tabela is not None:
+            pagina = tabela.valor_agregado(uf_id, ano, ano_inicial, tamanho_pagina, cursor)
+            resposta = self._resposta(pagina, tamanho_pagina, cursor, "valores_agregados")
+            return self._descricoes_ncm(resposta, "valores_agregados", dicionario_ncm)
+
+        model = self.model
+        valor_agregado = model.valor_agregado.label("valor_agregado")
+        stmt = (
+            select(
+                model.id,
+                model.ano,
+                model.mes,
+                model.peso,
+                model.valor,
+                valor_agregado,
+                model.ncm_id,
+                model.ue_id,
+                model.pais_id,
+                model.uf_id,
+                model.via_id,
+                model.urf_id,
+            )
+            # só transações com NCM (antes garantido pelo JOIN); a descrição vem de `_descricoes_ncm`
+            .where(model.uf_id == uf_id, model.ncm_id.is_not(None))
+        )
+        stmt = self._periodo(stmt, ano, ano_inicial)
+        resposta = self._pagina(stmt, valor_agregado, tamanho_pagina, cursor, "valores_agregados")
+        return self._descricoes_ncm(resposta, "valores_agregados", dicionario_ncm)
+
+    def cargas_movimentadas(self, uf_id, ano, ano_inicial=None, tamanho_pagina=10, cursor=None, dicionario_ncm=False):
+        """Page of transactions of a UF ordered by `peso DESC, id DESC`.
+
+        Args:
+            dicionario_ncm (bool): NCM descriptions in a side dict instead of in every row.
+        """
+        tabela = colunar.tabela(self.fluxo, uf_id, ano_inicial or ano, ano)
+        if tabela is not None:
+            pagina = tabela.cargas_movimentadas(uf_id, ano, ano_inicial, tamanho_pagina, cursor)
+            resposta = self._resposta(pagina, tamanho_pagina, cursor, "cargas_movimentadas")
+            return self._descricoes_ncm(resposta, "cargas_movimentadas", dicionario_ncm)
+
+        model = self.model
+        stmt = (
+            select(
+                model.id,
+                model.ano,
+                model.mes,
+                model.peso,
+                model.ncm_id,
+                model.uf_id,
+                model.valor_agregado.label("valor_agregado"),
+                model.pais_id,
+                model.via_id,
+            )
+            # só transações com NCM (antes garantido pelo JOIN); a descrição vem de `_descricoes_ncm`
+            .where(model.uf_id == uf_id, model.ncm_id.is_not(None))
+        )
+        stmt = self._periodo(stmt, ano, ano_inicial)
+        resposta = self._pagina(stmt, model.peso, tamanho_pagina, cursor, "cargas_movimentadas")
+        return self._descricoes_ncm(resposta, "cargas_movimentadas", dicionario_ncm)
+
+    def _contagem(self, coluna, uf_id, ano):
+        """`(coluna, qtd)` of a UF in a year, most used first."""
+        qtd = func.count().label("qtd")
+        stmt = (
+            select(coluna, qtd)
+            .where(self.model.uf_id == uf_id, self.model.ano == ano, coluna.is_not(None))
+            .group_by(coluna)
+            .order_by(desc(qtd), coluna)
+        )
+        return SQLAlchemy.get_instance().session.execute(stmt).all()
+
+    def vias_utilizadas(self, uf_id, ano):
+        """Vias used by a UF in a year and how many times, from the summaries when available."""
+        tabela = colunar.tabela(self.fluxo, uf_id, ano, ano)
+        if tabela is not None:
+            return tabela.contagem("via_id", uf_id, ano)
+        if resumos.disponivel():
+            return resumos.vias_utilizadas(self.fluxo, uf_id, ano)
+        return self._contagem(self.model.via_id, uf_id, ano)
+
+    def urfs_utilizadas(self, uf_id, ano):
+        """URFs used by a UF in a year and how many times, from the summaries when available."""
+        tabela = colunar.tabela(self.fluxo, uf_id, ano, ano)
+        if tabela is not None:
+            return tabela.contagem("urf_id", uf_id, ano)
+        if resumos.disponivel():
+            return resumos.urfs_utilizadas(self.fluxo, uf_id, ano)
+        return self._contagem(self.model.urf_id, uf_id, ano)
+
+    def _filtros(self, filtros):
+        return [getattr(self.model, campo) == valor for campo, valor in filtros.items()]
+
+    def _listagem(self, filtros):
+        colunas = [getattr(self.model, coluna).label(coluna) for coluna in COLUNAS_LISTAGEM]
+        return select(*colunas).where(*self._filtros(filtros)).order_by(self.model.id)
+
+    def listar(self, filtros, page=1, per_page=100, total=False):
+        """Page of transactions (by id) matching `filtros` (column -> value).
+
+        Pages are read with `OFFSET`, so deep pages cost more; `iterar` streams every match.
+
+        Args:
+            total (bool): also count every match (a full `COUNT(*)`); None otherwise.
+        """
+        session = SQLAlchemy.get_instance().session
+        items = session.execute(
+            self._listagem(filtros).offset((page - 1) * per_page).limit(per_page + 1)
+        ).all()
+        if total:
+            total = session.execute(
+                select(func.count()).select_from(self.model).where(*self._filtros(filtros))
+            ).scalar()
+        else:
+            total = None
+        return {
+            "total": total,
+            "page": page,
+            "per_page": per_page,
+            "has_next": len(items) > per_page,
+            "items": items[:per_page],
+        }
+
+    def iterar(self, filtros):
+        """Every transaction matching `filtros`, read from a server-side cursor."""
+        stmt = self._listagem(filtros).execution_options(yield_per=STREAM_YIELD_PER)
+        with SQLAlchemy.get_instance().engine.connect() as conn:
+            yield from conn.execute(stmt)
@@ -1,47 +1,123 @@
 """Validate input data."""
 
-from flask_restful import reqparse
+from copy import copy, deepcopy
+from flask import has_request_context, request
+from flask_restful import inputs, reqparse
+from .pagination import Cursor, cursor_type
 
 
+class _QueryStringArgument(reqparse.Argument):
+    def __init__(self, name, *args, location="args", **kwargs):
+        super().__init__(name, *args, location=location, **kwargs)
+
+
+class AnalyticsParser(reqparse.RequestParser):
+    """Parser of the analytics routes: JSON body on `POST`, query string on the `GET` variants."""
+
+    def parse_args(self, req=None, strict=False, http_error_code=400):
+        """Parse the current request once: `conditional`, `cached` and the view share the result."""
+        if req is not None or not has_request_context():
+            return self._analisar(req if req is not None else request, strict, http_error_code)
+        analisados = request.environ.setdefault("comex.argumentos_analisados", {})  # por requisição
+        chave = (id(self), strict)
+        if chave not in analisados:
+            analisados[chave] = self._analisar(request, strict, http_error_code)
+        return copy(analisados[chave])
+
+    def _analisar(self, req, strict, http_error_code):
+        if req.method == "GET":
+            return self._query_string().parse_args(req, strict, http_error_code)
+        return super().parse_args(req, strict, http_error_code)
+
+    def _query_string(self):
+        if getattr(self, "_parser_query_string", None) is None:
+            parser = reqparse.RequestParser(argument_class=_QueryStringArgument, bundle_errors=self.bundle_errors)
+            parser.args = deepcopy(self.args)
+            for argumento in parser.args:
+                argumento.location = "args"
+            self._parser_query_string = parser
+        return self._parser_query_string
+
+
+DESCRICOES_NCM = ("linha", "dicionario")
+
 """
     Argumentos para valor [ Carga Movimentadas, Valor Agregado ]
     uf_id:int          -  ID da sigla do uf informado
     ano:int            -  Ano que ocorreu
     ano_inicila:int    -  Ano inicial da busca que ocorreu a importação/exportação
     tamanho_pagina:int -  Quantidades de intes por pagina
-    cursor:int         -  Pagina indicada
+    cursor:int|str     -  Pagina indicada ou o `proximo_cursor` da página anterior
+    descricoes_ncm:str -  "linha" (padrão, `ncm_descricao` em cada item) ou "dicionario" (`ncm_descricoes` por ID)
 """
 # Valor Agregado
-valor_agregado_args = reqparse.RequestParser()
+valor_agregado_args = AnalyticsParser()
 valor_agregado_args.add_argument("uf_id", type=int, required=True, help="ID da UF inválido.")
 valor_agregado_args.add_argument("ano", type=int, required=True, help="Um ano deve ser informado.")
 valor_agregado_args.add_argument("ano_inicial", type=int, required=False, help="Informe um ano de início para visualizar um período.")
 valor_agregado_args.add_argument("tamanho_pagina", type=int, required=False, default=10)
-valor_agregado_args.add_argument("cursor", type=int, required=False, default=0)
+valor_agregado_args.add_argument("cursor", type=cursor_type, required=False, default=Cursor, help="Cursor inválido.")
+valor_agregado_args.add_argument("descricoes_ncm", type=str, required=False, default="linha", choices=DESCRICOES_NCM, help="descricoes_ncm deve ser 'linha' ou 'dicionario'.")
 # Cargas Movimentadas
-cargas_movimentadas_args = reqparse.RequestParser()
+cargas_movimentadas_args = AnalyticsParser()
 cargas_movimentadas_args.add_argument("uf_id", type=int, required=True, help="ID da UF inválido." )
 cargas_movimentadas_args.add_argument("ano", type=int,  required=True, help="Um ano deve ser informado.")
 cargas_movimentadas_args.add_argument("ano_inicial", type=int, required=False, help="Informe um ano de início para visualizar um período.")
 cargas_movimentadas_args.add_argument("tamanho_pagina", type=int, required=False, default=10)
-cargas_movimentadas_args.add_argument("cursor", type=int, required=False, default=0)
+cargas_movimentadas_args.add_argument("cursor", type=cursor_type, required=False, default=Cursor, help="Cursor inválido.")
+cargas_movimentadas_args.add_argument("descricoes_ncm", type=str, required=False, default="linha", choices=DESCRICOES_NCM, help="descricoes_ncm deve ser 'linha' ou 'dicionario'.")
 """
     Argumentos para valor [ Vias utilizadas, URF Utilizadas ]
     uf_id:int          -  ID da sigla do uf informado
     ano:int            -  Ano que ocorreu
 """
 # Vias utilizadas
-vias_utilizadas_args = reqparse.RequestParser()
+vias_utilizadas_args = AnalyticsParser()
 vias_utilizadas_args.add_argument("ano", type=int, required=True, help="Um ano deve ser informado.")
 vias_utilizadas_args.add_argument("uf_id", type=int, required=True, help="ID da UF inválido.")
 # Urf utilizadas
-urf_utilizadas_args = reqparse.RequestParser()
+urf_utilizadas_args = AnalyticsParser()
 urf_utilizadas_args.add_argument("ano",  type=int,  required=True,  help="Um ano deve ser informado.")
 urf_utilizadas_args.add_argument("uf_id", type=int,  required=True, help="ID da UF inválido.")
 """
     Argumentos para valor [ Balança Comercial ]
     uf_id:int          -  ID da sigla do uf informado
+    uf_ids:list[int]   -  IDs de várias UFs (comparação entre estados)
+    ano_inicial:int    -  Primeiro ano do período (opcional)
+    ano_final:int      -  Último ano do período (opcional)
+    granularidade:str  -  "anual" (padrão) ou "mensal"
 """
 # Balança comercial
-balanca_comercial_args = reqparse.RequestParser()
-balanca_comercial_args.add_argument("uf_id", type=int, required=True, help="UF ID obrigatório")
\ No newline at end of file
+balanca_comercial_args = AnalyticsParser()
+balanca_comercial_args.add_argument("uf_id", type=int, required=False, help="ID da UF inválido.")
+balanca_comercial_args.add_argument("uf_ids", type=int, action="append", required=False, help="IDs das UFs inválidos.")
+balanca_comercial_args.add_argument("ano_inicial", type=int, required=False, help="Informe um ano de início para visualizar um período.")
+balanca_comercial_args.add_argument("ano_final", type=int, required=False, help="Informe um ano final para visualizar um período.")
+balanca_comercial_args.add_argument("granularidade", choices=("anual", "mensal"), required=False, default="anual", help="Granularidade deve ser 'anual' ou 'mensal'.")
+"""
+    Argumentos para a listagem de transações [ /api/exportacoes, /api/importacoes ]
+    page:int           -  Página (a partir de 1)
+    per_page:int       -  Itens por página (no máximo `MAX_PER_PAGE`)
+    ano, mes, uf_id, ncm_id, pais_id:int - Filtros opcionais
+    formato:str        -  "json" (paginado, padrão), "ndjson" ou "csv" (streaming de todos os resultados)
+    total:bool         -  Conta os resultados (um COUNT(*) a mais); sem ele, `total` é null e `has_next` indica se há mais páginas
+"""
+MAX_PER_PAGE = 1000
+FILTROS_LISTAGEM = ("ano", "mes", "uf_id", "ncm_id", "pais_id")
+# Listagem
+listagem_args = reqparse.RequestParser()
+listagem_args.add_argument("page", type=int, location="args", required=False, default=1)
+listagem_args.add_argument("per_page", type=int, location="args", required=False, default=100)
+listagem_args.add_argument("ano", type=int, location="args", required=False, help="Ano inválido.")
+listagem_args.add_argument("mes", type=int, location="args", required=False, help="Mês inválido.")
+listagem_args.add_argument("uf_id", type=int, location="args", required=False, help="ID da UF inválido.")
+listagem_args.add_argument("ncm_id", type=int, location="args", required=False, help="ID do NCM inválido.")
+listagem_args.add_argument("pais_id", type=int, location="args", required=False, help="ID do País inválido.")
+listagem_args.add_argument("formato", location="args", choices=("json", "ndjson", "csv"), required=False, default="json", help="Formato deve ser 'json', 'ndjson' ou 'csv'.")
+listagem_args.add_argument("total", type=inputs.boolean, location="args", required=False, default=False, help="total deve ser true ou false.")
+"""
+    Argumentos da exclusão de dimensões [ UF, NCM, País, Via, URF, UE ]
+    assincrono:bool    -  Expurga as transações em lotes, em segundo plano (responde 202)
+"""
+expurgo_args = reqparse.RequestParser()
+expurgo_args.add_argument("assincrono", type=inputs.boolean, location="args", required=False, default=False, help="assincrono deve ser true ou false.")
@@ -0,0 +1,54 @@
+"""Streaming (NDJSON/CSV) of large result sets.
+
+Rows are written as they arrive from a server-side cursor, in blocks of
+`LINHAS_POR_BLOCO`, so memory stays flat regardless of the result size.
+"""
+
+import csv
+import io
+import json
+from decimal import Decimal
+from itertools import islice
+from flask import Response, stream_with_context
+
+LINHAS_POR_BLOCO = 1000
+
+
+def _json_default(valor):
+    if isinstance(valor, Decimal):
+        return float(valor)
+    raise TypeError(f"{type(valor).__name__} não é serializável em JSON.")
+
+
+def _blocos(rows):
+    rows = iter(rows)
+    while bloco := list(islice(rows, LINHAS_POR_BLOCO)):
+        yield bloco
+
+
+def _ndjson(rows):
+    for bloco in _blocos(rows):
+        yield "".join(json.dumps(row._asdict(), default=_json_default) + "\n" for row in bloco)
+
+
+def _csv(rows, colunas):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(colunas)
+    for bloco in _blocos(rows):
+        writer.writerows(bloco)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()  # só o cabeçalho, quando não há linhas
+
+
+def stream_response(rows, colunas, formato, nome):
+    """Streamed response with the `rows` (SQLAlchemy rows) as NDJSON or CSV."""
+    if formato == "ndjson":
+        return Response(stream_with_context(_ndjson(rows)), mimetype="application/x-ndjson")
+    return Response(
+        stream_with_context(_csv(rows, colunas)),
+        mimetype="text/csv",
+        headers={"Content-Disposition": f"attachment; filename={nome}.csv"},
+    )
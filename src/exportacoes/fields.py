@@ -1,30 +1,36 @@
 """Format the data."""
 
 from flask_restful import fields
+from src.utils.fields import ValorAgregado
 
 
-# Modelo de retorno ajustado para a paginação.
-model_fields = {
-    "data": {
-    "total": fields.Integer,
-    "page": fields.Integer,
-    "per_page": fields.Integer,
-    "items": fields.List(fields.Nested({
-        "id": fields.Integer,
-        "ano": fields.Integer,
-        "mes": fields.Integer,
-        "peso": fields.Integer,
-        "valor": fields.Integer,
-        "valor_agregado": fields.Float,
-        "ncm_id": fields.Integer,
-        "ue_id": fields.Integer,
-        "pais_id": fields.Integer,
-        "uf_id": fields.Integer,
-        "via_id": fields.Integer,
-        "urf_id": fields.Integer,
-        "codigo": fields.String,
-        "nome": fields.String,
-    }))
-}}
+item_fields = {
+    "id": fields.Integer,
+    "ano": fields.Integer,
+    "mes": fields.Integer,
+    "peso": fields.Integer,
+    "valor": fields.Integer,
+    "valor_agregado": ValorAgregado,
+    # FKs
+    "ncm_id": fields.Integer,
+    "ue_id": fields.Integer,
+    "pais_id": fields.Integer,
+    "uf_id": fields.Integer,
+    "via_id": fields.Integer,
+    "urf_id": fields.Integer,
+}
 
+model_fields = {
+    "data": item_fields,
+}
 
+# Modelo de retorno da listagem paginada.
+pagina_fields = {
+    "data": {
+        "total": fields.Integer(default=None),  # só com `?total=true`
+        "page": fields.Integer,
+        "per_page": fields.Integer,
+        "has_next": fields.Boolean,
+        "items": fields.List(fields.Nested(item_fields)),
+    },
+}
@@ -1,28 +1,35 @@
+from src.core.bulk import inserir_em_lote
+from src.core.dimensoes import validar_chaves
+from src.core.queries import COLUNAS_LISTAGEM, TransacaoQueries
+from src.core.request import FILTROS_LISTAGEM, MAX_PER_PAGE, listagem_args
 from src.core.resources import BaseResource
-from src.ncms.model import NCMModel
-from src.paises.model import PaisModel
-from src.ues.model import UEModel
-from src.ufs.model import UFModel
-from src.urfs.model import URFModel
-from src.utils import sqlalchemy
-from src.vias.model import ViaModel
+from src.core.streaming import stream_response
+from src.importers import resumos
+from src.resumos import consultas
 from .model import ExportacaoModel
-from .fields import model_fields
+from .fields import model_fields, pagina_fields
 from .request import model_args
 
-from flask_sqlalchemy import SQLAlchemy
-from flask_restful import Resource, marshal_with, abort
-from werkzeug import exceptions
+from flask_restful import marshal, marshal_with, abort
+
+
+queries = TransacaoQueries("exportacoes")
 
 
 class Exportacoes(BaseResource):
     """Model's collection routing (controller)."""
 
-    @marshal_with(model_fields)
     def get(self):
-        """Get all entries."""
-        entries = self.db.session.query(ExportacaoModel).all()
-        return entries
+        """Get entries, paginated and filtered, or stream all of them as NDJSON/CSV."""
+        args = listagem_args.parse_args()
+        filtros = {campo: args[campo] for campo in FILTROS_LISTAGEM if args[campo] is not None}
+
+        if args["formato"] != "json":
+            return stream_response(queries.iterar(filtros), COLUNAS_LISTAGEM, args["formato"], "exportacoes")
+
+        page = max(1, args["page"])
+        per_page = min(max(1, args["per_page"]), MAX_PER_PAGE)
+        return marshal(queries.listar(filtros, page, per_page, args["total"]), pagina_fields)
 
     @marshal_with(model_fields)
     def post(self):
@@ -30,49 +37,32 @@ class Exportacoes(BaseResource):
         # input validation
         args = model_args.parse_args(strict=True)
 
+        # FKs: one existence check, assigned as columns
+        chaves = validar_chaves(args)
+
         entry = ExportacaoModel(
             ano=args["ano"],
             mes=args["mes"],
             peso=args["peso"],
             valor=args["valor"],
+            **chaves,
         )
 
-        if "ncm_id" in args:
-            ncm = self.db.session.get(NCMModel, args["ncm_id"])
-            if not ncm:
-                return abort(404, message="NCM não encontrado.")
-            entry.ncm = ncm
-        if "ue_id" in args:
-            ue = self.db.session.get(UEModel, args["ue_id"])
-            if not ue:
-                return abort(404, message="UE não encontrado.")
-            entry.ue = ue
-        if "pais_id" in args:
-            pais = self.db.session.get(PaisModel, args["pais_id"])
-            if not pais:
-                return abort(404, message="País não encontrado.")
-            entry.pais = pais
-        if "uf_id" in args:
-            uf = self.db.session.get(UFModel, args["uf_id"])
-            if not uf:
-                return abort(404, message="UF não encontrado.")
-            entry.uf = uf
-        if "via_id" in args:
-            via = self.db.session.get(ViaModel, args["via_id"])
-            if not via:
-                return abort(404, message="Via não encontrado.")
-            entry.via = via
-        if "urf_id" in args:
-            urf = self.db.session.get(URFModel, args["urf_id"])
-            if not urf:
-                return abort(404, message="URF não encontrado.")
-            entry.urf = urf
-
         self.db.session.add(entry)
+        if consultas.disponivel():
+            resumos.ajustar(self.db.session.connection(), "exportacoes", depois=resumos.linha(entry))
         self.db.session.commit()
         return entry, 201
 
 
+
+class ExportacoesBulk(BaseResource):
+    """Bulk ingestion routing (controller)."""
+
+    def post(self):
+        """Create entries from a JSON array or an NDJSON stream; errors are reported by row index."""
+        return inserir_em_lote(ExportacaoModel, "exportacoes", model_args)
+
 class Exportacao(BaseResource):
     """Model's routing (controller)."""
 
@@ -103,42 +93,18 @@ class Exportacao(BaseResource):
         if not entry:
             abort(404, message="Nenhum registro encontrado.")
 
-        # FKs
-        if "ncm_id" in args:
-            ncm = self.db.session.get(NCMModel, args["ncm_id"])
-            if not ncm:
-                return abort(404, message="NCM não encontrado.")
-            entry.ncm = ncm
-        if "ue_id" in args:
-            ue = self.db.session.get(UEModel, args["ue_id"])
-            if not ue:
-                return abort(404, message="UE não encontrado.")
-            entry.ue = ue
-        if "pais_id" in args:
-            pais = self.db.session.get(PaisModel, args["pais_id"])
-            if not pais:
-                return abort(404, message="País não encontrado.")
-            entry.pais = pais
-        if "uf_id" in args:
-            uf = self.db.session.get(UFModel, args["uf_id"])
-            if not uf:
-                return abort(404, message="UF não encontrado.")
-            entry.uf = uf
-        if "via_id" in args:
-            via = self.db.session.get(ViaModel, args["via_id"])
-            if not via:
-                return abort(404, message="Via não encontrado.")
-            entry.via = via
-        if "urf_id" in args:
-            urf = self.db.session.get(URFModel, args["urf_id"])
-            if not urf:
-                return abort(404, message="URF não encontrado.")
-            entry.urf = urf
+        antes = resumos.linha(entry)
+
+        # FKs: one existence check, assigned as columns
+        for coluna, valor in validar_chaves(args).items():
+            setattr(entry, coluna, valor)
 
         entry.ano = args["ano"]
         entry.mes = args["mes"]
         entry.peso = args["peso"]
         entry.valor = args["valor"]
+        if consultas.disponivel():
+            resumos.ajustar(self.db.session.connection(), "exportacoes", antes, resumos.linha(entry))
         self.db.session.commit()
         return None, 204
 
@@ -147,6 +113,8 @@ class Exportacao(BaseResource):
         entry = self.db.session.query(ExportacaoModel).filter_by(id=id).first()
         if not entry:
             abort(404, message="Nenhum registro encontrado.")
+        if consultas.disponivel():
+            resumos.ajustar(self.db.session.connection(), "exportacoes", antes=resumos.linha(entry))
         self.db.session.delete(entry)
         self.db.session.commit()
         return None, 204
@@ -1,6 +1,7 @@
+from decimal import ROUND_HALF_UP, Decimal
 from typing import Optional
 from src.core.base import BaseModel
-from sqlalchemy import ForeignKey, Integer, String, BigInteger, func
+from sqlalchemy import BigInteger, Computed, ForeignKey, Integer, Numeric, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.ext.hybrid import hybrid_property
 from src.ncms.model import NCMModel
@@ -21,6 +22,12 @@ class ImportacaoModel(BaseModel):
     mes: Mapped[int] = mapped_column(Integer)
     peso: Mapped[int] = mapped_column(BigInteger)
     valor: Mapped[int] = mapped_column(BigInteger)
+    # coluna gerada (STORED), indexada com (uf_id, ano, valor_agregado DESC, id DESC)
+    _valor_agregado: Mapped[Optional[Decimal]] = mapped_column(
+        "valor_agregado",
+        Numeric(20, 4),
+        Computed("valor / NULLIF(peso, 0)", persisted=True),
+    )
 
     # FKs
     ncm_id: Mapped[Optional[int]] = mapped_column(
@@ -56,13 +63,14 @@ class ImportacaoModel(BaseModel):
 
     @hybrid_property
     def valor_agregado(self):
-        if self.peso == 0:  # Prevent division by zero
+        # mesmo valor da coluna gerada, também antes do flush (DECIMAL do MySQL: 4 casas, arredondado)
+        if not self.peso or self.valor is None:
             return None
-        return round(self.valor / self.peso, 2)
+        return (Decimal(self.valor) / Decimal(self.peso)).quantize(Decimal("0.0001"), rounding=ROUND_HALF_UP)
 
     @valor_agregado.expression
     def valor_agregado(cls):
-        return func.round(cls.valor / cls.peso, 2)
+        return cls._valor_agregado
 
     def __repr__(self):
         return f"Transação: \
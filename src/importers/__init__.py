@@ -1,2 +1,2 @@
 BATCH_SIZE = 100000  # database commit batch maximum size
-LIMIT = 10000  # how many rows an importer is allowed to import
+UPSERT_BATCH_SIZE = 1000  # rows per multi-row INSERT statement in the reference importers
@@ -64,6 +64,57 @@ def replace_option(f):
     )(f)
 
 
+def carga_option(f):
+    """Decorator for `--carga` option (how the transactions are loaded into the db)."""
+    return click.option(
+        "--carga",
+        type=click.Choice(["executemany", "infile"], case_sensitive=False),
+        default="executemany",
+        show_default=True,
+        help="Método de carga: INSERT parametrizado (executemany) ou LOAD DATA LOCAL INFILE (infile).",
+    )(f)
+
+
+def workers_option(f):
+    """Decorator for `--workers` option (processes used to parse the CSV)."""
+    return click.option(
+        "--workers",
+        type=click.IntRange(min=1),
+        default=1,
+        show_default=True,
+        help="Quantidade de processos usados para ler e mapear o CSV.",
+    )(f)
+
+
+def import_mode_options(f):
+    """Decorator for `--incremental`, `--resume`, `--cache` and `--refresh-from` options."""
+    f = click.option(
+        "--refresh-from",
+        "refresh_from",
+        type=click.DateTime(formats=["%Y-%m"]),
+        default=None,
+        help="Substitui os meses a partir de YYYY-MM (implica --incremental).",
+    )(f)
+    f = click.option(
+        "--cache",
+        is_flag=True,
+        default=False,
+        help="Lê do cache Parquet do CSV (requer pyarrow; gerado na primeira execução).",
+    )(f)
+    f = click.option(
+        "--resume",
+        is_flag=True,
+        default=False,
+        help="Continua a importação a partir do último chunk commitado deste arquivo (com os mesmos períodos ignorados).",
+    )(f)
+    return click.option(
+        "--incremental",
+        is_flag=True,
+        default=False,
+        help="Importa apenas os meses (ano/mês) que ainda não estão no Banco de Dados.",
+    )(f)
+
+
 @click.group(invoke_without_command=True)
 @click.pass_context
 @replace_option
@@ -98,6 +149,75 @@ def update(ctx, replace: str):
 comex.add_command(update)
 
 
+@comex.command("cache")
+@click.argument("arquivos", nargs=-1, type=click.Path(exists=True, dir_okay=False))
+def cache(arquivos):
+    """Gera (ou atualiza) o cache Parquet dos CSVs de transações."""
+    from .parquet_cache import garantir_cache
+
+    arquivos = arquivos or (
+        "./data/dados_comex_EXP_2014_2024.csv",
+        "./data/dados_comex_IMP_2014_2024.csv",
+    )
+    for caminho_csv in arquivos:
+        try:
+            garantir_cache(caminho_csv)
+            click.echo(f"✅ Cache de '{caminho_csv}' atualizado.")
+        except Exception as e:
+            click.echo(f"❌ Erro ao gerar o cache de '{caminho_csv}': {str(e)}", err=True)
+
+
+def atualizar_agregados(caminho=None):
+    """Regenerate the shared aggregate file (`APP_ANALYTICS_ARQUIVO`), when configured."""
+    from flask import current_app
+    from src.core.agregados import construir
+
+    caminho = caminho or current_app.config.get("ANALYTICS_ARQUIVO")
+    if not caminho:
+        return
+    try:
+        versao = construir(caminho)
+        click.echo(f"✅ Arquivo de agregados '{caminho}' atualizado (versão {versao}).")
+    except Exception as e:
+        click.echo(f"❌ Erro ao gerar o arquivo de agregados '{caminho}': {str(e)}", err=True)
+
+
+@comex.command("agregados")
+@click.argument("caminho", required=False, type=click.Path(dir_okay=False))
+@with_appcontext
+def agregados(caminho):
+    """Gera o arquivo de agregados mapeado pelos workers (padrão: APP_ANALYTICS_ARQUIVO)."""
+    from flask import current_app
+
+    if not caminho and not current_app.config.get("ANALYTICS_ARQUIVO"):
+        click.echo("❌ Informe o caminho do arquivo ou configure APP_ANALYTICS_ARQUIVO.", err=True)
+        return
+    atualizar_agregados(caminho)
+
+
+@comex.command("resumos")
+@click.argument("fluxos", nargs=-1, type=click.Choice(["exportacoes", "importacoes"]))
+@with_appcontext
+def resumos(fluxos):
+    """Recalcula as tabelas de resumo a partir das transações (por exemplo, após alterações pela API)."""
+    from .resumos import criar_tabelas, reconstruir
+    from src.core.cache import criar_tabela, incrementar_versao
+    from src.utils.sqlalchemy import SQLAlchemy
+
+    db = SQLAlchemy.get_instance()
+    criar_tabelas(db)
+    criar_tabela(db.engine)
+    for fluxo in fluxos or ("exportacoes", "importacoes"):
+        try:
+            with db.engine.begin() as conn:
+                reconstruir(conn, fluxo)
+                incrementar_versao(conn)
+            click.echo(f"✅ Resumos de '{fluxo}' recalculados.")
+        except Exception as e:
+            click.echo(f"❌ Erro ao recalcular os resumos de '{fluxo}': {str(e)}", err=True)
+    atualizar_agregados()
+
+
 @update.command("ufs")
 @click.pass_context
 @with_progress_animation()
@@ -244,9 +364,20 @@ def vias(ctx):
 
 @update.command("exportacoes")
 @click.pass_context
+@carga_option
+@workers_option
+@import_mode_options
 @with_appcontext
 @with_progress_animation()
-def exportacoes(ctx):
+def exportacoes(
+    ctx,
+    carga: str = "executemany",
+    workers: int = 1,
+    incremental: bool = False,
+    resume: bool = False,
+    cache: bool = False,
+    refresh_from=None,
+):
     """Import as transações de exportação."""
     replace = ctx.obj["replace"]
     click.echo(f"Importando as transações de exportação!")
@@ -258,19 +389,43 @@ def exportacoes(ctx):
     try:
         # importar(replace == "sim")
         db = SQLAlchemy.get_instance()
+        if refresh_from is not None:
+            refresh_from = refresh_from.year * 100 + refresh_from.month
         # Descomente as linha abaixo caso queira importar dados de EXPORTACOES
         caminho_csv = "./data/dados_comex_EXP_2014_2024.csv"
-        importar_dados(db, caminho_csv, "exportacoes")
-        click.echo("✅ Transações atualizadas.")
+        stats = importar_dados(
+            db,
+            caminho_csv,
+            "exportacoes",
+            carga=carga,
+            workers=workers,
+            incremental=incremental,
+            refresh_from=refresh_from,
+            resume=resume,
+            cache=cache,
+        )
+        click.echo(f"✅ Transações atualizadas: {stats}")
+        atualizar_agregados()
     except Exception as e:
         click.echo(f"❌ Erro ao import Transações: {str(e)}", err=True)
 
 
 @update.command("importacoes")
 @click.pass_context
+@carga_option
+@workers_option
+@import_mode_options
 @with_appcontext
 @with_progress_animation()
-def importacoes(ctx):
+def importacoes(
+    ctx,
+    carga: str = "executemany",
+    workers: int = 1,
+    incremental: bool = False,
+    resume: bool = False,
+    cache: bool = False,
+    refresh_from=None,
+):
     """Import as Transações de Importação."""
     replace = ctx.obj["replace"]
     click.echo(f"Importando as Transações de Importação!")
@@ -282,8 +437,20 @@ def importacoes(ctx):
     try:
         # importar(replace == "sim")
         db = SQLAlchemy.get_instance()
+        if refresh_from is not None:
+            refresh_from = refresh_from.year * 100 + refresh_from.month
         caminho_csv = "./data/dados_comex_IMP_2014_2024.csv"
-        importar_dados(db, caminho_csv)
-        click.echo("✅ Transações atualizadas.")
+        stats = importar_dados(
+            db,
+            caminho_csv,
+            carga=carga,
+            workers=workers,
+            incremental=incremental,
+            refresh_from=refresh_from,
+            resume=resume,
+            cache=cache,
+        )
+        click.echo(f"✅ Transações atualizadas: {stats}")
+        atualizar_agregados()
     except Exception as e:
         click.echo(f"❌ Erro ao import Transações: {str(e)}", err=True)
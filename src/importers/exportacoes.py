@@ -1,5 +1,5 @@
 from .transacoes import importar_dados
 
 
-def importar(db, caminho_csv):
-    importar_dados(db, caminho_csv, "exportacoes")
+def importar(db, caminho_csv, **kwargs):
+    return importar_dados(db, caminho_csv, "exportacoes", **kwargs)
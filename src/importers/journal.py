@@ -0,0 +1,103 @@
+import hashlib
+from typing import Optional
+from src.core.base import BaseModel
+from sqlalchemy import BigInteger, Boolean, String, Text, UniqueConstraint, insert, select, update
+from sqlalchemy.orm import Mapped, mapped_column
+
+
+class ImportJournalModel(BaseModel):
+    """Progresso das importações de transações, por tabela, arquivo de origem e fonte lida."""
+
+    __tablename__ = "import_journal"
+    __table_args__ = (UniqueConstraint("tabela", "arquivo_hash", "fonte"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    tabela: Mapped[str] = mapped_column(String(63))
+    arquivo_hash: Mapped[str] = mapped_column(String(64))
+    fonte: Mapped[str] = mapped_column(String(15), default="csv")  # "csv" ou "parquet"
+    posicao: Mapped[int] = mapped_column(BigInteger, default=0)  # byte do CSV (ou parte do cache) já commitado
+    linhas: Mapped[int] = mapped_column(BigInteger, default=0)
+    concluido: Mapped[bool] = mapped_column(Boolean, default=False)
+    # períodos (`ano * 100 + mes`) ignorados pela importação incremental, separados por vírgula
+    periodos_ignorados: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    def __repr__(self):
+        return f"Importação: tabela = {self.tabela!r}, arquivo = {self.arquivo_hash!r}, posição = {self.posicao!r}, concluído = {self.concluido!r}."
+
+
+def hash_arquivo(caminho, tamanho_bloco=1024 * 1024):
+    """SHA-256 do conteúdo do arquivo."""
+    sha = hashlib.sha256()
+    with open(caminho, "rb") as arquivo:
+        for bloco in iter(lambda: arquivo.read(tamanho_bloco), b""):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+
+class Journal:
+    """Checkpoint de uma importação, gravado na mesma transação de cada chunk.
+
+    Como a posição é atualizada junto com as linhas inseridas, um `--resume`
+    continua exatamente do último chunk commitado, sem duplicar registros.
+    Os períodos ignorados por uma importação incremental também ficam
+    gravados: recalculados no `--resume`, incluiriam o mês que estava sendo
+    importado quando ela foi interrompida.
+    """
+
+    def __init__(self, db, tabela, arquivo_hash, fonte="csv"):
+        self.db = db
+        self.table = ImportJournalModel.__table__
+        self.table.create(bind=db.engine, checkfirst=True)
+        self.filtro = (
+            (self.table.c.tabela == tabela)
+            & (self.table.c.arquivo_hash == arquivo_hash)
+            & (self.table.c.fonte == fonte)
+        )
+
+        with db.engine.begin() as conn:
+            self.entrada = conn.execute(select(self.table).where(self.filtro)).first()
+            if self.entrada is None:
+                conn.execute(insert(self.table).values(tabela=tabela, arquivo_hash=arquivo_hash, fonte=fonte))
+                self.entrada = conn.execute(select(self.table).where(self.filtro)).first()
+
+    @property
+    def posicao(self):
+        return self.entrada.posicao
+
+    @property
+    def concluido(self):
+        return self.entrada.concluido
+
+    @property
+    def periodos_ignorados(self):
+        """Períodos ignorados pela importação registrada (vazio se não era incremental)."""
+        if not self.entrada.periodos_ignorados:
+            return frozenset()
+        return frozenset(int(periodo) for periodo in self.entrada.periodos_ignorados.split(","))
+
+    def reiniciar(self, periodos_ignorados=frozenset()):
+        """Descarta o progresso anterior (nova importação do mesmo arquivo).
+
+        Args:
+            periodos_ignorados (frozenset): períodos que a nova importação ignora.
+        """
+        ignorados = ",".join(str(periodo) for periodo in sorted(periodos_ignorados)) or None
+        with self.db.engine.begin() as conn:
+            conn.execute(
+                update(self.table)
+                .where(self.filtro)
+                .values(posicao=0, linhas=0, concluido=False, periodos_ignorados=ignorados)
+            )
+            self.entrada = conn.execute(select(self.table).where(self.filtro)).first()
+
+    def registrar(self, conn, posicao, linhas):
+        """Grava o checkpoint usando a conexão (e a transação) do chunk inserido."""
+        conn.execute(
+            update(self.table)
+            .where(self.filtro)
+            .values(posicao=posicao, linhas=self.table.c.linhas + linhas)
+        )
+
+    def concluir(self):
+        with self.db.engine.begin() as conn:
+            conn.execute(update(self.table).where(self.filtro).values(concluido=True))
@@ -1,7 +1,7 @@
 import pandas as pd
 from ..ncms.model import NCMModel
 from ..utils.sqlalchemy import SQLAlchemy
-from . import BATCH_SIZE, LIMIT
+from .upsert import bulk_upsert
 
 baseurl = "https://balanca.economia.gov.br/balanca/bd/tabelas/NCM.csv"
 
@@ -12,31 +12,11 @@ def importar(replace: bool = False):
 
     db = SQLAlchemy.get_instance()
 
-    # Para cada linha do CSV, criar um objeto NCMModel e salvar no BD
-    for index, row in exp_df_base.iterrows():
-        # Se a primeira linha do CSV for cabeçalho, podemos pular index == 0
-        if index == 0:
-            continue
-
-        ncm = db.session.query(NCMModel).filter_by(codigo=row["CO_NCM"]).first()
-        if ncm and not replace:
-            continue
-        elif not ncm:
-            ncm = NCMModel()
-
-        ncm.codigo = str(row["CO_NCM"]).strip()
-        ncm.descricao = str(row["NO_NCM_POR"]).strip()
-
-        db.session.add(ncm)
-
-        # Commit in batches
-        if index % BATCH_SIZE == 0:
-            db.session.commit()
-        if index == LIMIT:
-            break
-
-    # Efetua o commit após inserir todos os registros
-    db.session.commit()
+    dados = pd.DataFrame({
+        "codigo": exp_df_base["CO_NCM"],
+        "descricao": exp_df_base["NO_NCM_POR"],
+    })
+    bulk_upsert(db, NCMModel, dados, replace)
 
 
 if __name__ == "__main__":
@@ -1,7 +1,7 @@
 import pandas as pd
 from ..paises.model import PaisModel
 from ..utils.sqlalchemy import SQLAlchemy
-from . import BATCH_SIZE, LIMIT
+from .upsert import bulk_upsert
 
 baseurl = "https://balanca.economia.gov.br/balanca/bd/tabelas/PAIS.csv"
 
@@ -12,30 +12,11 @@ def importar(replace: bool = False):
 
     db = SQLAlchemy.get_instance()
 
-    # para cada linha do CSV, criar um objeto PaisModel e salvar no BD
-    for index, row in exp_df_base.iterrows():
-        # Se a primeira linha do CSV for cabeçalho, você pode pular index == 0
-        if index == 0:
-            continue
-
-        pais = db.session.query(PaisModel).filter_by(codigo=row["CO_PAIS"]).first()
-        if pais and not replace:
-            continue
-        elif not pais:
-            pais = PaisModel()
-
-        pais.codigo = str(row["CO_PAIS"]).strip()
-        pais.nome = str(row["NO_PAIS"]).strip()
-
-        db.session.add(pais)
-
-        # Commit in batches
-        if index % BATCH_SIZE == 0:
-            db.session.commit()
-        if index == LIMIT:
-            break
-
-    db.session.commit()
+    dados = pd.DataFrame({
+        "codigo": exp_df_base["CO_PAIS"],
+        "nome": exp_df_base["NO_PAIS"],
+    })
+    bulk_upsert(db, PaisModel, dados, replace)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,163 @@
+"""Cache colunar (Parquet) dos CSVs do COMEX, particionado por ano.
+
+O CSV é convertido uma única vez para `data/cache/<arquivo>/ANO=<ano>/parte-<n>.parquet`
+com tipos explícitos; importações e análises posteriores leem só as colunas e
+os anos de que precisam. O cache é identificado pelo tamanho, mtime e SHA-256
+do CSV de origem e é reconstruído quando o arquivo muda.
+"""
+
+import json
+import os
+import shutil
+import pandas as pd
+from tqdm import tqdm
+from .journal import hash_arquivo
+from .reader import ler_cabecalho
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+
+CACHE_DIR = "./data/cache"
+LINHAS_POR_LEITURA = 500_000  # linhas do CSV lidas por vez durante a conversão
+META = "_cache.json"
+
+TIPOS = {
+    "ANO": "Int16",
+    "CO_MES": "Int8",
+    "KG_LIQUIDO": "Int64",
+    "VL_FOB": "Int64",
+}
+
+
+def _exigir_pyarrow():
+    if pa is None:
+        raise RuntimeError("O cache Parquet requer o pacote 'pyarrow' (pip install pyarrow).")
+
+
+def diretorio_cache(caminho_csv):
+    nome = os.path.splitext(os.path.basename(caminho_csv))[0]
+    return os.path.join(CACHE_DIR, nome)
+
+
+def _ler_meta(diretorio):
+    try:
+        with open(os.path.join(diretorio, META), encoding="utf-8") as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError):
+        return None
+
+
+def _cache_valido(caminho_csv, meta):
+    """Confere o cache pelo tamanho/mtime e, se só o mtime mudou, pelo hash."""
+    if meta is None:
+        return False
+
+    info = os.stat(caminho_csv)
+    if meta["tamanho"] != info.st_size:
+        return False
+    if meta["mtime"] == info.st_mtime:
+        return True
+
+    if hash_arquivo(caminho_csv) != meta["sha256"]:
+        return False
+    meta["mtime"] = info.st_mtime  # mesmo conteúdo, arquivo apenas tocado
+    with open(os.path.join(diretorio_cache(caminho_csv), META), "w", encoding="utf-8") as arquivo:
+        json.dump(meta, arquivo)
+    return True
+
+
+def _tipar(df):
+    """Converte as colunas numéricas para inteiros compactos e as textuais para categorias."""
+    tipos = {coluna: tipo for coluna, tipo in TIPOS.items() if coluna in df.columns}
+    for coluna in df.columns:
+        if coluna in tipos:
+            continue
+        if not pd.api.types.is_numeric_dtype(df[coluna]):
+            tipos[coluna] = "category"
+        elif coluna.startswith("CO_"):
+            tipos[coluna] = "Int32"
+    return df.astype(tipos)
+
+
+def construir_cache(caminho_csv):
+    """Converte o CSV para o cache Parquet, substituindo o anterior de forma atômica.
+
+    Returns:
+        dict: metadados do cache (tamanho, mtime e sha256 do CSV).
+    """
+    _exigir_pyarrow()
+    ler_cabecalho(caminho_csv)  # falha antes de gerar um cache inválido
+
+    diretorio = diretorio_cache(caminho_csv)
+    temporario = diretorio + ".tmp"
+    shutil.rmtree(temporario, ignore_errors=True)
+    os.makedirs(temporario)
+
+    info = os.stat(caminho_csv)
+    meta = {
+        "arquivo": os.path.basename(caminho_csv),
+        "tamanho": info.st_size,
+        "mtime": info.st_mtime,
+        "sha256": hash_arquivo(caminho_csv),
+    }
+
+    leituras = pd.read_csv(caminho_csv, chunksize=LINHAS_POR_LEITURA)
+    for n, chunk in enumerate(tqdm(leituras, desc=f"Gerando cache de '{meta['arquivo']}'")):
+        chunk = _tipar(chunk)
+        for ano, grupo in chunk.groupby("ANO", observed=True):
+            particao = os.path.join(temporario, f"ANO={ano}")
+            os.makedirs(particao, exist_ok=True)
+            tabela = pa.Table.from_pandas(grupo, preserve_index=False)
+            pq.write_table(tabela, os.path.join(particao, f"parte-{n:05d}.parquet"))
+
+    with open(os.path.join(temporario, META), "w", encoding="utf-8") as arquivo:
+        json.dump(meta, arquivo)
+
+    shutil.rmtree(diretorio, ignore_errors=True)
+    os.replace(temporario, diretorio)
+    return meta
+
+
+def garantir_cache(caminho_csv):
+    """Retorna os metadados do cache do CSV, (re)construindo-o se necessário."""
+    _exigir_pyarrow()
+    meta = _ler_meta(diretorio_cache(caminho_csv))
+    if _cache_valido(caminho_csv, meta):
+        return meta
+    return construir_cache(caminho_csv)
+
+
+def partes(caminho_csv):
+    """Lista `(ano, caminho)` das partes do cache, em ordem estável."""
+    diretorio = diretorio_cache(caminho_csv)
+    resultado = []
+    for particao in sorted(os.listdir(diretorio)):
+        if not particao.startswith("ANO="):
+            continue
+        ano = int(particao.split("=", 1)[1])
+        for nome in sorted(os.listdir(os.path.join(diretorio, particao))):
+            resultado.append((ano, os.path.join(diretorio, particao, nome)))
+    return resultado
+
+
+def ler_parte(caminho, colunas=None):
+    """Lê uma parte do cache, apenas com as colunas pedidas."""
+    return pq.read_table(caminho, columns=colunas).to_pandas()
+
+
+def ler_cache(caminho_csv, colunas=None, anos=None):
+    """Itera sobre o cache do CSV em DataFrames, lendo só as colunas e os anos pedidos.
+
+    Pensado para análises fora da importação, por exemplo:
+
+        for df in ler_cache("./data/dados_comex_EXP_2014_2024.csv", ["ANO", "VL_FOB"], anos={2023, 2024}):
+            ...
+    """
+    garantir_cache(caminho_csv)
+    for ano, caminho in partes(caminho_csv):
+        if anos is None or ano in anos:
+            yield ler_parte(caminho, colunas)
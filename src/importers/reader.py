@@ -0,0 +1,106 @@
+"""Leitura tipada dos CSVs de transações do COMEX.
+
+Apenas as colunas usadas pela importação são materializadas, com larguras
+inteiras fixas. As dimensões são lidas pelos códigos numéricos do COMEX
+(`CO_*`), resolvidos para IDs por `MapaCodigos`, em vez das descrições.
+"""
+
+import io
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+
+    ENGINE = "pyarrow"
+except ImportError:
+    ENGINE = "c"
+
+
+SCHEMA = {
+    "ANO": "int16",
+    "CO_MES": "int8",
+    "CO_NCM": "Int32",
+    "CO_UNID": "Int16",
+    "CO_PAIS": "Int16",
+    "CO_UF": "Int16",
+    "CO_VIA": "Int16",
+    "CO_URF": "Int32",
+    "KG_LIQUIDO": "Int64",
+    "VL_FOB": "Int64",
+}
+
+
+def ler_cabecalho(caminho_csv):
+    """Lê o cabeçalho do CSV, falhando logo se faltar alguma coluna do `SCHEMA`.
+
+    Raises:
+        ValueError: se o arquivo não tiver as colunas esperadas.
+    """
+    cabecalho = pd.read_csv(caminho_csv, nrows=0).columns.tolist()
+    faltando = [coluna for coluna in SCHEMA if coluna not in cabecalho]
+    if faltando:
+        raise ValueError(
+            f"Cabeçalho inesperado em '{caminho_csv}': faltam as colunas {', '.join(faltando)}."
+        )
+    return cabecalho
+
+
+def ler_intervalo(dados: bytes, cabecalho):
+    """Interpreta um trecho do CSV (sem cabeçalho) com o `SCHEMA`."""
+    # o engine pyarrow não combina `names` com `usecols`, então o cabeçalho é reposto
+    linha_cabecalho = (",".join(cabecalho) + "\n").encode()
+    return pd.read_csv(
+        io.BytesIO(linha_cabecalho + dados),
+        usecols=list(SCHEMA),
+        dtype=SCHEMA,
+        engine=ENGINE,
+    )
+
+
+class MapaCodigos:
+    """Resolve códigos numéricos do COMEX para os IDs do banco sem hashing de strings.
+
+    Códigos pequenos (UF, País, Via, ...) usam uma tabela densa indexada pelo
+    próprio código; os grandes (NCM tem 8 dígitos) usam busca binária em um
+    array ordenado.
+    """
+
+    LIMITE_DENSO = 1_000_000
+
+    def __init__(self, codigos: np.ndarray, ids: np.ndarray):
+        ordem = np.argsort(codigos)
+        self.codigos = codigos[ordem].astype("int64")
+        self.ids = ids[ordem].astype("int32")
+        self.denso = None
+        if len(self.codigos) and self.codigos[0] >= 0 and self.codigos[-1] < self.LIMITE_DENSO:
+            self.denso = np.zeros(self.codigos[-1] + 1, dtype="int32")  # 0: código inexistente
+            self.denso[self.codigos] = self.ids
+
+    @classmethod
+    def de_codigos(cls, codigos: pd.Series, ids: pd.Series):
+        """Monta o mapa a partir das colunas `codigo` (texto) e `id` de uma dimensão.
+
+        Códigos não numéricos são ignorados, já que não aparecem nos CSVs.
+        """
+        codigos = pd.to_numeric(codigos, errors="coerce")
+        validos = codigos.notna().to_numpy()
+        return cls(codigos.to_numpy()[validos].astype("int64"), ids.to_numpy()[validos])
+
+    def resolver(self, serie: pd.Series) -> pd.Series:
+        """IDs (float, NaN quando o código não existe) para uma coluna de códigos."""
+        valores = serie.to_numpy(dtype="float64", na_value=np.nan)
+        validos = ~np.isnan(valores)
+        codigos = np.where(validos, valores, -1).astype("int64")
+        resultado = np.full(len(codigos), np.nan)
+
+        if self.denso is not None:
+            dentro = validos & (codigos >= 0) & (codigos < len(self.denso))
+            ids = self.denso[codigos[dentro]]
+            resultado[dentro] = np.where(ids > 0, ids, np.nan)
+        elif len(self.codigos):
+            posicoes = np.minimum(np.searchsorted(self.codigos, codigos), len(self.codigos) - 1)
+            encontrados = validos & (self.codigos[posicoes] == codigos)
+            resultado[encontrados] = self.ids[posicoes[encontrados]]
+
+        return pd.Series(resultado, index=serie.index)
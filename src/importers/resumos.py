@@ -0,0 +1,168 @@
+"""Manutenção das tabelas de resumo (`src.resumos.model`) pela importação de transações.
+
+Cada chunk importado é agregado em memória e somado aos resumos na mesma
+transação das linhas inseridas, de modo que os totais acompanham a tabela de
+fatos (inclusive em `--resume`). As alterações feitas pela API (transações
+criadas, alteradas ou removidas e dimensões excluídas) são aplicadas com
+`ajustar` e `descontar`. `reconstruir` recalcula os resumos a partir das
+tabelas de fatos: para cargas com `--refresh-from` e quando as tabelas de
+resumo são criadas em um banco que já tem transações.
+"""
+
+from datetime import datetime
+import pandas as pd
+from sqlalchemy import delete, func, inspect, literal, select
+from sqlalchemy.dialects.mysql import insert
+from src.exportacoes.model import ExportacaoModel
+from src.importacoes.model import ImportacaoModel
+from src.resumos.model import RESUMOS
+
+FATOS = {
+    "exportacoes": ExportacaoModel.__table__,
+    "importacoes": ImportacaoModel.__table__,
+}
+
+
+# colunas das tabelas de fatos usadas pelos resumos
+COLUNAS = ["uf_id", "ano", "mes", "via_id", "urf_id", "peso", "valor"]
+
+
+def criar_tabelas(db):
+    """Cria as tabelas de resumo que faltam, já preenchidas com as transações existentes."""
+    inspetor = inspect(db.engine)
+    faltando = [model for model in RESUMOS if not inspetor.has_table(model.__tablename__)]
+    if not faltando:
+        return
+    with db.engine.begin() as conn:
+        for model in faltando:
+            model.__table__.create(bind=conn)
+        for fluxo in FATOS:
+            reconstruir(conn, fluxo)
+
+
+def agregar(df):
+    """Totais (`qtd`, `peso`, `valor`) do DataFrame em cada granularidade de resumo."""
+    agregados = {}
+    for model, extras in RESUMOS.items():
+        agregados[model] = (
+            df.groupby(["uf_id", "ano", *extras], sort=False)
+            .agg(qtd=("valor", "size"), peso=("peso", "sum"), valor=("valor", "sum"))
+            .reset_index()
+        )
+    return agregados
+
+
+def acumular(conn, fluxo, df, sinal=1):
+    """Soma os totais de um chunk aos resumos usando a conexão (e a transação) do chunk.
+
+    Args:
+        sinal (int): -1 desconta os totais (linhas removidas por um expurgo).
+    """
+    agora = datetime.now()
+    for model, grupo in agregar(df).items():
+        if grupo.empty:
+            continue
+        table = model.__table__
+        grupo[["qtd", "peso", "valor"]] *= sinal
+        stmt = insert(table).values(grupo.assign(fluxo=fluxo, created_at=agora).to_dict("records"))
+        conn.execute(
+            stmt.on_duplicate_key_update(
+                qtd=table.c.qtd + stmt.inserted.qtd,
+                peso=table.c.peso + stmt.inserted.peso,
+                valor=table.c.valor + stmt.inserted.valor,
+            )
+        )
+
+
+def linha(transacao):
+    """Colunas de `COLUNAS` de uma transação (instância de `ExportacaoModel` ou `ImportacaoModel`)."""
+    return {coluna: getattr(transacao, coluna) for coluna in COLUNAS}
+
+
+def ajustar(conn, fluxo, antes=None, depois=None):
+    """Aplica aos resumos uma transação criada (`depois`), removida (`antes`) ou alterada (ambos).
+
+    Args:
+        antes (dict): colunas de `COLUNAS` da transação antes da alteração.
+        depois (dict): colunas de `COLUNAS` da transação depois da alteração.
+    """
+    if antes is not None:
+        acumular(conn, fluxo, pd.DataFrame([antes], columns=COLUNAS), sinal=-1)
+    if depois is not None:
+        acumular(conn, fluxo, pd.DataFrame([depois], columns=COLUNAS))
+    if antes is not None:
+        remover_zerados(conn, fluxo)
+
+
+def descontar(conn, fluxo, condicao):
+    """Desconta dos resumos os totais das transações de `fluxo` que atendem a `condicao`.
+
+    Usado antes de uma remoção em massa (pelo `ON DELETE CASCADE` de uma
+    dimensão), com as somas feitas no banco.
+    """
+    fatos = FATOS[fluxo]
+    for model, extras in RESUMOS.items():
+        table = model.__table__
+        chaves = [fatos.c.uf_id, fatos.c.ano, *(fatos.c[coluna] for coluna in extras)]
+        consulta = (
+            select(
+                literal(fluxo),
+                *chaves,
+                -func.count(),
+                -func.coalesce(func.sum(fatos.c.peso), 0),
+                -func.coalesce(func.sum(fatos.c.valor), 0),
+                func.now(),
+            )
+            .where(condicao, *(chave.is_not(None) for chave in chaves))
+            .group_by(*chaves)
+        )
+        colunas = ["fluxo", "uf_id", "ano", *extras, "qtd", "peso", "valor", "created_at"]
+        stmt = insert(table).from_select(colunas, consulta)
+        conn.execute(
+            stmt.on_duplicate_key_update(
+                qtd=table.c.qtd + stmt.inserted.qtd,
+                peso=table.c.peso + stmt.inserted.peso,
+                valor=table.c.valor + stmt.inserted.valor,
+            )
+        )
+    remover_zerados(conn, fluxo)
+
+
+def remover_zerados(conn, fluxo):
+    """Remove os grupos que ficaram sem transações depois de descontados."""
+    for model in RESUMOS:
+        table = model.__table__
+        conn.execute(delete(table).where(table.c.fluxo == fluxo, table.c.qtd <= 0))
+
+
+def reconstruir(conn, fluxo, ano_inicial=None):
+    """Recalcula os resumos de `fluxo` a partir da tabela de fatos.
+
+    Args:
+        ano_inicial (int): limita o recálculo aos anos a partir deste.
+    """
+    fatos = FATOS[fluxo]
+    for model, extras in RESUMOS.items():
+        table = model.__table__
+        chaves = [fatos.c.uf_id, fatos.c.ano, *(fatos.c[coluna] for coluna in extras)]
+
+        remover = delete(table).where(table.c.fluxo == fluxo)
+        consulta = (
+            select(
+                literal(fluxo),
+                *chaves,
+                func.count(),
+                func.coalesce(func.sum(fatos.c.peso), 0),
+                func.coalesce(func.sum(fatos.c.valor), 0),
+                func.now(),
+            )
+            .where(*(chave.is_not(None) for chave in chaves))
+            .group_by(*chaves)
+        )
+        if ano_inicial is not None:
+            remover = remover.where(table.c.ano >= ano_inicial)
+            consulta = consulta.where(fatos.c.ano >= ano_inicial)
+
+        colunas = ["fluxo", "uf_id", "ano", *extras, "qtd", "peso", "valor", "created_at"]
+        conn.execute(remover)
+        conn.execute(insert(table).from_select(colunas, consulta))
@@ -1,7 +1,7 @@
 import pandas as pd
 from ..sh4s.model import SH4Model
 from ..utils.sqlalchemy import SQLAlchemy
-from . import BATCH_SIZE, LIMIT
+from .upsert import bulk_upsert
 
 baseurl = "https://balanca.economia.gov.br/balanca/bd/tabelas/NCM_SH.csv"
 
@@ -9,32 +9,14 @@ baseurl = "https://balanca.economia.gov.br/balanca/bd/tabelas/NCM_SH.csv"
 def importar(replace: bool = False):
     """Importa dados de SH4 e SH6 do COMEX para o banco de dados (ambos no mesmo CSV)."""
     df = pd.read_csv(baseurl, sep=";", encoding="latin1")
-    db = SQLAlchemy.get_instance()
-
-    # Loop para cada linha do CSV
-    for index, row in df.iterrows():
-        # Se a primeira linha do CSV for cabeçalho, podemos pular index == 0
-        if index == 0:
-            continue
-
-        sh4 = db.session.query(SH4Model).filter_by(codigo=row["CO_SH4"]).first()
-        if sh4 and not replace:
-            continue
-        elif not sh4:
-            sh4 = SH4Model()
 
-        sh4.codigo = str(row["CO_SH4"]).strip()
-        sh4.nome = str(row["NO_SH4_POR"]).strip()
-
-        db.session.add(sh4)
-
-        # Commit in batches
-        if index % BATCH_SIZE == 0:
-            db.session.commit()
-        if index == LIMIT:
-            break
+    db = SQLAlchemy.get_instance()
 
-    db.session.commit()
+    dados = pd.DataFrame({
+        "codigo": df["CO_SH4"],
+        "nome": df["NO_SH4_POR"],
+    })
+    bulk_upsert(db, SH4Model, dados, replace)
 
 
 if __name__ == "__main__":
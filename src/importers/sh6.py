@@ -1,7 +1,7 @@
 import pandas as pd
 from ..sh6s.model import SH6Model
 from ..utils.sqlalchemy import SQLAlchemy
-from . import BATCH_SIZE, LIMIT
+from .upsert import bulk_upsert
 
 baseurl = "https://balanca.economia.gov.br/balanca/bd/tabelas/NCM_SH.csv"
 
@@ -9,32 +9,14 @@ baseurl = "https://balanca.economia.gov.br/balanca/bd/tabelas/NCM_SH.csv"
 def importar(replace: bool = False):
     """Importa dados de SH6 e SH6 do COMEX para o banco de dados (ambos no mesmo CSV)."""
     df = pd.read_csv(baseurl, sep=";", encoding="latin1")
-    db = SQLAlchemy.get_instance()
-
-    # Loop para cada linha do CSV
-    for index, row in df.iterrows():
-        # Se a primeira linha do CSV for cabeçalho, podemos pular index == 0
-        if index == 0:
-            continue
-
-        sh6 = db.session.query(SH6Model).filter_by(codigo=row["CO_SH6"]).first()
-        if sh6 and not replace:
-            continue
-        elif not sh6:
-            sh6 = SH6Model()
 
-        sh6.codigo = str(row["CO_SH6"]).strip()
-        sh6.nome = str(row["NO_SH6_POR"]).strip()
-
-        db.session.add(sh6)
-
-        # Commit in batches
-        if index % BATCH_SIZE == 0:
-            db.session.commit()
-        if index == LIMIT:
-            break
+    db = SQLAlchemy.get_instance()
 
-    db.session.commit()
+    dados = pd.DataFrame({
+        "codigo": df["CO_SH6"],
+        "nome": df["NO_SH6_POR"],
+    })
+    bulk_upsert(db, SH6Model, dados, replace)
 
 
 if __name__ == "__main__":
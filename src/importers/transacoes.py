@@ -1,9 +1,46 @@
+import os
+import sys
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 import pandas as pd
 from src import create_app
+from src.core import cache as response_cache
+from src.core import dimensoes
 from src.utils.sqlalchemy import SQLAlchemy
-from sqlalchemy import text
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import DBAPIError
 from tqdm import tqdm
 from datetime import datetime
+from . import parquet_cache, reader, resumos
+from .journal import Journal, hash_arquivo
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+CHUNK_SIZE = 100_000  # linhas por INSERT em `insert_bulk_data`
+BYTES_POR_PARTE = 32 * 1024 * 1024  # tamanho das partes do CSV distribuídas aos workers
+COLUNAS = ['ano', 'mes', 'ncm_id', 'ue_id', 'pais_id', 'uf_id', 'via_id', 'urf_id', 'peso', 'valor']
+
+# coluna de ID -> (tabela da dimensão, coluna do CSV com o código COMEX)
+MAPEAMENTOS = {
+    'ncm_id': ('ncms', 'CO_NCM'),
+    'ue_id': ('ues', 'CO_UNID'),
+    'pais_id': ('paises', 'CO_PAIS'),
+    'uf_id': ('ufs', 'CO_UF'),
+    'via_id': ('vias', 'CO_VIA'),
+    'urf_id': ('urfs', 'CO_URF'),
+}
+# IDs sem os quais a linha é descartada (a UE é opcional no model)
+OBRIGATORIOS = ['ncm_id', 'pais_id', 'uf_id', 'via_id', 'urf_id']
+
+# Erros do MySQL quando o LOAD DATA LOCAL está desabilitado no cliente ou no servidor
+ERROS_LOCAL_INFILE = {1148, 2068, 3948}
 
 
 class DataLoader:
@@ -12,74 +49,465 @@ class DataLoader:
         self._load_reference_ids()
 
     def _load_reference_ids(self):
-        with self.db.engine.connect() as conn:
-            self.ncm_map = pd.read_sql("SELECT id, descricao FROM ncms", conn).set_index('descricao')['id'].to_dict()
-            self.pais_map = pd.read_sql("SELECT id, nome FROM paises", conn).set_index('nome')['id'].to_dict()
-            self.uf_map = pd.read_sql("SELECT id, nome FROM ufs", conn).set_index('nome')['id'].to_dict()
-            self.via_map = pd.read_sql("SELECT id, nome FROM vias", conn).set_index('nome')['id'].to_dict()
-            self.urf_map = pd.read_sql("SELECT id, nome FROM urfs", conn).set_index('nome')['id'].to_dict()
-
-    def insert_bulk_data(self, df, table_name, chunk_size=100000):
-        engine = self.db.engine
+        """Carrega, para cada dimensão, a tabela `código COMEX -> id`."""
+        self.mapas = {}
+        for coluna_id in MAPEAMENTOS:
+            # cache de dimensões do processo, conferido com a versão atual do dataset
+            dimensao = dimensoes.obter(dimensoes.CHAVES_ESTRANGEIRAS[coluna_id][0], recarregar=True)
+            codigos = pd.Series([linha.codigo for linha in dimensao.linhas], dtype=object)
+            self.mapas[coluna_id] = reader.MapaCodigos.de_codigos(codigos, pd.Series(dimensao.ids))
+
+    def insert_chunk(self, df, table_name, checkpoint=None):
+        """Insere um único chunk já processado em uma transação.
+
+        Args:
+            checkpoint (callable): chamado com a conexão antes do commit, para
+                registrar o progresso na mesma transação do chunk.
+        """
+        df = df.assign(created_at=datetime.now())
+        values = df.to_dict(orient='records')
+        if df['ue_id'].hasnans:
+            for row, ue_id in zip(values, df['ue_id'].isna()):
+                if ue_id:
+                    row['ue_id'] = None
+
+        sql = text(f"""
+            INSERT INTO {table_name}
+            ({', '.join(COLUNAS)}, created_at)
+            VALUES ({', '.join(':' + coluna for coluna in COLUNAS)}, :created_at)
+        """)
+
+        with self.db.engine.begin() as conn:
+            if values:
+                conn.execute(sql, values)
+            if checkpoint is not None:
+                checkpoint(conn)
+
+    def insert_bulk_data(self, df, table_name, chunk_size=CHUNK_SIZE):
         total_rows = len(df)
 
         with tqdm(total=total_rows, desc=f"Inserindo em '{table_name}'") as pbar:
             for i in range(0, total_rows, chunk_size):
-                chunk = df.iloc[i:i + chunk_size].copy()  # Cria uma cópia explícita
-                chunk.loc[:, 'created_at'] = datetime.now()
-                values = chunk.to_dict(orient='records')
+                chunk = df.iloc[i:i + chunk_size]
+                self.insert_chunk(chunk, table_name)
+                pbar.update(len(chunk))
 
-                sql = text(f"""
-                    INSERT INTO {table_name} 
-                    (ano, mes, ncm_id, pais_id, uf_id, via_id, urf_id, peso, valor, created_at)
-                    VALUES (:ano, :mes, :ncm_id, :pais_id, :uf_id, :via_id, :urf_id, :peso, :valor, :created_at)
-                """)
 
-                with engine.begin() as conn:
-                    conn.execute(sql, values)
+class InfileDataLoader(DataLoader):
+    """Carrega os chunks com `LOAD DATA LOCAL INFILE` a partir de um TSV temporário.
 
-                pbar.update(len(chunk))
+    Quando o `local_infile` está desabilitado (no servidor ou no cliente), volta
+    a usar o `INSERT` parametrizado do `DataLoader`.
+    """
+
+    def __init__(self, db):
+        super().__init__(db)
+        self.engine = create_engine(db.engine.url, connect_args={"local_infile": 1})
+        try:
+            self.infile_ativo = self._local_infile_habilitado()
+        except Exception:
+            self.engine.dispose()
+            raise
+        if not self.infile_ativo:
+            tqdm.write("⚠️  local_infile desabilitado no servidor, usando INSERT parametrizado.")
+
+    def fechar(self):
+        """Fecha o pool de conexões do engine com `local_infile`."""
+        self.engine.dispose()
+
+    def _local_infile_habilitado(self):
+        with self.engine.connect() as conn:
+            row = conn.execute(text("SHOW GLOBAL VARIABLES LIKE 'local_infile'")).first()
+        return row is not None and str(row[1]).upper() in ("ON", "1")
+
+    def insert_chunk(self, df, table_name, checkpoint=None):
+        if not self.infile_ativo or df.empty:
+            return super().insert_chunk(df, table_name, checkpoint)
+
+        fd, caminho = tempfile.mkstemp(suffix=".tsv")
+        try:
+            with os.fdopen(fd, "w", newline="") as arquivo:
+                df[COLUNAS].to_csv(
+                    arquivo, sep="\t", header=False, index=False, lineterminator="\n", na_rep="\\N"
+                )
+
+            sql = text(f"""
+                LOAD DATA LOCAL INFILE :caminho
+                INTO TABLE {table_name}
+                FIELDS TERMINATED BY '\\t'
+                LINES TERMINATED BY '\\n'
+                ({', '.join(COLUNAS)})
+                SET created_at = NOW()
+            """)
+
+            with self.engine.begin() as conn:
+                conn.execute(sql, {"caminho": caminho.replace(os.sep, "/")})
+                if checkpoint is not None:
+                    checkpoint(conn)
+        except DBAPIError as e:
+            codigo = e.orig.args[0] if e.orig is not None and e.orig.args else None
+            if codigo not in ERROS_LOCAL_INFILE:
+                raise
+            tqdm.write("⚠️  LOAD DATA LOCAL recusado, usando INSERT parametrizado.")
+            self.infile_ativo = False
+            super().insert_chunk(df, table_name, checkpoint)
+        finally:
+            os.remove(caminho)
+
+
+LOADERS = {
+    "executemany": DataLoader,
+    "infile": InfileDataLoader,
+}
+
+
+def processar_chunk(chunk, mapas, ignorar=frozenset()):
+    """Resolve os IDs das dimensões e converte os tipos de um chunk do CSV.
+
+    Args:
+        ignorar (frozenset): períodos (`ano * 100 + mes`) cujas linhas são descartadas.
+    """
+    if ignorar:
+        periodo = chunk['ANO'].astype('int32') * 100 + chunk['CO_MES'].astype('int32')
+        chunk = chunk[~periodo.isin(ignorar)]
+
+    chunk = chunk.assign(**{
+        coluna_id: mapas[coluna_id].resolver(chunk[coluna_csv])
+        for coluna_id, (_, coluna_csv) in MAPEAMENTOS.items()
+    })
+    chunk = chunk.dropna(subset=OBRIGATORIOS)
+
+    df_processed = pd.DataFrame({
+        'ano': chunk['ANO'],
+        'mes': chunk['CO_MES'],
+        'ncm_id': chunk['ncm_id'],
+        'ue_id': chunk['ue_id'],
+        'pais_id': chunk['pais_id'],
+        'uf_id': chunk['uf_id'],
+        'via_id': chunk['via_id'],
+        'urf_id': chunk['urf_id'],
+        'peso': chunk['KG_LIQUIDO'].fillna(0).astype('int64'),
+        'valor': chunk['VL_FOB'].fillna(0).astype('int64'),
+    })
+
+    return df_processed.astype({
+        'ano': 'int32',
+        'mes': 'int32',
+        'ncm_id': 'int32',
+        'ue_id': 'Int32',
+        'pais_id': 'int32',
+        'uf_id': 'int32',
+        'via_id': 'int32',
+        'urf_id': 'int32'
+    })
+
+
+def dividir_csv(caminho_csv, bytes_por_parte=BYTES_POR_PARTE, inicio=None):
+    """Divide o CSV em intervalos de bytes `(inicio, fim)` alinhados a quebras de linha.
+
+    O cabeçalho fica fora dos intervalos. Assume que nenhum campo contém quebra
+    de linha entre aspas, o que vale para os arquivos do COMEX.
+
+    Args:
+        inicio (int): posição (início de linha) a partir da qual dividir; por
+            padrão, logo após o cabeçalho.
+    """
+    tamanho = os.path.getsize(caminho_csv)
+    intervalos = []
+
+    with open(caminho_csv, "rb") as arquivo:
+        arquivo.readline()  # cabeçalho
+        inicio = max(inicio or 0, arquivo.tell())
+        while inicio < tamanho:
+            arquivo.seek(min(inicio + bytes_por_parte, tamanho))
+            arquivo.readline()  # avança até o fim da linha corrente
+            fim = min(arquivo.tell(), tamanho)
+            intervalos.append((inicio, fim))
+            inicio = fim
+
+    return intervalos
+
+
+# Estado de cada processo do pool, enviado uma única vez pelo `initializer`
+_worker = {}
+
+
+def _iniciar_worker(caminho_csv, cabecalho, mapas, ignorar):
+    _worker.update(caminho_csv=caminho_csv, cabecalho=cabecalho, mapas=mapas, ignorar=ignorar)
+
+
+def _processar_intervalo(intervalo):
+    """Lê e processa um intervalo de bytes do CSV; a posição é o byte final."""
+    inicio, fim = intervalo
+    with open(_worker["caminho_csv"], "rb") as arquivo:
+        arquivo.seek(inicio)
+        dados = arquivo.read(fim - inicio)
+
+    chunk = reader.ler_intervalo(dados, _worker["cabecalho"])
+    return fim, len(chunk), processar_chunk(chunk, _worker["mapas"], _worker["ignorar"])
+
+
+def _processar_parte(parte):
+    """Lê e processa uma parte do cache Parquet; a posição é o índice da próxima parte."""
+    indice, caminho = parte
+    chunk = parquet_cache.ler_parte(caminho, list(reader.SCHEMA))
+    return indice + 1, len(chunk), processar_chunk(chunk, _worker["mapas"], _worker["ignorar"])
+
+
+def _executar_em_ordem(funcao, tarefas, workers, initargs):
+    """Aplica `funcao` às tarefas e devolve os resultados na ordem das tarefas.
+
+    Com mais de um worker usa um pool de processos, mantendo no máximo
+    `2 * workers` tarefas em andamento; isso limita a memória mesmo quando a
+    inserção no banco é mais lenta que o processamento.
+    """
+    if workers <= 1:
+        _iniciar_worker(*initargs)
+        for tarefa in tarefas:
+            yield funcao(tarefa)
+        return
+
+    tarefas = iter(tarefas)
+    pendentes = deque()
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_iniciar_worker,
+        initargs=initargs,
+    ) as executor:
+        for tarefa in tarefas:
+            pendentes.append(executor.submit(funcao, tarefa))
+            if len(pendentes) >= 2 * workers:
+                break
+
+        while pendentes:
+            yield pendentes.popleft().result()
+            tarefa = next(tarefas, None)
+            if tarefa is not None:
+                pendentes.append(executor.submit(funcao, tarefa))
+
+
+def _ler_csv(caminho_csv, mapas, ignorar, workers=1, inicio=None):
+    cabecalho = reader.ler_cabecalho(caminho_csv)
+    intervalos = dividir_csv(caminho_csv, inicio=inicio)
+    return _executar_em_ordem(
+        _processar_intervalo, intervalos, workers, (caminho_csv, cabecalho, mapas, ignorar)
+    )
+
+
+def _ler_cache(caminho_csv, mapas, ignorar, workers=1, inicio=None):
+    """Lê as partes do cache Parquet, pulando os anos cujos 12 meses serão ignorados."""
+    anos_ignorados = {
+        periodo // 100 for periodo in ignorar
+        if all(periodo // 100 * 100 + mes in ignorar for mes in range(1, 13))
+    }
+    partes = [
+        (indice, caminho)
+        for indice, (ano, caminho) in enumerate(parquet_cache.partes(caminho_csv))
+        if indice >= (inicio or 0) and ano not in anos_ignorados
+    ]
+    return _executar_em_ordem(
+        _processar_parte, partes, workers, (caminho_csv, None, mapas, ignorar)
+    )
+
+
+def periodos_carregados(db, tabela, refresh_from=None):
+    """Períodos (`ano * 100 + mes`) já presentes na tabela.
+
+    Os períodos a partir de `refresh_from` ficam de fora, para serem lidos novamente.
+    """
+    with db.engine.connect() as conn:
+        periodos = conn.execute(text(f"SELECT DISTINCT ano * 100 + mes FROM {tabela}")).scalars()
+        return frozenset(
+            int(periodo) for periodo in periodos
+            if refresh_from is None or periodo < refresh_from
+        )
+
+
+def _criar_staging(db, tabela):
+    staging = f"{tabela}_staging"
+    with db.engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {staging}"))
+        conn.execute(text(f"CREATE TABLE {staging} LIKE {tabela}"))
+    return staging
+
+
+def _remover_staging(db, staging):
+    with db.engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {staging}"))
+
+
+def _substituir_periodos(db, tabela, staging, refresh_from):
+    """Troca, em uma única transação, os períodos a partir de `refresh_from` pelo conteúdo do staging.
+
+    O staging também pode ter períodos anteriores que não estavam no banco,
+    então os resumos são recalculados, na mesma transação, a partir do menor
+    ano entre `refresh_from` e o staging.
+    """
+    ano, mes = divmod(refresh_from, 100)
+    colunas = ", ".join(COLUNAS + ["created_at"])
+
+    with db.engine.begin() as conn:
+        menor_ano = conn.execute(text(f"SELECT MIN(ano) FROM {staging}")).scalar()
+        conn.execute(
+            text(f"DELETE FROM {tabela} WHERE ano > :ano OR (ano = :ano AND mes >= :mes)"),
+            {"ano": ano, "mes": mes},
+        )
+        conn.execute(text(f"INSERT INTO {tabela} ({colunas}) SELECT {colunas} FROM {staging}"))
+        resumos.reconstruir(conn, tabela, ano_inicial=min(ano, menor_ano) if menor_ano is not None else ano)
+        response_cache.incrementar_versao(conn)
+
+
+def _registrar_chunk(conn, journal, tipo_dado, df, posicao):
+    """Atualiza os resumos, a versão do dataset e o checkpoint na transação do chunk inserido."""
+    resumos.acumular(conn, tipo_dado, df)
+    response_cache.incrementar_versao(conn)
+    journal.registrar(conn, posicao=posicao, linhas=len(df))
+
+
+class ImportStats:
+    """Métricas de uma importação: linhas lidas/inseridas, vazão e pico de memória."""
+
+    def __init__(self, workers=1):
+        self.workers = workers
+        self.linhas_lidas = 0
+        self.linhas_inseridas = 0
+        self.inicio = time.perf_counter()
+        self.duracao = 0.0
+
+    def update(self, lidas, inseridas):
+        self.linhas_lidas += lidas
+        self.linhas_inseridas += inseridas
+        self.duracao = time.perf_counter() - self.inicio
+
+    @property
+    def linhas_por_segundo(self):
+        return self.linhas_inseridas / self.duracao if self.duracao else 0.0
+
+    @property
+    def pico_memoria_mb(self):
+        """Pico de RSS do processo principal em MB (None quando a plataforma não informa)."""
+        return _maxrss_mb(resource.RUSAGE_SELF) if resource is not None else None
+
+    @property
+    def pico_memoria_workers_mb(self):
+        """Pico de RSS do maior processo filho já encerrado (os workers, que fazem a leitura e o
+        mapeamento com `workers > 1`) em MB; None sem workers ou quando a plataforma não informa.
+        """
+        if resource is None or self.workers <= 1:
+            return None
+        return _maxrss_mb(resource.RUSAGE_CHILDREN)
+
+    def __str__(self):
+        pico = self.pico_memoria_mb
+        pico = f"{pico:.1f} MB no processo principal" if pico is not None else "n/d"
+        pico_workers = self.pico_memoria_workers_mb
+        if pico_workers is not None:
+            pico += f", {pico_workers:.1f} MB no maior worker"
+        return (
+            f"{self.linhas_inseridas} de {self.linhas_lidas} linhas inseridas em {self.duracao:.1f}s "
+            f"({self.linhas_por_segundo:.0f} linhas/s, pico de memória {pico})"
+        )
+
+
+def _maxrss_mb(quem):
+    maxrss = resource.getrusage(quem).ru_maxrss
+    # Linux informa em KB, macOS em bytes
+    return maxrss / (1024 * 1024) if sys.platform == "darwin" else maxrss / 1024
+
+
+def importar_dados(
+    db,
+    caminho_csv,
+    tipo_dado='importacoes',
+    carga="executemany",
+    workers=1,
+    incremental=False,
+    refresh_from=None,
+    resume=False,
+    cache=False,
+):
+    """Importa o CSV do COMEX em streaming.
+
+    O arquivo é lido em partes de `BYTES_POR_PARTE`; cada parte é mapeada,
+    tipada e inserida assim que é lida, de modo que o uso de memória fica
+    limitado ao tamanho de uma parte, independente do arquivo. Cada parte
+    commitada atualiza as tabelas de resumo e registra um checkpoint no
+    `import_journal`.
+
+    Args:
+        carga (str): forma de carga no banco, uma das chaves de `LOADERS`.
+        workers (int): processos usados para ler e mapear o CSV. Com mais de um,
+            o arquivo é dividido em intervalos de bytes processados em paralelo
+            e inseridos na ordem original.
+        incremental (bool): ignora as linhas de períodos (ano/mês) que já estão no banco.
+        refresh_from (int): período `ano * 100 + mes` a partir do qual os dados
+            são substituídos. Implica `incremental`; as linhas são carregadas em
+            uma tabela de staging e trocadas em uma única transação no final.
+        resume (bool): continua a partir do último checkpoint deste arquivo,
+            ignorando os mesmos períodos da importação interrompida.
+        cache (bool): lê do cache Parquet do CSV (gerado na primeira vez) em
+            vez de interpretar o CSV, apenas com as colunas e anos necessários.
+
+    Returns:
+        ImportStats: métricas da importação.
+    """
+    if resume and refresh_from:
+        raise ValueError("--resume não pode ser combinado com --refresh-from.")
+
+    loader = LOADERS[carga](db)
+    try:
+        stats = ImportStats(workers)
+        resumos.criar_tabelas(db)
+        response_cache.criar_tabela(db.engine)
+
+        if cache:
+            arquivo_hash = parquet_cache.garantir_cache(caminho_csv)["sha256"]
+            journal = Journal(db, tipo_dado, arquivo_hash, fonte="parquet")
+        else:
+            journal = Journal(db, tipo_dado, hash_arquivo(caminho_csv), fonte="csv")
+        if not resume:
+            ignorar = frozenset()
+            if incremental or refresh_from:
+                ignorar = periodos_carregados(db, tipo_dado, refresh_from)
+            journal.reiniciar(ignorar)
+        elif journal.concluido:
+            tqdm.write(f"Importação de '{caminho_csv}' em '{tipo_dado}' já foi concluída.")
+            return stats
+        else:
+            # os mesmos períodos da importação interrompida: recalculados, incluiriam
+            # o mês parcialmente commitado
+            ignorar = journal.periodos_ignorados
+        inicio = journal.posicao if resume else None
+
+        ler = _ler_cache if cache else _ler_csv
+        chunks = ler(caminho_csv, loader.mapas, ignorar, workers, inicio)
+
+        destino = _criar_staging(db, tipo_dado) if refresh_from else tipo_dado
+        try:
+            with tqdm(desc=f"Importando '{tipo_dado}'", unit=" linhas") as pbar:
+                for fim, linhas_lidas, df_processed in chunks:
+                    # com staging, o progresso e os resumos só valem depois da troca final
+                    checkpoint = None
+                    if not refresh_from:
+                        checkpoint = partial(
+                            _registrar_chunk, journal=journal, tipo_dado=tipo_dado, df=df_processed, posicao=fim
+                        )
+                    loader.insert_chunk(df_processed, destino, checkpoint)
+
+                    stats.update(linhas_lidas, len(df_processed))
+                    pbar.update(linhas_lidas)
 
+            if refresh_from:
+                _substituir_periodos(db, tipo_dado, destino, refresh_from)
+            journal.concluir()
+        finally:
+            if refresh_from:
+                _remover_staging(db, destino)
 
-def importar_dados(db, caminho_csv, tipo_dado='importacoes'):
-    loader = DataLoader(db)
-    chunksize = 100_000
-    dfs_processed = []
-
-    for chunk in tqdm(pd.read_csv(caminho_csv, chunksize=chunksize), desc="Processando CSV"):
-        chunk['ncm_id'] = chunk['NO_NCM_POR'].map(loader.ncm_map)
-        chunk['pais_id'] = chunk['NO_PAIS'].map(loader.pais_map)
-        chunk['uf_id'] = chunk['NO_UF'].map(loader.uf_map)
-        chunk['via_id'] = chunk['NO_VIA'].map(loader.via_map)
-        chunk['urf_id'] = chunk['NO_URF'].map(loader.urf_map)
-        chunk = chunk.dropna(subset=['ncm_id', 'pais_id', 'uf_id', 'via_id', 'urf_id'])
-
-        df_processed = pd.DataFrame({
-            'ano': chunk['ANO'],
-            'mes': chunk['CO_MES'],
-            'ncm_id': chunk['ncm_id'].astype(int),
-            'pais_id': chunk['pais_id'],
-            'uf_id': chunk['uf_id'],
-            'via_id': chunk['via_id'],
-            'urf_id': chunk['urf_id'],
-            'peso': chunk['KG_LIQUIDO'].fillna(0).astype('int64'),
-            'valor': chunk['VL_FOB'].fillna(0).astype('int64'),
-        })
-
-        df_processed = df_processed.astype({
-            'ano': 'int32',
-            'mes': 'int32',
-            'ncm_id': 'int32',
-            'pais_id': 'int32',
-            'uf_id': 'int32',
-            'via_id': 'int32',
-            'urf_id': 'int32'
-        })
-
-        dfs_processed.append(df_processed)
-
-    df_final = pd.concat(dfs_processed, ignore_index=True)
-    loader.insert_bulk_data(df_final, tipo_dado)
+        return stats
+    finally:
+        loader.fechar()
 
 
 if __name__ == "__main__":
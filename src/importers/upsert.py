@@ -0,0 +1,59 @@
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.dialects.mysql import insert
+from src.core import dimensoes
+from src.core.cache import criar_tabela, incrementar_versao
+from . import BATCH_SIZE, UPSERT_BATCH_SIZE
+
+
+def bulk_upsert(db, model, df: pd.DataFrame, replace: bool = False) -> tuple[int, int]:
+    """Insere (ou atualiza) em lote os registros de uma tabela de referência.
+
+    Os códigos existentes são carregados com uma única consulta e comparados com
+    o DataFrame de forma vetorizada. As linhas são enviadas em `INSERT`s de
+    várias linhas; com `replace`, usa `ON DUPLICATE KEY UPDATE` para sobrescrever
+    os registros já existentes, senão insere apenas os códigos novos.
+
+    Args:
+        db: instância do Flask-SQLAlchemy.
+        model: model da tabela de referência (precisa ter `codigo` único).
+        df (pd.DataFrame): colunas com os nomes dos atributos do model.
+        replace (bool): substitui os registros já existentes?
+
+    Returns:
+        tuple[int, int]: quantidade de registros inseridos e atualizados.
+    """
+    df = df.astype(str).apply(lambda coluna: coluna.str.strip())
+    df = df.drop_duplicates(subset="codigo", keep="last" if replace else "first")
+
+    criar_tabela(db.engine)
+    existentes = dict(db.session.execute(select(model.codigo, model.id)).all())
+    ja_existe = df["codigo"].isin(existentes.keys())
+
+    if not replace:
+        df = df[~ja_existe]
+    atualizados = int(ja_existe.sum()) if replace else 0
+    inseridos = len(df) - atualizados
+
+    table = model.__table__
+    colunas = list(df.columns)
+    rows = df.to_dict(orient="records")
+
+    for i in range(0, len(rows), UPSERT_BATCH_SIZE):
+        stmt = insert(table).values(rows[i:i + UPSERT_BATCH_SIZE])
+        if replace:
+            stmt = stmt.on_duplicate_key_update(
+                {coluna: stmt.inserted[coluna] for coluna in colunas if coluna != "codigo"}
+            )
+        db.session.execute(stmt)
+
+        # Commit in batches
+        if (i + UPSERT_BATCH_SIZE) % BATCH_SIZE == 0:
+            incrementar_versao(db.session)
+            db.session.commit()
+
+    incrementar_versao(db.session)
+    db.session.commit()
+    dimensoes.invalidar()
+
+    return inseridos, atualizados
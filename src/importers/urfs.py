@@ -1,7 +1,7 @@
 import pandas as pd
 from ..urfs.model import URFModel
 from ..utils.sqlalchemy import SQLAlchemy
-from . import BATCH_SIZE, LIMIT
+from .upsert import bulk_upsert
 
 baseurl = "https://balanca.economia.gov.br/balanca/bd/tabelas/URF.csv"
 
@@ -12,30 +12,11 @@ def importar(replace: bool = False):
 
     db = SQLAlchemy.get_instance()
 
-    # Para cada linha do CSV, criar um objeto URFModel e salvar no BD
-    for index, row in exp_df_base.iterrows():
-        # Se a primeira linha do CSV for cabeçalho, você pode pular index == 0
-        if index == 0:
-            continue
-
-        urf = db.session.query(URFModel).filter_by(codigo=row["CO_URF"]).first()
-        if urf and not replace:
-            continue
-        elif not urf:
-            urf = URFModel()
-
-        urf.codigo = str(row["CO_URF"]).strip()
-        urf.nome = str(row["NO_URF"]).strip()
-
-        db.session.add(urf)
-
-        # Commit in batches
-        if index % BATCH_SIZE == 0:
-            db.session.commit()
-        if index == LIMIT:
-            break
-
-    db.session.commit()
+    dados = pd.DataFrame({
+        "codigo": exp_df_base["CO_URF"],
+        "nome": exp_df_base["NO_URF"],
+    })
+    bulk_upsert(db, URFModel, dados, replace)
 
 
 if __name__ == "__main__":
@@ -1,7 +1,7 @@
 import pandas as pd
 from ..vias.model import ViaModel
 from ..utils.sqlalchemy import SQLAlchemy
-from . import BATCH_SIZE, LIMIT
+from .upsert import bulk_upsert
 
 baseurl = "https://balanca.economia.gov.br/balanca/bd/tabelas/VIA.csv"
 
@@ -12,30 +12,11 @@ def importar(replace: bool = False):
 
     db = SQLAlchemy.get_instance()
 
-    # para cada linha do CSV, criar um objeto ViaModel e salvar no BD
-    for index, row in exp_df_base.iterrows():
-        # Se a primeira linha do CSV for cabeçalho, você pode pular index == 0
-        if index == 0:
-            continue
-
-        via = db.session.query(ViaModel).filter_by(codigo=row["CO_VIA"]).first()
-        if via and not replace:
-            continue
-        elif not via:
-            via = ViaModel()
-
-        via.codigo = str(row["CO_VIA"]).strip()
-        via.nome = str(row["NO_VIA"]).strip()
-
-        db.session.add(via)
-
-        # Commit in batches
-        if index % BATCH_SIZE == 0:
-            db.session.commit()
-        if index == LIMIT:
-            break
-
-    db.session.commit()
+    dados = pd.DataFrame({
+        "codigo": exp_df_base["CO_VIA"],
+        "nome": exp_df_base["NO_VIA"],
+    })
+    bulk_upsert(db, ViaModel, dados, replace)
 
 
 if __name__ == "__main__":
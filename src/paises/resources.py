@@ -1,3 +1,5 @@
+from src.core.expurgo import excluir
+from src.core import dimensoes
 from src.core.resources import BaseResource
 from src.utils import sqlalchemy
 from .model import PaisModel
@@ -14,9 +16,8 @@ class Paises(BaseResource):
 
     @marshal_with(model_fields)
     def get(self):
-        """Get all entries."""
-        entries = self.db.session.query(PaisModel).all()
-        return entries
+        """Get all entries (from the process-wide dimension cache)."""
+        return list(dimensoes.obter(PaisModel).linhas)
 
     @marshal_with(model_fields)
     def post(self):
@@ -44,7 +45,7 @@ class Pais(BaseResource):
 
     @marshal_with(model_fields)
     def get(self, id):
-        entry = self.db.session.query(PaisModel).filter_by(id=id).first()
+        entry = dimensoes.obter_linha(PaisModel, id)
         if not entry:
             abort(404, message="Nenhum registro encontrado.")
         return entry
@@ -81,11 +82,12 @@ class Pais(BaseResource):
         self.db.session.commit()
         return None, 204
 
-    @marshal_with(model_fields)
     def delete(self, id):
+        """Delete an entry; its transactions go with it (`ON DELETE CASCADE`).
+
+        With `?assincrono=true` they are purged in chunks in the background (202).
+        """
         entry = self.db.session.query(PaisModel).filter_by(id=id).first()
         if not entry:
             abort(404, message="Nenhum registro encontrado.")
-        self.db.session.delete(entry)
-        self.db.session.commit()
-        return None, 204
+        return excluir(PaisModel, entry)
@@ -0,0 +1,88 @@
+"""Leitura das tabelas de resumo pelos blueprints.
+
+Os blueprints só recorrem às tabelas de fatos quando os resumos não estão
+disponíveis (`disponivel`). Criadas por `src.importers.resumos.criar_tabelas`
+(já preenchidas) ou junto com o banco vazio, elas acompanham todas as escritas,
+então uma lista vazia é a resposta (UF/ano sem transações), não falta de dados.
+"""
+
+from sqlalchemy import case, desc, func, inspect
+from src.utils.sqlalchemy import SQLAlchemy
+from .model import RESUMOS, ResumoAnoModel, ResumoMesModel, ResumoURFModel, ResumoViaModel
+
+_disponivel = False
+
+
+def disponivel():
+    """Se as tabelas de resumo existem no banco.
+
+    Só a resposta positiva é guardada (as tabelas não são removidas); enquanto
+    não existirem, o banco é consultado de novo, para que as tabelas criadas
+    por uma importação passem a ser usadas sem reiniciar o processo.
+    """
+    global _disponivel
+    if not _disponivel:
+        inspetor = inspect(SQLAlchemy.get_instance().engine)
+        _disponivel = all(inspetor.has_table(model.__tablename__) for model in RESUMOS)
+    return _disponivel
+
+
+def vias_utilizadas(fluxo, uf_id, ano):
+    """`(via_id, qtd)` das vias usadas pela UF no ano, da mais para a menos usada."""
+    db = SQLAlchemy.get_instance()
+    return (
+        db.session.query(ResumoViaModel.via_id, ResumoViaModel.qtd)
+        .filter(
+            ResumoViaModel.fluxo == fluxo,
+            ResumoViaModel.uf_id == uf_id,
+            ResumoViaModel.ano == ano,
+        )
+        .order_by(desc(ResumoViaModel.qtd), ResumoViaModel.via_id)
+        .all()
+    )
+
+
+def urfs_utilizadas(fluxo, uf_id, ano):
+    """`(urf_id, qtd)` das URFs usadas pela UF no ano, da mais para a menos usada."""
+    db = SQLAlchemy.get_instance()
+    return (
+        db.session.query(ResumoURFModel.urf_id, ResumoURFModel.qtd)
+        .filter(
+            ResumoURFModel.fluxo == fluxo,
+            ResumoURFModel.uf_id == uf_id,
+            ResumoURFModel.ano == ano,
+        )
+        .order_by(desc(ResumoURFModel.qtd), ResumoURFModel.urf_id)
+        .all()
+    )
+
+
+def balanca(uf_ids, ano_inicial=None, ano_final=None, mensal=False):
+    """Exportado, importado e saldo por UF e ano (ou mês), em uma única consulta.
+
+    Returns:
+        list: linhas com `uf_id`, `ano`, `mes` (só se `mensal`), `total_exportado`,
+            `total_importado` e `valor` (saldo).
+    """
+    db = SQLAlchemy.get_instance()
+    model = ResumoMesModel if mensal else ResumoAnoModel
+    chaves = [model.uf_id, model.ano] + ([model.mes] if mensal else [])
+
+    exportado = func.sum(case((model.fluxo == "exportacoes", model.valor), else_=0))
+    importado = func.sum(case((model.fluxo == "importacoes", model.valor), else_=0))
+    query = (
+        db.session.query(
+            *chaves,
+            exportado.label("total_exportado"),
+            importado.label("total_importado"),
+            (exportado - importado).label("valor"),
+        )
+        .filter(model.uf_id.in_(uf_ids))
+        .group_by(*chaves)
+        .order_by(*chaves)
+    )
+    if ano_inicial is not None:
+        query = query.filter(model.ano >= ano_inicial)
+    if ano_final is not None:
+        query = query.filter(model.ano <= ano_final)
+    return query.all()
@@ -0,0 +1,62 @@
+from src.core.base import BaseModel
+from sqlalchemy import BigInteger, ForeignKey, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+from src.ufs.model import UFModel
+from src.urfs.model import URFModel
+from src.vias.model import ViaModel
+
+
+class ResumoBase(BaseModel):
+    """Colunas comuns dos resumos: totais das transações de um fluxo (`exportacoes` ou `importacoes`).
+
+    Os resumos são mantidos pela importação e pelas escritas da API, na mesma
+    transação das linhas alteradas, e podem ser reconstruídos com `flask comex resumos`.
+    """
+
+    __abstract__ = True
+
+    fluxo: Mapped[str] = mapped_column(String(15), primary_key=True)
+    uf_id: Mapped[int] = mapped_column(ForeignKey(UFModel.id, ondelete="CASCADE"), primary_key=True)
+    ano: Mapped[int] = mapped_column(Integer, primary_key=True)
+    qtd: Mapped[int] = mapped_column(BigInteger, default=0)
+    peso: Mapped[int] = mapped_column(BigInteger, default=0)
+    valor: Mapped[int] = mapped_column(BigInteger, default=0)
+
+
+class ResumoAnoModel(ResumoBase):
+    """Totais por UF e ano."""
+
+    __tablename__ = "resumo_uf_ano"
+
+
+class ResumoViaModel(ResumoBase):
+    """Totais por UF, ano e via de transporte."""
+
+    __tablename__ = "resumo_uf_ano_via"
+
+    via_id: Mapped[int] = mapped_column(ForeignKey(ViaModel.id, ondelete="CASCADE"), primary_key=True, sort_order=1)
+
+
+class ResumoURFModel(ResumoBase):
+    """Totais por UF, ano e URF."""
+
+    __tablename__ = "resumo_uf_ano_urf"
+
+    urf_id: Mapped[int] = mapped_column(ForeignKey(URFModel.id, ondelete="CASCADE"), primary_key=True, sort_order=1)
+
+
+class ResumoMesModel(ResumoBase):
+    """Totais por UF, ano e mês."""
+
+    __tablename__ = "resumo_uf_ano_mes"
+
+    mes: Mapped[int] = mapped_column(Integer, primary_key=True, sort_order=1)
+
+
+# model -> colunas de agrupamento além de (fluxo, uf_id, ano)
+RESUMOS = {
+    ResumoAnoModel: [],
+    ResumoViaModel: ["via_id"],
+    ResumoURFModel: ["urf_id"],
+    ResumoMesModel: ["mes"],
+}
@@ -1,3 +1,4 @@
+from src.core import dimensoes
 from src.core.resources import BaseResource
 from src.utils import sqlalchemy
 from .model import SH4Model
@@ -14,9 +15,8 @@ class SH4s(BaseResource):
 
     @marshal_with(model_fields)
     def get(self):
-        """Get all entries."""
-        entries = self.db.session.query(SH4Model).all()
-        return entries
+        """Get all entries (from the process-wide dimension cache)."""
+        return list(dimensoes.obter(SH4Model).linhas)
 
     @marshal_with(model_fields)
     def post(self):
@@ -44,7 +44,7 @@ class SH4(BaseResource):
 
     @marshal_with(model_fields)
     def get(self, id):
-        entry = self.db.session.query(SH4Model).filter_by(id=id).first()
+        entry = dimensoes.obter_linha(SH4Model, id)
         if not entry:
             abort(404, message="Nenhum registro encontrado.")
         return entry
@@ -16,10 +16,10 @@ class UEModel(BaseModel):
 
     # FK
     exportacoes: Mapped[List["ExportacaoModel"]] = relationship(
-        back_populates="ue", cascade="all, delete-orphan"
+        back_populates="ue", cascade="all, delete-orphan", passive_deletes=True
     )
     importacoes: Mapped[List["ImportacaoModel"]] = relationship(
-        back_populates="ue", cascade="all, delete-orphan"
+        back_populates="ue", cascade="all, delete-orphan", passive_deletes=True
     )
 
     def __repr__(self):
@@ -1,3 +1,5 @@
+from src.core.expurgo import excluir
+from src.core import dimensoes
 from src.core.resources import BaseResource
 from src.utils import sqlalchemy
 from .model import UEModel
@@ -14,9 +16,8 @@ class UEs(BaseResource):
 
     @marshal_with(model_fields)
     def get(self):
-        """Get all entries."""
-        entries = self.db.session.query(UEModel).all()
-        return entries
+        """Get all entries (from the process-wide dimension cache)."""
+        return list(dimensoes.obter(UEModel).linhas)
 
     @marshal_with(model_fields)
     def post(self):
@@ -48,7 +49,7 @@ class UE(BaseResource):
 
     @marshal_with(model_fields)
     def get(self, id):
-        entry = self.db.session.query(UEModel).filter_by(id=id).first()
+        entry = dimensoes.obter_linha(UEModel, id)
         if not entry:
             abort(404, message="Nenhum registro encontrado.")
         return entry
@@ -86,11 +87,12 @@ class UE(BaseResource):
         self.db.session.commit()
         return None, 204
 
-    @marshal_with(model_fields)
     def delete(self, id):
+        """Delete an entry; its transactions go with it (`ON DELETE CASCADE`).
+
+        With `?assincrono=true` they are purged in chunks in the background (202).
+        """
         entry = self.db.session.query(UEModel).filter_by(id=id).first()
         if not entry:
             abort(404, message="Nenhum registro encontrado.")
-        self.db.session.delete(entry)
-        self.db.session.commit()
-        return None, 204
+        return excluir(UEModel, entry)
@@ -17,10 +17,10 @@ class UFModel(BaseModel):
 
     # FK
     exportacoes: Mapped[List["ExportacaoModel"]] = relationship(
-        back_populates="uf", cascade="all, delete-orphan"
+        back_populates="uf", cascade="all, delete-orphan", passive_deletes=True
     )
     importacoes: Mapped[List["ImportacaoModel"]] = relationship(
-        back_populates="uf", cascade="all, delete-orphan"
+        back_populates="uf", cascade="all, delete-orphan", passive_deletes=True
     )
 
     def __repr__(self):
@@ -1,3 +1,5 @@
+from src.core.expurgo import excluir
+from src.core import dimensoes
 from src.core.resources import BaseResource
 from src.utils import sqlalchemy
 from .model import UFModel
@@ -12,9 +14,8 @@ class UFs(BaseResource):
 
     @marshal_with(model_fields)
     def get(self):
-        """Get all entries."""
-        entries = self.db.session.query(UFModel).all()
-        return entries
+        """Get all entries (from the process-wide dimension cache)."""
+        return list(dimensoes.obter(UFModel).linhas)
 
     @marshal_with(model_fields)
     def post(self):
@@ -47,7 +48,7 @@ class UF(BaseResource):
 
     @marshal_with(model_fields)
     def get(self, id):
-        entry = self.db.session.query(UFModel).filter_by(id=id).first()
+        entry = dimensoes.obter_linha(UFModel, id)
         if not entry:
             abort(404, message="Nenhum registro encontrado.")
         return entry
@@ -86,11 +87,12 @@ class UF(BaseResource):
         self.db.session.commit()
         return None, 204
 
-    @marshal_with(model_fields)
     def delete(self, id):
+        """Delete an entry; its transactions go with it (`ON DELETE CASCADE`).
+
+        With `?assincrono=true` they are purged in chunks in the background (202).
+        """
         entry = self.db.session.query(UFModel).filter_by(id=id).first()
         if not entry:
             abort(404, message="Nenhum registro encontrado.")
-        self.db.session.delete(entry)
-        self.db.session.commit()
-        return None, 204
+        return excluir(UFModel, entry)
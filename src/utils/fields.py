@@ -0,0 +1,10 @@
+"""Custom flask_restful fields."""
+
+from flask_restful import fields
+
+
+class ValorAgregado(fields.Float):
+    """`valor_agregado` with 2 decimal places (the column keeps 4, used for ordering and cursors)."""
+
+    def format(self, value):
+        return round(float(value), 2)
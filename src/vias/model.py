@@ -15,10 +15,10 @@ class ViaModel(BaseModel):
 
     # FK
     exportacoes: Mapped[List["ExportacaoModel"]] = relationship(
-        back_populates="via", cascade="all, delete-orphan"
+        back_populates="via", cascade="all, delete-orphan", passive_deletes=True
     )
     importacoes: Mapped[List["ImportacaoModel"]] = relationship(
-        back_populates="via", cascade="all, delete-orphan"
+        back_populates="via", cascade="all, delete-orphan", passive_deletes=True
     )
 
     def __repr__(self):
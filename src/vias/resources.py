@@ -1,3 +1,5 @@
+from src.core.expurgo import excluir
+from src.core import dimensoes
 from src.core.resources import BaseResource
 from .model import ViaModel
 from .fields import model_fields
@@ -11,9 +13,8 @@ class Vias(BaseResource):
 
     @marshal_with(model_fields)
     def get(self):
-        """Get all entries."""
-        entries = self.db.session.query(ViaModel).all()
-        return entries
+        """Get all entries (from the process-wide dimension cache)."""
+        return list(dimensoes.obter(ViaModel).linhas)
 
     @marshal_with(model_fields)
     def post(self):
@@ -41,7 +42,7 @@ class Via(BaseResource):
 
     @marshal_with(model_fields)
     def get(self, id):
-        entry = self.db.session.query(ViaModel).filter_by(id=id).first()
+        entry = dimensoes.obter_linha(ViaModel, id)
         if not entry:
             abort(404, message="Nenhum registro encontrado.")
         return entry
@@ -78,11 +79,12 @@ class Via(BaseResource):
         self.db.session.commit()
         return None, 204
 
-    @marshal_with(model_fields)
     def delete(self, id):
+        """Delete an entry; its transactions go with it (`ON DELETE CASCADE`).
+
+        With `?assincrono=true` they are purged in chunks in the background (202).
+        """
         entry = self.db.session.query(ViaModel).filter_by(id=id).first()
         if not entry:
             abort(404, message="Nenhum registro encontrado.")
-        self.db.session.delete(entry)
-        self.db.session.commit()
-        return None, 204
+        return excluir(ViaModel, entry)
@@ -62,6 +62,8 @@ def session(db):
 
 
 @pytest.fixture(autouse=True)
-def auto_rollback(session):
+def auto_rollback(app, session):
     yield
     session.rollback()
+    # rows cached from the rolled back transaction
+    app.extensions["dimensoes"].invalidar()
@@ -0,0 +1,82 @@
+import threading
+import time
+import pytest
+from src.core.cache import LocalBackend, ResponseCache, SingleFlight
+
+
+class TestResponseCache:
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted and counted."""
+        cache = ResponseCache(max_entries=2)
+        cache.set("a", {"valor": 1})
+        cache.set("b", {"valor": 2})
+        assert cache.get("a") == {"valor": 1}
+
+        cache.set("c", {"valor": 3})
+
+        assert cache.get("b") is None
+        assert cache.get("c") == {"valor": 3}
+        assert cache.stats() == {
+            "entradas": 2,
+            "max_entradas": 2,
+            "hits": 2,
+            "misses": 1,
+            "evictions": 1,
+        }
+
+    def test_shared_backend(self):
+        """Test that entries evicted locally are still served by the shared backend."""
+        backend = LocalBackend()
+        cache = ResponseCache(max_entries=1, backend=backend)
+        cache.set("a", {"valor": 1})
+        cache.set("b", {"valor": 2})
+
+        outro_processo = ResponseCache(max_entries=1, backend=backend)
+
+        assert cache.get("a") == {"valor": 1}
+        assert outro_processo.get("b") == {"valor": 2}
+        assert outro_processo.stats()["misses"] == 0
+
+
+class TestSingleFlight:
+    def test_concurrent_calls_coalesced(self):
+        """Test that concurrent calls with the same key run once and share the result."""
+        single_flight = SingleFlight()
+        liberar = threading.Event()
+        chamadas = []
+
+        def consulta():
+            chamadas.append(1)
+            liberar.wait(5)
+            return {"valor": 1}
+
+        resultados = []
+        threads = [
+            threading.Thread(target=lambda: resultados.append(single_flight.executar("a", consulta)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        while single_flight.stats()["em_andamento"] == 0:
+            time.sleep(0.01)
+        time.sleep(0.1)
+        liberar.set()
+        for thread in threads:
+            thread.join()
+
+        assert len(chamadas) == 1
+        assert resultados == [{"valor": 1}] * 5
+        assert single_flight.stats() == {"execucoes": 1, "coalescidas": 4, "expiradas": 0, "em_andamento": 0}
+
+    def test_error_is_not_cached(self):
+        """Test that a failed call is raised and the next call runs again."""
+        single_flight = SingleFlight()
+
+        def falha():
+            raise ValueError("erro")
+
+        with pytest.raises(ValueError):
+            single_flight.executar("a", falha)
+
+        assert single_flight.executar("a", lambda: 2) == 2
+        assert single_flight.stats()["execucoes"] == 2
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+from decimal import Decimal
+from src.core.agregados import abrir, escrever
+from src.core.colunar import SCHEMA, TabelaColunar
+from src.core.pagination import Cursor, cursor_type
+
+
+def make_tabela(linhas):
+    colunas = {nome: np.array([linha.get(nome, 0) for linha in linhas]) for nome in SCHEMA}
+    descricoes = np.array([None, "NCM 1", "NCM 2"], dtype=object)
+    return TabelaColunar(colunas, descricoes)
+
+
+@pytest.fixture
+def tabela():
+    linhas = []
+    for id in range(1, 21):
+        linhas.append(
+            {
+                "id": id,
+                "ano": 2023 if id % 4 else 2022,
+                "mes": id % 12 + 1,
+                "uf_id": 1 if id % 5 else 2,
+                "ncm_id": id % 3,  # 0: sem NCM, fora do INNER JOIN
+                "via_id": id % 3,
+                "peso": id % 7,  # 0: valor_agregado NULL
+                "valor": 1000 + id,
+            }
+        )
+    return make_tabela(linhas)
+
+
+class TestTabelaColunar:
+    def test_valor_agregado_order(self, tabela):
+        """Test the (valor_agregado DESC, id DESC) order, NULLs last, without rows lacking NCM."""
+        linhas, has_next, _ = tabela.valor_agregado(1, 2023, tamanho_pagina=100)
+
+        assert has_next is False
+        assert all(linha["ncm_id"] for linha in linhas)
+        valores = [linha["valor_agregado"] for linha in linhas]
+        nao_nulos = [valor for valor in valores if valor is not None]
+        assert nao_nulos == sorted(nao_nulos, reverse=True)
+        assert valores[len(nao_nulos) :] == [None] * (len(valores) - len(nao_nulos))
+        ids_nulos = [linha["id"] for linha in linhas[len(nao_nulos) :]]
+        assert ids_nulos == sorted(ids_nulos, reverse=True)
+        assert linhas[0]["valor_agregado"] == Decimal("1001.0000")
+
+    def test_cursor_matches_page(self, tabela):
+        """Test that seeking with `proximo_cursor` returns the same rows as the page number."""
+        primeira, _, proximo_cursor = tabela.cargas_movimentadas(1, 2023, tamanho_pagina=3)
+        por_cursor, _, _ = tabela.cargas_movimentadas(1, 2023, tamanho_pagina=3, cursor=cursor_type(proximo_cursor))
+        por_pagina, _, _ = tabela.cargas_movimentadas(1, 2023, tamanho_pagina=3, cursor=Cursor(pagina=2))
+
+        assert por_cursor == por_pagina
+        assert {linha["id"] for linha in primeira}.isdisjoint(linha["id"] for linha in por_cursor)
+
+    def test_contagem(self, tabela):
+        """Test the via counts of a UF in a year, most used first, without NULLs."""
+        contagem = tabela.contagem("via_id", 1, 2023)
+
+        assert contagem == [{"via_id": 1, "qtd": 4}, {"via_id": 2, "qtd": 4}]
+
+    def test_totais(self, tabela):
+        """Test the sum of valor by year and by month."""
+        anual = tabela.totais(1, 2022, 2023)
+        mensal = tabela.totais(1, 2023, 2023, mensal=True)
+
+        assert anual == {(2022, None): 1004 + 1008 + 1012 + 1016, (2023, None): sum(mensal.values())}
+        assert all(mes is not None for _, mes in mensal)
+        assert tabela.totais(3) == {}
+
+
+class TestArquivoAgregados:
+    def test_round_trip(self, tabela, tmp_path):
+        """Test that the mapped file answers like the in-memory tables, read-only."""
+        caminho = tmp_path / "agregados.bin"
+        escrever(caminho, 7, {"exportacoes": tabela})
+
+        versao, tabelas = abrir(caminho)
+        mapeada = tabelas["exportacoes"]
+
+        assert versao == 7
+        assert not mapeada.peso.flags.writeable
+        assert mapeada.valor_agregado(1, 2023, 2022, tamanho_pagina=100) == tabela.valor_agregado(
+            1, 2023, 2022, tamanho_pagina=100
+        )
+        assert mapeada.contagem("via_id", 1, 2023) == tabela.contagem("via_id", 1, 2023)
+        assert mapeada.totais(1, mensal=True) == tabela.totais(1, mensal=True)
+
+    def test_invalid_file(self, tmp_path):
+        """Test that a file of another kind is rejected."""
+        caminho = tmp_path / "outro.bin"
+        caminho.write_bytes(b"nada a ver")
+
+        with pytest.raises(ValueError):
+            abrir(caminho)
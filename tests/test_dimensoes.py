@@ -0,0 +1,48 @@
+import dataclasses
+import pytest
+from src.core.dimensoes import Dimensao
+from src.ncms.model import NCMModel
+from src.ufs.model import UFModel
+
+
+@pytest.fixture
+def ufs():
+    linhas = [
+        (5, "35", "São Paulo", "SP", "Sudeste"),
+        (2, "12", "Acre", "AC", "Norte"),
+    ]
+    return Dimensao(UFModel, linhas, versao=3)
+
+
+class TestDimensao:
+    def test_lookups(self, ufs):
+        """Test the rows in id order and the lookups by id, code and name."""
+        assert [linha.id for linha in ufs.linhas] == [2, 5]
+        assert ufs.obter(5).sigla == "SP"
+        assert ufs.obter(3) is None and ufs.obter(99) is None and ufs.obter(None) is None
+        assert ufs.por_codigo["12"].id == 2
+        assert ufs.por_nome["São Paulo"].id == 5
+        assert 2 in ufs and 4 not in ufs
+        assert ufs.versao == 3
+
+    def test_id_indexed_columns(self):
+        """Test the column arrays indexed by id, with None where there is no entry."""
+        ncms = Dimensao(NCMModel, [(1, "01012100", "Cavalos"), (3, "01012900", None)])
+
+        assert list(ncms.coluna("descricao")) == [None, "Cavalos", None, None]
+        assert ncms.por_nome["Cavalos"].codigo == "01012100"
+
+    def test_immutable(self, ufs):
+        """Test that the snapshot can't be changed by its readers."""
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            ufs.obter(2).nome = "Outro"
+        with pytest.raises(TypeError):
+            ufs.por_codigo["99"] = None
+        with pytest.raises(ValueError):
+            ufs.coluna("sigla")[2] = "XX"
+
+    def test_empty(self):
+        """Test a table without entries."""
+        vazia = Dimensao(UFModel, [])
+
+        assert vazia.linhas == () and vazia.obter(1) is None
@@ -1,3 +1,4 @@
+import json
 import pytest
 from faker import Faker
 from src.exportacoes.model import ExportacaoModel
@@ -61,23 +62,56 @@ def create_exportacao_db(session, data=None, dependencies=None) -> ExportacaoMod
 class TestExportacaoCollection:
     def test_get_empty(self, client):
         """Test Retrieve all entries when database is empty is successful."""
-        response = client.get(url)
+        response = client.get(url, query_string={"total": "true"})
         assert response.status_code == 200
-        assert response.json == []
+        assert response.json["data"]["items"] == []
+        assert response.json["data"]["total"] == 0
+        assert response.json["data"]["has_next"] is False
 
     def test_list_with_data(self, client, session):
         """Test Retrieve all entries when database has data is successful."""
         created_exportacao = create_exportacao_db(session)
 
-        response = client.get(url)
+        response = client.get(url, query_string={"uf_id": created_exportacao.uf_id, "total": "true"})
         assert response.status_code == 200
-        assert isinstance(response.json, list)
-        assert len(response.json) > 0
+        assert response.json["data"]["total"] == 1
+        assert response.json["data"]["page"] == 1
 
-        listed_exportacao = response.json[0]["data"]
+        listed_exportacao = response.json["data"]["items"][0]
         assert listed_exportacao["id"] == created_exportacao.id
         assert listed_exportacao["ano"] == created_exportacao.ano
 
+    def test_list_without_total(self, client, session):
+        """Test that the count is skipped unless asked for, with `has_next` for the next page."""
+        dependencies = create_exportacao_dependencies(session)
+        created_exportacao = create_exportacao_db(session, dependencies=dependencies)
+        create_exportacao_db(session, dependencies=dependencies)
+
+        filtros = {"uf_id": dependencies["uf_id"], "per_page": 1}
+        primeira = client.get(url, query_string=filtros).json["data"]
+        segunda = client.get(url, query_string={**filtros, "page": 2}).json["data"]
+
+        assert primeira["total"] is None
+        assert primeira["has_next"] is True and segunda["has_next"] is False
+        assert [item["id"] for item in primeira["items"]] == [created_exportacao.id]
+
+    def test_list_page_cap(self, client):
+        """Test that the page size is capped."""
+        response = client.get(url, query_string={"per_page": 10**6})
+        assert response.status_code == 200
+        assert response.json["data"]["per_page"] == 1000
+
+    def test_stream_ndjson(self, client, session):
+        """Test streaming the filtered entries as NDJSON."""
+        created_exportacao = create_exportacao_db(session)
+
+        response = client.get(url, query_string={"uf_id": created_exportacao.uf_id, "formato": "ndjson"})
+        assert response.status_code == 200
+        assert response.mimetype == "application/x-ndjson"
+
+        linhas = [json.loads(linha) for linha in response.data.decode().splitlines()]
+        assert [linha["id"] for linha in linhas] == [created_exportacao.id]
+
     def test_create_valid(self, client, session):
         """Test creating a valid Exportacao"""
         dependencies = create_exportacao_dependencies(session)
@@ -102,6 +136,57 @@ class TestExportacaoCollection:
         assert db_exportacao.ano == exportacao_data["ano"]
 
 
+    def test_create_missing_dependency(self, client, session):
+        """Test that a nonexistent foreign key is rejected with 404"""
+        dependencies = create_exportacao_dependencies(session)
+        exportacao_data = make_exportacao_data({**dependencies, "via_id": dependencies["via_id"] + 1000})
+
+        response = client.post(url, json=exportacao_data)
+
+        assert response.status_code == 404
+        assert response.json["message"] == "Via não encontrado."
+
+    def test_bulk_create(self, client, session):
+        """Test inserting rows sent as NDJSON in one request"""
+        dependencies = create_exportacao_dependencies(session)
+        linhas = [make_exportacao_data(dependencies) for _ in range(3)]
+
+        response = client.post(
+            f"{url}bulk",
+            data="\n".join(json.dumps(linha) for linha in linhas),
+            content_type="application/x-ndjson",
+        )
+
+        assert response.status_code == 201
+        assert response.json["data"] == {"inseridas": 3, "erros": []}
+        assert session.query(ExportacaoModel).filter_by(uf_id=dependencies["uf_id"]).count() == 3
+
+    def test_bulk_null_optional_key(self, client, session):
+        """Test that rows without an optional foreign key are accepted, as in the single-row POST"""
+        dependencies = create_exportacao_dependencies(session)
+        linha = {**make_exportacao_data(dependencies), "ue_id": None}
+
+        unitaria = client.post(url, json=linha)
+        response = client.post(f"{url}bulk", json=[linha])
+
+        assert unitaria.status_code == 201
+        assert response.status_code == 201
+        assert response.json["data"] == {"inseridas": 1, "erros": []}
+        assert session.query(ExportacaoModel).filter_by(uf_id=dependencies["uf_id"], ue_id=None).count() == 2
+
+    def test_bulk_errors(self, client, session):
+        """Test that invalid rows are reported by index and nothing is inserted"""
+        dependencies = create_exportacao_dependencies(session)
+        valida = make_exportacao_data(dependencies)
+        linhas = [valida, {**valida, "urf_id": dependencies["urf_id"] + 1000}, {"mes": 1}]
+
+        response = client.post(f"{url}bulk", json=linhas)
+
+        assert response.status_code == 400
+        assert [erro["indice"] for erro in response.json["erros"]] == [1, 2]
+        assert response.json["erros"][0]["erros"] == ["URF não encontrado."]
+        assert session.query(ExportacaoModel).filter_by(uf_id=dependencies["uf_id"]).count() == 0
+
 class TestExportacaoResource:
     """Tests for single Exportacao resource endpoints (/api/exportacoes/<id>)"""
 
@@ -121,6 +206,18 @@ class TestExportacaoResource:
         assert response.json["data"]["peso"] == existing_exportacao.peso
         assert response.json["data"]["valor"] == existing_exportacao.valor
 
+    def test_valor_agregado_matches_column(self, session):
+        """Test that the instance-level valor_agregado is set before the flush and equals the generated column."""
+        exportacao = ExportacaoModel(**make_exportacao_data(create_exportacao_dependencies(session)))
+        antes = exportacao.valor_agregado
+        session.add(exportacao)
+        session.commit()
+        session.refresh(exportacao)
+
+        assert antes is not None
+        assert antes == exportacao._valor_agregado
+        assert ExportacaoModel(valor=10, peso=0).valor_agregado is None
+
     def test_get_nonexistent(self, client):
         """Test getting non-existent Exportacao."""
         response = client.get(f"{url}9999")
@@ -193,6 +290,33 @@ class TestExportacaoResource:
         # Verify deletion
         assert session.get(ExportacaoModel, existing_exportacao.id) is None
 
+    def test_writes_update_resumos(self, client, session):
+        """Test that single-row writes and a dimension deletion keep the summaries in step"""
+        from src.resumos.model import ResumoAnoModel
+
+        dependencies = create_exportacao_dependencies(session)
+        dados = {**make_exportacao_data(dependencies), "ano": 2023, "peso": 10, "valor": 100}
+
+        def resumo():
+            return (
+                session.query(ResumoAnoModel.qtd, ResumoAnoModel.peso, ResumoAnoModel.valor)
+                .filter_by(fluxo="exportacoes", uf_id=dependencies["uf_id"], ano=2023)
+                .first()
+            )
+
+        primeira = client.post(url, json=dados).json["data"]["id"]
+        client.post(url, json={**dados, "peso": 5})
+        assert tuple(resumo()) == (2, 15, 200)
+
+        client.put(f"{url}{primeira}", json={**dados, "peso": 20})
+        assert tuple(resumo()) == (2, 25, 200)
+
+        client.delete(f"{url}{primeira}")
+        assert tuple(resumo()) == (1, 5, 100)
+
+        client.delete(f"/api/ncms/{dependencies['ncm_id']}")
+        assert resumo() is None
+
     def test_delete_nonexistent(self, client):
         """Test deleting non-existent Exportacao"""
         response = client.delete(f"{url}9999")
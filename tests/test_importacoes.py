@@ -1,3 +1,4 @@
+import json
 import pytest
 from faker import Faker
 from src.importacoes.model import ImportacaoModel
@@ -61,23 +62,42 @@ def create_importacao_db(session, data=None, dependencies=None) -> ImportacaoMod
 class TestImportacaoCollection:
     def test_get_empty(self, client):
         """Test Retrieve all entries when database is empty is successful."""
-        response = client.get(url)
+        response = client.get(url, query_string={"total": "true"})
         assert response.status_code == 200
-        assert response.json == []
+        assert response.json["data"]["items"] == []
+        assert response.json["data"]["total"] == 0
+        assert response.json["data"]["has_next"] is False
 
     def test_list_with_data(self, client, session):
         """Test Retrieve all entries when database has data is successful."""
         created_importacao = create_importacao_db(session)
 
-        response = client.get(url)
+        response = client.get(url, query_string={"uf_id": created_importacao.uf_id, "total": "true"})
         assert response.status_code == 200
-        assert isinstance(response.json, list)
-        assert len(response.json) > 0
+        assert response.json["data"]["total"] == 1
+        assert response.json["data"]["page"] == 1
 
-        listed_importacao = response.json[0]["data"]
+        listed_importacao = response.json["data"]["items"][0]
         assert listed_importacao["id"] == created_importacao.id
         assert listed_importacao["ano"] == created_importacao.ano
 
+    def test_list_page_cap(self, client):
+        """Test that the page size is capped."""
+        response = client.get(url, query_string={"per_page": 10**6})
+        assert response.status_code == 200
+        assert response.json["data"]["per_page"] == 1000
+
+    def test_stream_ndjson(self, client, session):
+        """Test streaming the filtered entries as NDJSON."""
+        created_importacao = create_importacao_db(session)
+
+        response = client.get(url, query_string={"uf_id": created_importacao.uf_id, "formato": "ndjson"})
+        assert response.status_code == 200
+        assert response.mimetype == "application/x-ndjson"
+
+        linhas = [json.loads(linha) for linha in response.data.decode().splitlines()]
+        assert [linha["id"] for linha in linhas] == [created_importacao.id]
+
     def test_create_valid(self, client, session):
         """Test creating a valid Importacao"""
         dependencies = create_importacao_dependencies(session)
@@ -102,6 +122,44 @@ class TestImportacaoCollection:
         assert db_importacao.ano == importacao_data["ano"]
 
 
+    def test_create_missing_dependency(self, client, session):
+        """Test that a nonexistent foreign key is rejected with 404"""
+        dependencies = create_importacao_dependencies(session)
+        importacao_data = make_importacao_data({**dependencies, "via_id": dependencies["via_id"] + 1000})
+
+        response = client.post(url, json=importacao_data)
+
+        assert response.status_code == 404
+        assert response.json["message"] == "Via não encontrado."
+
+    def test_bulk_create(self, client, session):
+        """Test inserting rows sent as NDJSON in one request"""
+        dependencies = create_importacao_dependencies(session)
+        linhas = [make_importacao_data(dependencies) for _ in range(3)]
+
+        response = client.post(
+            f"{url}bulk",
+            data="\n".join(json.dumps(linha) for linha in linhas),
+            content_type="application/x-ndjson",
+        )
+
+        assert response.status_code == 201
+        assert response.json["data"] == {"inseridas": 3, "erros": []}
+        assert session.query(ImportacaoModel).filter_by(uf_id=dependencies["uf_id"]).count() == 3
+
+    def test_bulk_errors(self, client, session):
+        """Test that invalid rows are reported by index and nothing is inserted"""
+        dependencies = create_importacao_dependencies(session)
+        valida = make_importacao_data(dependencies)
+        linhas = [valida, {**valida, "urf_id": dependencies["urf_id"] + 1000}, {"mes": 1}]
+
+        response = client.post(f"{url}bulk", json=linhas)
+
+        assert response.status_code == 400
+        assert [erro["indice"] for erro in response.json["erros"]] == [1, 2]
+        assert response.json["erros"][0]["erros"] == ["URF não encontrado."]
+        assert session.query(ImportacaoModel).filter_by(uf_id=dependencies["uf_id"]).count() == 0
+
 class TestImportacaoResource:
     """Tests for single Importacao resource endpoints (/api/importacoes/<id>)"""
 
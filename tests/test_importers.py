@@ -0,0 +1,243 @@
+import os
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.orm import Session
+from src.importers import parquet_cache
+from src.importers.journal import Journal
+from src.importers.reader import MapaCodigos
+from src.importers.transacoes import dividir_csv, periodos_carregados, processar_chunk
+from src.importers.upsert import bulk_upsert
+from src.ufs.model import UFModel
+from tests.test_ufs import create_uf_db
+
+CABECALHO = "ANO,CO_MES,CO_NCM,CO_UNID,CO_PAIS,CO_UF,CO_VIA,CO_URF,KG_LIQUIDO,VL_FOB\n"
+
+
+@pytest.fixture
+def sqlite_db(tmp_path):
+    """Stand-in for the Flask-SQLAlchemy instance over a SQLite file (engine and session)."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'importers.db'}")
+    session = Session(engine)
+    yield SimpleNamespace(engine=engine, session=session)
+    session.close()
+    engine.dispose()
+
+
+def resolver(mapa, codigos):
+    return mapa.resolver(pd.Series(codigos, dtype="float64")).tolist()
+
+
+class TestMapaCodigos:
+    def test_dense(self):
+        """Test the table indexed by code, used for small codes."""
+        mapa = MapaCodigos(np.array([12, 1, 5]), np.array([120, 10, 50]))
+
+        assert mapa.denso is not None
+        assert resolver(mapa, [5, 1, 12]) == [50, 10, 120]
+
+    def test_searchsorted(self):
+        """Test the binary search, used when the codes are too large for a dense table."""
+        mapa = MapaCodigos(np.array([84713012, 1012100]), np.array([2, 1]))
+
+        assert mapa.denso is None
+        assert resolver(mapa, [1012100, 84713012]) == [1, 2]
+
+    @pytest.mark.parametrize("codigos", [[1, 5, 12], [1012100, 84713012, 99999999]])
+    def test_unknown_codes(self, codigos):
+        """Test that missing, negative, out of range and unknown codes resolve to NaN."""
+        mapa = MapaCodigos(np.array(codigos), np.arange(1, len(codigos) + 1))
+
+        resultado = resolver(mapa, [np.nan, -3, 0, 4, codigos[-1] + 1, codigos[0]])
+
+        assert np.isnan(resultado[:-1]).all()
+        assert resultado[-1] == 1
+
+    def test_de_codigos(self):
+        """Test that non-numeric dimension codes are ignored."""
+        mapa = MapaCodigos.de_codigos(pd.Series(["07", "ZZ", "3"]), pd.Series([1, 2, 3]))
+
+        assert resolver(mapa, [7, 3]) == [1, 3]
+
+
+class TestDividirCsv:
+    @pytest.fixture
+    def csv(self, tmp_path):
+        caminho = tmp_path / "dados.csv"
+        linhas = [f"2023,{mes},{mes * 1111},,1,35,1,{mes * 7},{mes * 100},{mes * 1000}\n" for mes in range(1, 13)]
+        caminho.write_text(CABECALHO + "".join(linhas))
+        return caminho
+
+    def test_ranges_cover_the_lines(self, csv):
+        """Test that the byte ranges skip the header, are contiguous and end on line breaks."""
+        conteudo = csv.read_bytes()
+
+        intervalos = dividir_csv(csv, bytes_por_parte=50)
+
+        assert len(intervalos) > 1
+        assert intervalos[0][0] == len(CABECALHO)
+        assert intervalos[-1][1] == len(conteudo)
+        assert all(fim == inicio for (_, fim), (inicio, _) in zip(intervalos, intervalos[1:]))
+        assert all(conteudo[fim - 1 : fim] == b"\n" for _, fim in intervalos)
+        assert b"".join(conteudo[inicio:fim] for inicio, fim in intervalos) == conteudo[len(CABECALHO):]
+
+    def test_resume_from_position(self, csv):
+        """Test splitting from a checkpoint (start of a line) instead of the header."""
+        inteiro = dividir_csv(csv, bytes_por_parte=50)
+        posicao = inteiro[1][0]
+
+        assert dividir_csv(csv, bytes_por_parte=50, inicio=posicao)[0][0] == posicao
+        assert dividir_csv(csv, bytes_por_parte=10**6, inicio=posicao) == [(posicao, inteiro[-1][1])]
+
+
+class TestIncremental:
+    def test_processar_chunk_ignores_periods(self):
+        """Test that the rows of the loaded periods and the rows with unknown codes are dropped."""
+        mapa = MapaCodigos(np.array([1, 2]), np.array([10, 20]))
+        mapas = {coluna: mapa for coluna in ("ncm_id", "ue_id", "pais_id", "uf_id", "via_id", "urf_id")}
+        chunk = pd.DataFrame(
+            {
+                "ANO": [2023, 2023, 2024, 2024],
+                "CO_MES": [1, 2, 1, 1],
+                "CO_NCM": [1, 2, 1, 9],
+                "CO_UNID": [None, None, None, None],
+                "CO_PAIS": [1, 1, 2, 1],
+                "CO_UF": [1, 2, 1, 1],
+                "CO_VIA": [1, 1, 1, 1],
+                "CO_URF": [2, 2, 2, 2],
+                "KG_LIQUIDO": [5, 6, 7, 8],
+                "VL_FOB": [50, 60, 70, 80],
+            }
+        )
+
+        df = processar_chunk(chunk, mapas, ignorar=frozenset({202301}))
+
+        assert df[["ano", "mes", "ncm_id", "uf_id", "peso"]].values.tolist() == [
+            [2023, 2, 20, 20, 6],
+            [2024, 1, 10, 10, 7],
+        ]
+        assert df["ue_id"].isna().all()
+
+    def test_periodos_carregados(self, sqlite_db):
+        """Test the loaded periods, without the ones to be refreshed."""
+        with sqlite_db.engine.begin() as conn:
+            conn.execute(text("CREATE TABLE exportacoes (id INTEGER PRIMARY KEY, ano INTEGER, mes INTEGER)"))
+            conn.execute(text("INSERT INTO exportacoes (ano, mes) VALUES (2023, 1), (2023, 1), (2023, 12), (2024, 2)"))
+
+        assert periodos_carregados(sqlite_db, "exportacoes") == {202301, 202312, 202402}
+        assert periodos_carregados(sqlite_db, "exportacoes", refresh_from=202312) == {202301}
+
+
+class TestJournal:
+    def test_checkpoint_and_resume(self, sqlite_db):
+        """Test that the checkpoint only moves with its chunk's transaction and survives a new run."""
+        journal = Journal(sqlite_db, "exportacoes", "abc")
+        journal.reiniciar(frozenset({202402, 202401}))
+
+        with sqlite_db.engine.begin() as conn:
+            journal.registrar(conn, posicao=100, linhas=10)
+        with pytest.raises(RuntimeError):
+            with sqlite_db.engine.begin() as conn:
+                journal.registrar(conn, posicao=200, linhas=10)
+                raise RuntimeError("chunk falhou")
+
+        retomado = Journal(sqlite_db, "exportacoes", "abc")
+        assert retomado.posicao == 100
+        assert retomado.entrada.linhas == 10
+        assert retomado.periodos_ignorados == {202401, 202402}
+        assert not retomado.concluido
+
+        retomado.concluir()
+        assert Journal(sqlite_db, "exportacoes", "abc").concluido
+
+    def test_restart(self, sqlite_db):
+        """Test that a new import of the same file drops the previous progress."""
+        journal = Journal(sqlite_db, "exportacoes", "abc")
+        journal.reiniciar(frozenset({202401}))
+        with sqlite_db.engine.begin() as conn:
+            journal.registrar(conn, posicao=100, linhas=10)
+
+        journal.reiniciar()
+
+        outro = Journal(sqlite_db, "exportacoes", "abc")
+        assert (outro.posicao, outro.entrada.linhas, outro.periodos_ignorados) == (0, 0, frozenset())
+        assert Journal(sqlite_db, "exportacoes", "outro arquivo").posicao == 0
+
+
+class TestBulkUpsert:
+    def test_inserts_only_new_codes(self, sqlite_db):
+        """Test that codes already in the table (or repeated in the file) are not inserted again."""
+        UFModel.__table__.create(bind=sqlite_db.engine)
+        colunas = ["codigo", "nome", "sigla", "nome_regiao"]
+        primeira = pd.DataFrame([["11", "Rondônia", "RO", "Norte"], ["12", "Acre", "AC", "Norte"]], columns=colunas)
+        segunda = pd.DataFrame(
+            [[" 12 ", "Outro", "XX", "Norte"], ["13", "Amazonas", "AM", "Norte"], ["13", "Repetido", "AM", "Norte"]],
+            columns=colunas,
+        )
+
+        assert bulk_upsert(sqlite_db, UFModel, primeira) == (2, 0)
+        assert bulk_upsert(sqlite_db, UFModel, segunda) == (1, 0)
+
+        nomes = dict(sqlite_db.session.execute(select(UFModel.codigo, UFModel.nome)).all())
+        assert nomes == {"11": "Rondônia", "12": "Acre", "13": "Amazonas"}
+        assert sqlite_db.session.execute(select(func.count()).select_from(UFModel)).scalar() == 3
+
+    def test_replace_updates_existing(self, db, session):
+        """Test that `replace` overwrites the existing codes (ON DUPLICATE KEY UPDATE) and inserts the new ones."""
+        uf = create_uf_db(session)
+        novo = "X1"  # os códigos gerados têm só dígitos
+        df = pd.DataFrame(
+            [[uf.codigo, "Antigo", "AA", "Norte"], [uf.codigo, "Atualizado", "AT", "Sul"], [novo, "Nova", "NV", "Norte"]],
+            columns=["codigo", "nome", "sigla", "nome_regiao"],
+        )
+
+        assert bulk_upsert(db, UFModel, df, replace=True) == (1, 1)
+
+        session.expire_all()
+        assert (session.get(UFModel, uf.id).nome, session.get(UFModel, uf.id).sigla) == ("Atualizado", "AT")
+        assert session.execute(select(UFModel.nome).where(UFModel.codigo == novo)).scalar() == "Nova"
+
+
+class TestParquetCache:
+    @pytest.fixture
+    def csv(self, tmp_path, monkeypatch):
+        pytest.importorskip("pyarrow")
+        monkeypatch.setattr(parquet_cache, "CACHE_DIR", str(tmp_path / "cache"))
+        caminho = tmp_path / "dados.csv"
+        caminho.write_text(CABECALHO + "2023,1,1,,1,35,1,7,100,1000\n2024,2,2,,1,35,1,7,200,2000\n")
+        return caminho
+
+    def test_partitions_by_year(self, csv):
+        """Test that the cache is split by year and read back with only the asked columns."""
+        parquet_cache.garantir_cache(csv)
+
+        assert [ano for ano, _ in parquet_cache.partes(csv)] == [2023, 2024]
+        lidos = pd.concat(parquet_cache.ler_cache(csv, ["ANO", "VL_FOB"], anos={2024}))
+        assert lidos.columns.tolist() == ["ANO", "VL_FOB"]
+        assert lidos["VL_FOB"].tolist() == [2000]
+
+    def test_touched_file_keeps_the_cache(self, csv):
+        """Test that a new mtime with the same content is checked by hash and not rebuilt."""
+        meta = parquet_cache.garantir_cache(csv)
+        parte = parquet_cache.partes(csv)[0][1]
+        construida_em = os.stat(parte).st_mtime_ns
+
+        os.utime(csv, (meta["mtime"] + 60, meta["mtime"] + 60))
+
+        assert parquet_cache.garantir_cache(csv)["sha256"] == meta["sha256"]
+        assert os.stat(parte).st_mtime_ns == construida_em
+
+    @pytest.mark.parametrize("novo", ["2023,1,1,,1,35,1,7,100,1000\n2024,2,2,,1,35,1,7,200,9999\n", "2025,1,1,,1,35,1,7,1,1\n"])
+    def test_changed_file_rebuilds(self, csv, novo):
+        """Test that a changed CSV (same size or not) rebuilds the cache."""
+        meta = parquet_cache.garantir_cache(csv)
+
+        csv.write_text(CABECALHO + novo)
+        os.utime(csv, (meta["mtime"] + 60, meta["mtime"] + 60))
+
+        reconstruido = parquet_cache.garantir_cache(csv)
+        assert reconstruido["sha256"] != meta["sha256"]
+        lidos = pd.concat(parquet_cache.ler_cache(csv, ["VL_FOB"]))
+        assert lidos["VL_FOB"].sum() == sum(int(linha.rsplit(",", 1)[1]) for linha in novo.splitlines())
@@ -189,3 +189,17 @@ class TestUFResource:
 
         assert response.status_code == 404
         assert "Nenhum registro encontrado" in response.json["message"]
+
+    def test_delete_invalid_assincrono(self, client, existing_uf, session):
+        """Test that an invalid `assincrono` flag is rejected before deleting"""
+        response = client.delete(f"{url}{existing_uf.id}?assincrono=talvez")
+
+        assert response.status_code == 400
+        assert session.get(UFModel, existing_uf.id) is not None
+
+    def test_expurgo_nonexistent(self, client):
+        """Test the progress of an unknown purge job"""
+        response = client.get("/api/expurgos/9999")
+
+        assert response.status_code == 404
+        assert "Nenhum expurgo encontrado" in response.json["message"]
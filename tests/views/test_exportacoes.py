@@ -92,9 +92,40 @@ class TestValorAgregadoRoute:
 
         assert response.status_code == 200
         assert len(response.json) == 1
-        assert response.json[0]["valor_agregado"] == round(
-            trans1.valor / trans1.peso, 2
-        )
+        # coluna com 4 casas, respondida com 2
+        assert response.json[0]["valor_agregado"] == round(float(trans1.valor_agregado), 2)
+
+    def test_write_invalidates_cached_response(self, client, session):
+        """Test that a POST through the API is seen by the next (cached) GET."""
+        trans = create_exportacao_db(session)
+        url = f"{self.url}?uf_id={trans.uf_id}&ano={trans.ano}"
+        antes = client.get(url)
+
+        campos = ("ano", "mes", "peso", "valor", "ncm_id", "ue_id", "pais_id", "uf_id", "via_id", "urf_id")
+        dados = {campo: getattr(trans, campo) for campo in campos}
+        criada = client.post("/api/exportacoes/", json=dados)
+        depois = client.get(url)
+
+        assert criada.status_code == 201
+        assert depois.status_code == 200
+        ids = [linha["id"] for linha in depois.json["valores_agregados"]]
+        assert criada.json["data"]["id"] in ids and trans.id in ids
+
+    def test_write_records_changed_block(self, client, session):
+        """Test that a write through the API records its (fluxo, uf_id, ano) for the columnar engine."""
+        from src.core.cache import DatasetAlteracaoModel, versao_atual
+
+        trans = create_exportacao_db(session)
+        campos = ("ano", "mes", "peso", "valor", "ncm_id", "ue_id", "pais_id", "uf_id", "via_id", "urf_id")
+        dados = {campo: getattr(trans, campo) for campo in campos}
+        client.put(f"/api/exportacoes/{trans.id}", json={**dados, "ano": dados["ano"] + 1})
+
+        blocos = {
+            (linha.fluxo, linha.uf_id, linha.ano)
+            for linha in session.query(DatasetAlteracaoModel).filter_by(versao=versao_atual(session))
+        }
+        uf_id, ano = dados["uf_id"], dados["ano"]
+        assert blocos == {("exportacoes", uf_id, ano), ("exportacoes", uf_id, ano + 1)}
 
 
 class TestCargasMovimentadasRoute:
@@ -174,3 +205,129 @@ class TestCargasMovimentadasRoute:
 
         assert response.status_code == 200
         assert len(response.json) == 1
+
+    def test_proximo_cursor(self, client, session):
+        """Test that the opaque cursor resumes where the page-number cursor would."""
+        trans1 = create_exportacao_db(session)
+        for _ in range(4):
+            trans = create_exportacao_db(session)
+            trans.ano = trans1.ano
+            trans.uf = trans1.uf
+        session.commit()
+
+        filtros = {"uf_id": trans1.uf.id, "ano": trans1.ano, "tamanho_pagina": 2}
+        primeira = client.post(self.url, json=filtros).json
+        por_cursor = client.post(self.url, json={**filtros, "cursor": primeira["proximo_cursor"]}).json
+        por_pagina = client.post(self.url, json={**filtros, "cursor": 2}).json
+
+        assert primeira["has_next"] is True
+        assert por_cursor["pagina"] == 2
+        assert por_cursor["cargas_movimentadas"] == por_pagina["cargas_movimentadas"]
+
+        response = client.post(self.url, json={**filtros, "cursor": "invalido"})
+        assert response.status_code == 400
+
+    def test_descricoes_dicionario(self, client, session):
+        """Test returning the NCM descriptions once, keyed by ncm_id, instead of in every item."""
+        trans1 = create_exportacao_db(session)
+        filtros = {"uf_id": trans1.uf.id, "ano": trans1.ano}
+
+        por_linha = client.post(self.url, json=filtros).json
+        dicionario = client.post(self.url, json={**filtros, "descricoes_ncm": "dicionario"}).json
+
+        assert por_linha["cargas_movimentadas"][0]["ncm_descricao"] == trans1.ncm.descricao
+        assert "ncm_descricao" not in dicionario["cargas_movimentadas"][0]
+        assert dicionario["ncm_descricoes"] == {str(trans1.ncm_id): trans1.ncm.descricao}
+
+
+class TestViasUtilizadasRoute:
+    url = "/api/exportacoes/vias-utilizadas"
+
+    def test_reads_resumos(self, client, session):
+        """Test that the via counts come from the summary tables when they have data."""
+        from src.resumos.model import ResumoViaModel
+        from tests.test_vias import create_via_db
+
+        uf = create_uf_db(session)
+        via1 = create_via_db(session)
+        via2 = create_via_db(session)
+        session.add_all(
+            [
+                ResumoViaModel(fluxo="exportacoes", uf_id=uf.id, ano=2023, via_id=via1.id, qtd=3, peso=0, valor=0),
+                ResumoViaModel(fluxo="exportacoes", uf_id=uf.id, ano=2023, via_id=via2.id, qtd=7, peso=0, valor=0),
+                ResumoViaModel(fluxo="importacoes", uf_id=uf.id, ano=2023, via_id=via1.id, qtd=9, peso=0, valor=0),
+            ]
+        )
+        session.commit()
+
+        response = client.post(self.url, json={"uf_id": uf.id, "ano": 2023})
+
+        assert response.status_code == 200
+        assert response.json == [
+            {"via_id": via2.id, "qtd": 7},
+            {"via_id": via1.id, "qtd": 3},
+        ]
+
+    def test_empty_resumos_answer(self, client, session, monkeypatch):
+        """Test that a UF/year without trade is answered by the summaries, without scanning the transactions."""
+        from src.core.queries import TransacaoQueries
+
+        def contagem(*args):
+            raise AssertionError("consulta à tabela de fatos")
+
+        monkeypatch.setattr(TransacaoQueries, "_contagem", contagem)
+        uf = create_uf_db(session)
+
+        response = client.post(self.url, json={"uf_id": uf.id, "ano": 2023})
+
+        assert response.status_code == 200
+        assert response.json == []
+
+    def test_get_conditional(self, client, session):
+        """Test the GET variant with its validators and the 304 for an unchanged dataset."""
+        trans = create_exportacao_db(session)
+        url = f"{self.url}?uf_id={trans.uf.id}&ano={trans.ano}"
+
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.json == client.post(self.url, json={"uf_id": trans.uf.id, "ano": trans.ano}).json
+        assert response.headers["ETag"]
+        assert "max-age" in response.headers["Cache-Control"]
+
+        response = client.get(url, headers={"If-None-Match": response.headers["ETag"]})
+        assert response.status_code == 304
+        assert response.data == b""
+
+    def test_hit_without_query(self, client, session, db):
+        """Test that a cached response and a 304 are served without a database round trip."""
+        from sqlalchemy import event
+
+        trans = create_exportacao_db(session)
+        url = f"{self.url}?uf_id={trans.uf_id}&ano={trans.ano}"
+        etag = client.get(url).headers["ETag"]
+
+        consultas = []
+        contar = lambda conn, cursor, statement, *args: consultas.append(statement)
+        event.listen(db.engine, "before_cursor_execute", contar)
+        try:
+            assert client.get(url).status_code == 200
+            assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+        finally:
+            event.remove(db.engine, "before_cursor_execute", contar)
+
+        assert consultas == []
+
+    def test_write_changes_etag(self, client, session):
+        """Test that a write through the API answers the old ETag with 200 and a new ETag."""
+        trans = create_exportacao_db(session)
+        url = f"{self.url}?uf_id={trans.uf_id}&ano={trans.ano}"
+        etag = client.get(url).headers["ETag"]
+
+        campos = ("ano", "mes", "valor", "ncm_id", "ue_id", "pais_id", "uf_id", "via_id", "urf_id")
+        dados = {campo: getattr(trans, campo) for campo in campos}
+        atualizada = client.put(f"/api/exportacoes/{trans.id}", json={**dados, "peso": trans.peso + 1})
+        response = client.get(url, headers={"If-None-Match": etag})
+
+        assert atualizada.status_code == 204
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag